@@ -0,0 +1,188 @@
+"""ASGI entry point: a non-blocking /parse in front of the Flask app.
+
+Run from the ai-ml folder with:
+
+    uvicorn asgi:app --port 5001
+
+POST /parse is served natively on the event loop. The download uses httpx, so
+a slow download holds no thread. Cache reads and writes, indexing and NER run
+on a bounded thread pool, and PDF extraction runs on the worker process pool.
+At most NLPConfig.ASYNC_MAX_IN_FLIGHT parse requests are admitted at once.
+Beyond that the server answers 429 with a Retry-After header instead of
+queueing without limit.
+
+Every other route, and CORS preflights for /parse, is passed to the Flask app
+in main.py through asgiref's WSGI adapter, so responses are identical to
+``python main.py``. The native /parse adds the same CORS headers as Flask
+(main.cors_headers).
+"""
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import json
+import os
+import time
+
+try:
+    from asgiref.wsgi import WsgiToAsgi
+except ImportError as e:
+    raise RuntimeError(
+        "asgiref is not installed. Install the optional async requirements "
+        "(httpx, uvicorn, asgiref) to use the ASGI server.") from e
+
+from config import NLPConfig
+from metrics import REQUEST_SECONDS
+from main import app as flask_app, cors_headers, extraction_options, finish_parse
+from warmup import get_readiness
+from resume_parser.pdf_processor import download_file_async, get_async_download_client
+from resume_parser.resume_parser import parse_pdf_bytes_async
+
+
+class _BadRequest(Exception):
+    pass
+
+
+class ParseServer:
+    """ASGI application serving /parse natively and everything else via Flask."""
+
+    def __init__(self, wsgi_app, max_in_flight: int = 256, executor_workers: int = 32):
+        self.wsgi = WsgiToAsgi(wsgi_app)
+        self.max_in_flight = max(1, max_in_flight)
+        self.in_flight = 0
+        self.rejected = 0
+        self.executor = ThreadPoolExecutor(
+            max_workers=max(1, executor_workers), thread_name_prefix='asgi-blocking')
+        self._client = None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http' and scope['path'] == '/parse' and scope['method'] == 'POST':
+            await self._parse(scope, receive, send)
+        elif scope['type'] == 'http' and scope['path'] == '/async/stats':
+            await _send_json(send, 200, {
+                'in_flight': self.in_flight,
+                'max_in_flight': self.max_in_flight,
+                'rejected': self.rejected})
+        else:
+            await self.wsgi(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                # Runs in the background; /ready reports when it is done
+                get_readiness().start()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self._client is not None:
+                    await self._client.aclose()
+                    self._client = None
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def _get_client(self):
+        # Created on first use so it binds to the server's event loop
+        if self._client is None:
+            self._client = get_async_download_client()
+        return self._client
+
+    async def _parse(self, scope, receive, send):
+        started = time.perf_counter()
+        origin = dict(scope['headers']).get(b'origin')
+        headers = [(k.encode('latin-1'), v.encode('latin-1')) for k, v in
+                   cors_headers(origin.decode('latin-1') if origin is not None else None)]
+        # Admission control: the loop is single-threaded, so a plain counter
+        # is race-free.
+        if self.in_flight >= self.max_in_flight:
+            self.rejected += 1
+            await _send_json(
+                send, 429, {'error': "Too many parse requests in flight, retry later"},
+                headers=[*headers,
+                         (b'retry-after', str(NLPConfig.ASYNC_RETRY_AFTER_SECONDS).encode())])
+            status = 429
+        else:
+            self.in_flight += 1
+            try:
+                status, payload = await self._handle_parse(receive)
+            finally:
+                self.in_flight -= 1
+            await _send_json(send, status, payload, headers)
+        REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint='/parse',
+                                method='POST', status=status)
+
+    async def _handle_parse(self, receive):
+        try:
+            data = await _read_json(receive, NLPConfig.ASYNC_MAX_BODY_BYTES)
+            options = extraction_options(data)
+        except _BadRequest as e:
+            return 400, {'error': str(e)}
+        except (TypeError, ValueError):
+            return 400, {'error': "max_pages and max_chars must be integers"}
+
+        file_url = data.get('file_url')
+        if not file_url:
+            return 400, {'error': "No file_url provided"}
+        print(f"Processing file from URL: {file_url}")
+
+        # 1. Download without blocking the event loop
+        pdf_bytes = await download_file_async(self._get_client(), file_url)
+        if pdf_bytes is None:
+            return 500, {'error': "Failed to download file from URL"}
+
+        # 2. Extract on the process pool (or serve from the parse cache)
+        result = await parse_pdf_bytes_async(pdf_bytes, options, self.executor)
+        if result is None:
+            return 500, {'error': "Failed to extract text from PDF"}
+
+        # 3-5. Indexing and NER are blocking, so they run on the thread pool
+        loop = asyncio.get_running_loop()
+        response = await loop.run_in_executor(
+            self.executor, finish_parse, file_url, result,
+            data.get('resume_id'), bool(data.get('include_entities')))
+        return 200, response
+
+
+async def _read_json(receive, limit: int):
+    body = bytearray()
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            raise _BadRequest("Client disconnected")
+        body += message.get('body', b'')
+        if len(body) > limit:
+            raise _BadRequest(f"Request body larger than {limit} bytes")
+        if not message.get('more_body'):
+            break
+    try:
+        data = json.loads(body or b'{}')
+    except ValueError:
+        raise _BadRequest("Request body must be JSON")
+    if not isinstance(data, dict):
+        raise _BadRequest("Request body must be a JSON object")
+    return data
+
+
+async def _send_json(send, status: int, payload, headers=()):
+    body = json.dumps(payload, sort_keys=True).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'),
+                    (b'content-length', str(len(body)).encode()),
+                    *headers],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+app = ParseServer(
+    flask_app,
+    max_in_flight=NLPConfig.ASYNC_MAX_IN_FLIGHT,
+    executor_workers=NLPConfig.ASYNC_EXECUTOR_WORKERS)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, port=int(os.getenv('PORT', '5001')))
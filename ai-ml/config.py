@@ -1,4 +1,5 @@
 from pathlib import Path
+import json
 import os
 
 
@@ -14,6 +15,9 @@ MODELS_DIR.mkdir(parents=True, exist_ok=True)
 class NLPConfig:
     # spaCy model name
     SPACY_MODEL_NAME = os.getenv("SPACY_MODEL_NAME", "en_core_web_sm")
+    # nlp.pipe settings for batched NER
+    SPACY_BATCH_SIZE = int(os.getenv("SPACY_BATCH_SIZE", "32"))
+    SPACY_N_PROCESS = int(os.getenv("SPACY_N_PROCESS", "1"))
 
     # Sentence-BERT / huggingface model for embeddings
     HF_EMBEDDING_MODEL = os.getenv(
@@ -22,17 +26,180 @@ class NLPConfig:
     # Artifact paths
     TFIDF_VECTORIZER_PATH = MODELS_DIR / "tfidf_vectorizer.joblib"
     LOGREG_CLASSIFIER_PATH = MODELS_DIR / "multilabel_logreg.joblib"
+    MLB_PATH = MODELS_DIR / "mlb.joblib"
+    # Written by training after the three artifacts above; the service reloads
+    # them together only when this file changes
+    MODEL_MANIFEST_PATH = MODELS_DIR / "label_models.json"
+
+    # Model registry: joblib mmap mode ('r' to memory-map arrays, empty to
+    # load into memory) and how often artifact files are checked for changes
+    MODEL_MMAP_MODE = os.getenv("MODEL_MMAP_MODE") or None
+    MODEL_RELOAD_INTERVAL_SECONDS = float(
+        os.getenv("MODEL_RELOAD_INTERVAL_SECONDS", "5"))
 
     # Transformer training output dir (optional heavy path)
     TRANSFORMER_OUTPUT_DIR = MODELS_DIR / "transformer_classifier"
 
+    # Streaming (out-of-core) training: CSV rows per chunk, hashed feature
+    # count, passes over the training rows, per-label fitting threads
+    # (-1 = all cores) and the SGD regularisation strength
+    TRAIN_CHUNK_ROWS = int(os.getenv("TRAIN_CHUNK_ROWS", "50000"))
+    TRAIN_HASH_FEATURES = int(os.getenv("TRAIN_HASH_FEATURES", str(2 ** 20)))
+    TRAIN_EPOCHS = int(os.getenv("TRAIN_EPOCHS", "3"))
+    TRAIN_N_JOBS = int(os.getenv("TRAIN_N_JOBS", "-1"))
+    TRAIN_SGD_ALPHA = float(os.getenv("TRAIN_SGD_ALPHA", "1e-5"))
+
     # Embedding device: 'cpu' or 'cuda'
     EMBEDDING_DEVICE = os.getenv("EMBEDDING_DEVICE", "cpu")
+    # CPU inference tuning: 'int8' applies dynamic int8 quantization to the
+    # model's linear layers ('float' keeps full precision), torch intra-op
+    # threads (0 = torch default) and the token limit per text (0 = model
+    # default). Check int8 drift with scripts/bench_embeddings.py.
+    EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "float")
+    EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "0"))
+    EMBEDDING_MAX_SEQ_LENGTH = int(os.getenv("EMBEDDING_MAX_SEQ_LENGTH", "0"))
+
+    # Batched encoding: micro-batch size, and coalescing of concurrent
+    # single-text requests (wait up to N ms to fill a batch)
+    EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+    EMBEDDING_COALESCE = os.getenv("EMBEDDING_COALESCE", "1") == "1"
+    EMBEDDING_COALESCE_WAIT_MS = float(
+        os.getenv("EMBEDDING_COALESCE_WAIT_MS", "5"))
+    EMBEDDING_COALESCE_MAX_BATCH = int(
+        os.getenv("EMBEDDING_COALESCE_MAX_BATCH", "64"))
+
+    # On-disk embedding stores for resumes and jobs (one subdirectory each)
+    EMBEDDING_STORE_DIR = Path(os.getenv(
+        "EMBEDDING_STORE_DIR", str(DATA_DIR / "processed" / "embeddings")))
 
     # Limits for downloader (used by resume_parser)
     MAX_DOWNLOAD_BYTES = int(
         os.getenv("MAX_DOWNLOAD_BYTES", str(10 * 1024 * 1024)))
     DOWNLOAD_TIMEOUT_SECONDS = int(os.getenv("DOWNLOAD_TIMEOUT_SECONDS", "20"))
+    # Downloads larger than this spill from memory to a temp file
+    DOWNLOAD_SPOOL_BYTES = int(
+        os.getenv("DOWNLOAD_SPOOL_BYTES", str(2 * 1024 * 1024)))
 
     # Optional hostname allowlist for SSRF protection (comma separated)
     ALLOWED_DOWNLOAD_HOSTS = os.getenv("ALLOWED_DOWNLOAD_HOSTS")
+
+    # Pooled HTTP session for downloads: number of hosts to keep pools for,
+    # connections kept alive per host, and retries with exponential backoff
+    DOWNLOAD_POOL_HOSTS = int(os.getenv("DOWNLOAD_POOL_HOSTS", "4"))
+    DOWNLOAD_POOL_SIZE = int(os.getenv("DOWNLOAD_POOL_SIZE", "16"))
+    DOWNLOAD_RETRIES = int(os.getenv("DOWNLOAD_RETRIES", "2"))
+    DOWNLOAD_BACKOFF_SECONDS = float(
+        os.getenv("DOWNLOAD_BACKOFF_SECONDS", "0.5"))
+
+    # Batch parsing (/parse_batch)
+    BATCH_MAX_URLS = int(os.getenv("BATCH_MAX_URLS", "100"))
+    BATCH_DOWNLOAD_WORKERS = int(os.getenv("BATCH_DOWNLOAD_WORKERS", "8"))
+    BATCH_EXTRACT_WORKERS = int(
+        os.getenv("BATCH_EXTRACT_WORKERS", str(os.cpu_count() or 1)))
+
+    # ASGI server (asgi.py): /parse requests admitted at once (more get a
+    # 429), threads for the blocking steps (cache, indexing, NER), and the
+    # largest accepted request body
+    ASYNC_MAX_IN_FLIGHT = int(os.getenv("ASYNC_MAX_IN_FLIGHT", "256"))
+    ASYNC_EXECUTOR_WORKERS = int(os.getenv("ASYNC_EXECUTOR_WORKERS", "32"))
+    ASYNC_MAX_BODY_BYTES = int(os.getenv("ASYNC_MAX_BODY_BYTES", str(1024 * 1024)))
+    ASYNC_RETRY_AFTER_SECONDS = int(os.getenv("ASYNC_RETRY_AFTER_SECONDS", "1"))
+
+    # Background parse jobs (/jobs): SQLite queue, worker threads, retries
+    # with exponential backoff for failed downloads, and how long finished
+    # jobs are kept
+    JOB_QUEUE_PATH = Path(os.getenv(
+        "JOB_QUEUE_PATH", str(DATA_DIR / "processed" / "jobs.sqlite3")))
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+    JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+    JOB_RETRY_BACKOFF_SECONDS = float(os.getenv("JOB_RETRY_BACKOFF_SECONDS", "2"))
+    JOB_RETRY_MAX_BACKOFF_SECONDS = float(
+        os.getenv("JOB_RETRY_MAX_BACKOFF_SECONDS", "300"))
+    # A running job not finished within this long is assumed lost and re-run
+    JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "300"))
+    JOB_MAX_QUEUED = int(os.getenv("JOB_MAX_QUEUED", "10000"))
+    JOB_RETENTION_SECONDS = float(
+        os.getenv("JOB_RETENTION_SECONDS", str(7 * 24 * 3600)))
+
+    # Skill-label prediction (/predict_labels, scripts/predict_labels.py):
+    # probability threshold and labels returned per text, texts vectorized
+    # per sparse batch, and batches larger than LABEL_PARALLEL_MIN_TEXTS are
+    # split across LABEL_WORKERS processes
+    LABEL_THRESHOLD = float(os.getenv("LABEL_THRESHOLD", "0.5"))
+    LABEL_TOP_K = int(os.getenv("LABEL_TOP_K", "5"))
+    LABEL_BATCH_SIZE = int(os.getenv("LABEL_BATCH_SIZE", "2000"))
+    LABEL_MAX_TEXTS = int(os.getenv("LABEL_MAX_TEXTS", "50000"))
+    LABEL_PARALLEL_MIN_TEXTS = int(os.getenv("LABEL_PARALLEL_MIN_TEXTS", "5000"))
+    LABEL_WORKERS = int(os.getenv("LABEL_WORKERS", str(os.cpu_count() or 1)))
+
+    # Print pipeline stages (download, pdf_extract, skills, embedding) that
+    # take longer than this many milliseconds; 0 disables
+    TRACE_SLOW_STAGE_MS = float(os.getenv("TRACE_SLOW_STAGE_MS", "0"))
+
+    # Startup warm-up (warmup.py). Heavy libraries are imported on first use;
+    # with WARMUP_ON_STARTUP the service loads them, the models and the
+    # extraction workers in the background and /ready answers 503 until done.
+    WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "1") == "1"
+    # Comma-separated subset of warmup.WARMUP_STEPS to run; empty runs all
+    WARMUP_STEPS = os.getenv("WARMUP_STEPS", "")
+    WARMUP_TIMEOUT_SECONDS = float(os.getenv("WARMUP_TIMEOUT_SECONDS", "300"))
+
+    # PDF text extraction. /parse also runs in the BATCH_EXTRACT_WORKERS
+    # process pool unless PDF_EXTRACT_IN_WORKERS is 0. Limits of 0 are off;
+    # a document over a limit returns the text extracted so far.
+    PDF_EXTRACT_IN_WORKERS = os.getenv("PDF_EXTRACT_IN_WORKERS", "1") == "1"
+    PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "0"))
+    PDF_MAX_CHARS = int(os.getenv("PDF_MAX_CHARS", "0"))
+    PDF_CPU_TIMEOUT_SECONDS = float(os.getenv("PDF_CPU_TIMEOUT_SECONDS", "20"))
+    # How long a request waits for a worker before giving up on a document
+    PDF_WALL_TIMEOUT_SECONDS = float(os.getenv("PDF_WALL_TIMEOUT_SECONDS", "60"))
+    # Skip pdfminer layout analysis (faster, rougher text)
+    PDF_FAST_MODE = os.getenv("PDF_FAST_MODE", "0") == "1"
+    # pdfminer LAParams overrides as JSON, e.g. '{"line_margin": 0.3}'
+    PDF_LAPARAMS = json.loads(os.getenv("PDF_LAPARAMS") or "{}")
+
+    # Parse-result cache (memory LRU + SQLite on disk)
+    PARSE_CACHE_ENABLED = os.getenv("PARSE_CACHE_ENABLED", "1") == "1"
+    PARSE_CACHE_PATH = Path(os.getenv(
+        "PARSE_CACHE_PATH", str(DATA_DIR / "processed" / "parse_cache.sqlite3")))
+    PARSE_CACHE_MEMORY_ITEMS = int(os.getenv("PARSE_CACHE_MEMORY_ITEMS", "256"))
+    PARSE_CACHE_MAX_BYTES = int(
+        os.getenv("PARSE_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+    # Columnar store of parse results (resume_parser/result_store.py) for
+    # analytics and retraining: rows are journalled and sealed into a
+    # memory-mapped segment every PARSE_RESULT_SEGMENT_ROWS rows
+    PARSE_RESULT_STORE_ENABLED = os.getenv("PARSE_RESULT_STORE_ENABLED", "1") == "1"
+    PARSE_RESULT_STORE_DIR = Path(os.getenv(
+        "PARSE_RESULT_STORE_DIR", str(DATA_DIR / "processed" / "parse_results")))
+    PARSE_RESULT_SEGMENT_ROWS = int(os.getenv("PARSE_RESULT_SEGMENT_ROWS", "10000"))
+
+    # Offline bulk ingestion (scripts/ingest_resumes.py): worker processes,
+    # its own parse-result store (not the one the service writes to), and
+    # the journal of finished files that lets an interrupted run resume
+    INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", str(os.cpu_count() or 1)))
+    INGEST_STORE_DIR = Path(os.getenv(
+        "INGEST_STORE_DIR", str(DATA_DIR / "processed" / "ingested_results")))
+    INGEST_CHECKPOINT_PATH = Path(os.getenv(
+        "INGEST_CHECKPOINT_PATH", str(DATA_DIR / "processed" / "ingest_checkpoint.log")))
+
+    # Two-stage candidate ranking: how many prefiltered candidates get the
+    # full TF-IDF + embedding score, and the default page size
+    RANKING_TOP_N = int(os.getenv("RANKING_TOP_N", "200"))
+    RANKING_PAGE_SIZE = int(os.getenv("RANKING_PAGE_SIZE", "20"))
+
+    # Approximate nearest-neighbour index over candidate embeddings
+    ANN_INDEX_PATH = Path(os.getenv(
+        "ANN_INDEX_PATH", str(DATA_DIR / "processed" / "ann" / "candidates.npz")))
+    ANN_N_LISTS = int(os.getenv("ANN_N_LISTS", "1024"))
+    ANN_NPROBE = int(os.getenv("ANN_NPROBE", "16"))
+    # 0 keeps full float32 vectors; otherwise the number of PQ subvectors
+    ANN_PQ_SUBVECTORS = int(os.getenv("ANN_PQ_SUBVECTORS", "0"))
+    # PQ only: re-score top_k * ANN_REFINE_FACTOR hits with the stored vectors
+    ANN_REFINE_FACTOR = int(os.getenv("ANN_REFINE_FACTOR", "4"))
+    # How often the index file is checked for a rebuild (0 = every call)
+    ANN_RELOAD_INTERVAL_SECONDS = float(os.getenv("ANN_RELOAD_INTERVAL_SECONDS", "5"))
+
+    # Inverted skill -> resume index (journal replayed on startup)
+    SKILL_INDEX_PATH = Path(os.getenv(
+        "SKILL_INDEX_PATH", str(DATA_DIR / "processed" / "skill_index.log")))
@@ -0,0 +1,302 @@
+"""Durable SQLite-backed job queue with a background worker pool.
+
+Jobs are rows in a ``jobs`` table, so anything accepted survives a restart.
+A worker claims the oldest due job under the queue lock, runs the handler
+and stores the result (zlib-compressed JSON, as in the parse cache) or the
+error.
+
+- Idempotency: every job has a key. Submitting a key that is already
+  queued, running or done returns the existing job instead of a new one.
+- Retries: a handler raises ``RetryableJobError`` for transient failures
+  (e.g. a download that failed). The job is re-queued with exponential
+  backoff until ``max_attempts`` is reached, then marked failed. Any other
+  exception fails the job at once.
+- Crash recovery: a running job whose lease expired (its worker died) is
+  picked up again, unless it has used up ``max_attempts``; then it is marked
+  failed, so a resume that kills the process is not retried forever.
+"""
+from __future__ import annotations
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Union
+import json
+import random
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+
+from config import NLPConfig
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = 'queued', 'running', 'succeeded', 'failed'
+
+
+class RetryableJobError(Exception):
+    """Raised by a job handler for failures worth retrying later."""
+
+
+class QueueFullError(Exception):
+    """Raised by submit when too many jobs are waiting."""
+
+
+class JobQueue:
+    """Jobs stored in SQLite. All methods are thread-safe."""
+
+    def __init__(self, db_path: Union[str, Path], max_attempts: int = 5,
+                 backoff_seconds: float = 2.0, max_backoff_seconds: float = 300.0,
+                 lease_seconds: float = 300.0, max_queued: int = 10000):
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_seconds = max(0.0, backoff_seconds)
+        self.max_backoff_seconds = max(self.backoff_seconds, max_backoff_seconds)
+        self.lease_seconds = max(1.0, lease_seconds)
+        self.max_queued = max_queued
+        self._lock = threading.Lock()
+        # Signalled on submit to wake idle workers
+        self.wakeup = threading.Condition(threading.Lock())
+
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS jobs ('
+            'id TEXT PRIMARY KEY, key TEXT NOT NULL UNIQUE, kind TEXT NOT NULL, '
+            'payload TEXT NOT NULL, status TEXT NOT NULL, '
+            'attempts INTEGER NOT NULL DEFAULT 0, next_attempt_at REAL NOT NULL, '
+            'lease_until REAL, result BLOB, error TEXT, '
+            'created_at REAL NOT NULL, updated_at REAL NOT NULL, finished_at REAL)')
+        self._conn.execute(
+            'CREATE INDEX IF NOT EXISTS jobs_due ON jobs (status, next_attempt_at)')
+        self._conn.commit()
+
+    def submit(self, kind: str, payload: Dict[str, Any], key: str) -> Dict[str, Any]:
+        """Queue a job, or return the existing job with the same key.
+
+        A previously failed job with the same key is queued again. The
+        returned dict has an extra ``created`` flag.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT id, status FROM jobs WHERE key = ?', (key,)).fetchone()
+            if row is not None and row[1] != FAILED:
+                return dict(self._get(row[0]), created=False)
+            queued = self._conn.execute(
+                'SELECT COUNT(*) FROM jobs WHERE status = ?', (QUEUED,)).fetchone()[0]
+            if self.max_queued and queued >= self.max_queued:
+                raise QueueFullError(f"{queued} jobs already queued")
+            if row is not None:
+                job_id = row[0]
+                self._conn.execute(
+                    'UPDATE jobs SET payload = ?, status = ?, attempts = 0, '
+                    'next_attempt_at = ?, lease_until = NULL, result = NULL, '
+                    'error = NULL, updated_at = ?, finished_at = NULL WHERE id = ?',
+                    (json.dumps(payload), QUEUED, now, now, job_id))
+            else:
+                job_id = uuid.uuid4().hex
+                self._conn.execute(
+                    'INSERT INTO jobs (id, key, kind, payload, status, next_attempt_at, '
+                    'created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    (job_id, key, kind, json.dumps(payload), QUEUED, now, now, now))
+            self._conn.commit()
+            job = self._get(job_id)
+        with self.wakeup:
+            self.wakeup.notify()
+        return dict(job, created=True)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._get(job_id)
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """Mark the oldest due job as running and return it (with its payload)."""
+        now = time.time()
+        with self._lock:
+            # Expired leases on jobs out of attempts: the job itself may be
+            # what keeps killing the worker
+            self._conn.execute(
+                'UPDATE jobs SET status = ?, error = ?, lease_until = NULL, '
+                'updated_at = ?, finished_at = ? '
+                'WHERE status = ? AND lease_until < ? AND attempts >= ?',
+                (FAILED, 'worker died', now, now, RUNNING, now, self.max_attempts))
+            row = self._conn.execute(
+                'SELECT id FROM jobs WHERE (status = ? AND next_attempt_at <= ?) '
+                'OR (status = ? AND lease_until < ?) '
+                'ORDER BY next_attempt_at LIMIT 1',
+                (QUEUED, now, RUNNING, now)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                'UPDATE jobs SET status = ?, attempts = attempts + 1, lease_until = ?, '
+                'updated_at = ? WHERE id = ?',
+                (RUNNING, now + self.lease_seconds, now, row[0]))
+            self._conn.commit()
+            job = self._get(row[0], include_payload=True)
+        return job
+
+    def complete(self, job_id: str, result: Dict[str, Any]) -> None:
+        now = time.time()
+        blob = zlib.compress(json.dumps(result).encode('utf-8'))
+        with self._lock:
+            self._conn.execute(
+                'UPDATE jobs SET status = ?, result = ?, error = NULL, lease_until = NULL, '
+                'updated_at = ?, finished_at = ? WHERE id = ?',
+                (SUCCEEDED, blob, now, now, job_id))
+            self._conn.commit()
+
+    def fail(self, job_id: str, error: str, retryable: bool = False) -> str:
+        """Record a failure; re-queue with backoff if retryable and attempts remain.
+
+        Returns the job's new status.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT attempts FROM jobs WHERE id = ?', (job_id,)).fetchone()
+            attempts = row[0] if row else self.max_attempts
+            if retryable and attempts < self.max_attempts:
+                delay = min(self.max_backoff_seconds,
+                            self.backoff_seconds * 2 ** (attempts - 1))
+                # Jitter so jobs that failed together do not retry together
+                delay *= random.uniform(0.8, 1.2)
+                self._conn.execute(
+                    'UPDATE jobs SET status = ?, error = ?, next_attempt_at = ?, '
+                    'lease_until = NULL, updated_at = ? WHERE id = ?',
+                    (QUEUED, error, now + delay, now, job_id))
+                status = QUEUED
+            else:
+                self._conn.execute(
+                    'UPDATE jobs SET status = ?, error = ?, lease_until = NULL, '
+                    'updated_at = ?, finished_at = ? WHERE id = ?',
+                    (FAILED, error, now, now, job_id))
+                status = FAILED
+            self._conn.commit()
+        return status
+
+    def next_due_in(self) -> Optional[float]:
+        """Seconds until the next queued job is due (0 if one is due now)."""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT MIN(next_attempt_at) FROM jobs WHERE status = ?',
+                (QUEUED,)).fetchone()
+        if row is None or row[0] is None:
+            return None
+        return max(0.0, row[0] - time.time())
+
+    def purge(self, older_than_seconds: float) -> int:
+        """Delete finished jobs older than the given age. Returns how many."""
+        cutoff = time.time() - older_than_seconds
+        with self._lock:
+            cur = self._conn.execute(
+                'DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?',
+                (SUCCEEDED, FAILED, cutoff))
+            self._conn.commit()
+            return cur.rowcount
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall()
+        counts = {QUEUED: 0, RUNNING: 0, SUCCEEDED: 0, FAILED: 0}
+        counts.update(dict(rows))
+        return counts
+
+    def _get(self, job_id: str, include_payload: bool = False) -> Optional[Dict[str, Any]]:
+        row = self._conn.execute(
+            'SELECT id, kind, status, attempts, error, result, created_at, updated_at, '
+            'finished_at, next_attempt_at, payload FROM jobs WHERE id = ?',
+            (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = {
+            'id': row[0], 'kind': row[1], 'status': row[2], 'attempts': row[3],
+            'created_at': row[6], 'updated_at': row[7], 'finished_at': row[8],
+        }
+        if row[4] is not None:
+            job['error'] = row[4]
+        if row[5] is not None:
+            job['result'] = json.loads(zlib.decompress(row[5]))
+        if row[2] == QUEUED and row[3] > 0:
+            job['retry_at'] = row[9]
+        if include_payload:
+            job['payload'] = json.loads(row[10])
+        return job
+
+
+class JobWorkers:
+    """Background threads that run queued jobs through per-kind handlers."""
+
+    def __init__(self, queue: JobQueue, handlers: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]],
+                 workers: int = 4, poll_seconds: float = 1.0,
+                 retention_seconds: float = 7 * 24 * 3600):
+        self.queue = queue
+        self.handlers = handlers
+        self.n_workers = max(1, workers)
+        self.poll_seconds = max(0.05, poll_seconds)
+        self.retention_seconds = retention_seconds
+        self._threads: List[threading.Thread] = []
+        self._stop = threading.Event()
+        self._start_lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._start_lock:
+            if self._threads:
+                return
+            for i in range(self.n_workers):
+                thread = threading.Thread(
+                    target=self._run, name=f'job-worker-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            print(f"Started {self.n_workers} job workers")
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        with self.queue.wakeup:
+            self.queue.wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _run(self) -> None:
+        last_purge = 0.0
+        while not self._stop.is_set():
+            job = self.queue.claim()
+            if job is None:
+                if self.retention_seconds and time.time() - last_purge > 3600:
+                    self.queue.purge(self.retention_seconds)
+                    last_purge = time.time()
+                due_in = self.queue.next_due_in()
+                wait = self.poll_seconds if due_in is None else min(self.poll_seconds, due_in)
+                with self.queue.wakeup:
+                    self.queue.wakeup.wait(wait)
+                continue
+            self._execute(job)
+
+    def _execute(self, job: Dict[str, Any]) -> None:
+        handler = self.handlers.get(job['kind'])
+        if handler is None:
+            self.queue.fail(job['id'], f"No handler for job kind '{job['kind']}'")
+            return
+        try:
+            result = handler(job['payload'])
+        except RetryableJobError as e:
+            status = self.queue.fail(job['id'], str(e), retryable=True)
+            print(f"Job {job['id']} attempt {job['attempts']} failed ({status}): {e}")
+            return
+        except Exception as e:
+            self.queue.fail(job['id'], str(e) or type(e).__name__)
+            print(f"Job {job['id']} failed: {e}")
+            return
+        self.queue.complete(job['id'], result)
+
+
+@lru_cache(maxsize=1)
+def get_job_queue() -> JobQueue:
+    """Return the process-wide job queue (``NLPConfig.JOB_QUEUE_PATH``)."""
+    return JobQueue(
+        NLPConfig.JOB_QUEUE_PATH,
+        max_attempts=NLPConfig.JOB_MAX_ATTEMPTS,
+        backoff_seconds=NLPConfig.JOB_RETRY_BACKOFF_SECONDS,
+        max_backoff_seconds=NLPConfig.JOB_RETRY_MAX_BACKOFF_SECONDS,
+        lease_seconds=NLPConfig.JOB_LEASE_SECONDS,
+        max_queued=NLPConfig.JOB_MAX_QUEUED)
@@ -0,0 +1,153 @@
+"""Skill-label prediction with the trained multi-label classifier.
+
+The vectorizer, classifier and label binarizer come from the model registry,
+so they stay resident (and hot-swap after retraining) instead of being loaded
+per call. Texts are vectorized ``LABEL_BATCH_SIZE`` at a time into one sparse
+matrix and scored with a single ``predict_proba``. Each text gets the labels
+whose probability reaches the threshold, best first, at most ``top_k``.
+
+Batches larger than ``LABEL_PARALLEL_MIN_TEXTS`` are split across a pool of
+worker processes; each worker loads the models once (memory-mapped when
+``MODEL_MMAP_MODE`` is set) and keeps them for the life of the pool.
+"""
+from __future__ import annotations
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import NLPConfig
+from model_registry import get_model_registry
+
+
+class ModelUnavailableError(RuntimeError):
+    """The model artifacts could not be loaded, or do not fit together."""
+
+
+def _n_features(clf) -> Optional[int]:
+    # OneVsRestClassifier records it; the streaming trainer's linear model
+    # only has its coefficient matrix
+    n = getattr(clf, 'n_features_in_', None)
+    if n is None and getattr(clf, 'coef_', None) is not None:
+        n = clf.coef_.shape[1]
+    return n
+
+
+def load_label_models() -> Tuple[Any, Any, Any]:
+    """Return (vectorizer, classifier, label binarizer) from the registry.
+
+    The three come from one version of the artifacts. Raises
+    FileNotFoundError when they have not been trained yet, and
+    ModelUnavailableError when they cannot be loaded or do not match.
+    """
+    try:
+        vectorizer, clf, mlb = get_model_registry().get_many(
+            'tfidf_vectorizer', 'classifier', 'mlb')
+    except Exception as e:
+        raise ModelUnavailableError(f"Could not load model artifacts: {e}") from e
+    if vectorizer is None or clf is None or mlb is None:
+        raise FileNotFoundError(
+            'Model artifacts not found; run scripts/run_train_tfidf.py first')
+    expected = _n_features(clf)
+    produced = vectorizer.transform(['']).shape[1]
+    if expected is not None and expected != produced:
+        raise ModelUnavailableError(
+            f"Model artifacts do not match: the vectorizer produces {produced} "
+            f"features, the classifier expects {expected}; retrain the models")
+    return vectorizer, clf, mlb
+
+
+def _top_labels(proba: np.ndarray, classes: Sequence[str], threshold: float,
+                top_k: int) -> List[List[Dict[str, Any]]]:
+    k = proba.shape[1] if top_k <= 0 else min(top_k, proba.shape[1])
+    order = np.argsort(-proba, axis=1, kind='stable')[:, :k]
+    out = []
+    for row, columns in zip(proba, order):
+        out.append([{'label': str(classes[j]), 'probability': round(float(row[j]), 4)}
+                    for j in columns if row[j] >= threshold])
+    return out
+
+
+def predict_label_scores(texts: Sequence[str], threshold: Optional[float] = None,
+                         top_k: Optional[int] = None,
+                         batch_size: Optional[int] = None) -> List[List[Dict[str, Any]]]:
+    """Return, per text, ``[{'label', 'probability'}]`` sorted by probability.
+
+    Runs in the calling process; see predict_labels for large batches.
+    """
+    threshold = NLPConfig.LABEL_THRESHOLD if threshold is None else threshold
+    top_k = NLPConfig.LABEL_TOP_K if top_k is None else top_k
+    batch_size = max(1, batch_size or NLPConfig.LABEL_BATCH_SIZE)
+    vectorizer, clf, mlb = load_label_models()
+
+    results: List[List[Dict[str, Any]]] = []
+    for start in range(0, len(texts), batch_size):
+        batch = [t or '' for t in texts[start:start + batch_size]]
+        proba = np.asarray(clf.predict_proba(vectorizer.transform(batch)))
+        if proba.shape[1] != len(mlb.classes_):
+            raise ModelUnavailableError(
+                f"Model artifacts do not match: the classifier scores {proba.shape[1]} "
+                f"labels, the label binarizer has {len(mlb.classes_)}; retrain the models")
+        results.extend(_top_labels(proba, mlb.classes_, threshold, top_k))
+    return results
+
+
+@lru_cache(maxsize=1)
+def get_label_pool() -> ProcessPoolExecutor:
+    """Worker processes for large prediction batches (models stay loaded in each)."""
+    return ProcessPoolExecutor(max_workers=max(1, NLPConfig.LABEL_WORKERS))
+
+
+def _submit(chunk: Sequence[str], threshold: float, top_k: int) -> Future:
+    try:
+        return get_label_pool().submit(predict_label_scores, list(chunk), threshold, top_k)
+    except BrokenProcessPool:
+        print("Label prediction pool was broken (a worker died); starting a new one")
+        get_label_pool.cache_clear()
+        return get_label_pool().submit(predict_label_scores, list(chunk), threshold, top_k)
+
+
+def iter_label_predictions(chunks: Iterable[Sequence[str]],
+                           threshold: Optional[float] = None,
+                           top_k: Optional[int] = None,
+                           max_in_flight: Optional[int] = None
+                           ) -> Iterator[List[List[Dict[str, Any]]]]:
+    """Predict chunks of texts on the worker pool, yielding results in input order.
+
+    At most ``max_in_flight`` chunks (default: two per worker) are queued at
+    once, so a large input is never read into memory as a whole.
+    """
+    threshold = NLPConfig.LABEL_THRESHOLD if threshold is None else threshold
+    top_k = NLPConfig.LABEL_TOP_K if top_k is None else top_k
+    if max_in_flight is None:
+        max_in_flight = 2 * max(1, NLPConfig.LABEL_WORKERS)
+    pending: deque = deque()
+    try:
+        for chunk in chunks:
+            pending.append(_submit(chunk, threshold, top_k))
+            if len(pending) >= max(1, max_in_flight):
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def predict_labels(texts: Sequence[str], threshold: Optional[float] = None,
+                   top_k: Optional[int] = None) -> List[List[Dict[str, Any]]]:
+    """Like predict_label_scores, but splits large batches across processes."""
+    workers = max(1, NLPConfig.LABEL_WORKERS)
+    if workers == 1 or len(texts) < NLPConfig.LABEL_PARALLEL_MIN_TEXTS:
+        return predict_label_scores(texts, threshold, top_k)
+    # Fail fast in this process if the models are missing
+    load_label_models()
+    chunk = -(-len(texts) // workers)
+    chunks = [texts[i:i + chunk] for i in range(0, len(texts), chunk)]
+    results: List[List[Dict[str, Any]]] = []
+    for part in iter_label_predictions(chunks, threshold, top_k, max_in_flight=len(chunks)):
+        results.extend(part)
+    return results
@@ -1,34 +1,100 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
+from functools import lru_cache
+import hashlib
+import json
 import os
+import time
+from config import NLPConfig
+from metrics import REQUEST_SECONDS, render as render_metrics
+from warmup import get_readiness
+from label_predictor import ModelUnavailableError, predict_labels
+from job_queue import JobWorkers, QueueFullError, RetryableJobError, get_job_queue
+from resume_parser.extraction_engine import default_extraction_options
 from resume_parser.pdf_processor import (
-    extract_text_from_pdf,
-    download_file_from_url
-)
-# --- ADD THIS IMPORT ---
-from resume_parser.skill_extractor import extract_skills
+    download_file_from_url, download_file_or_cause, is_transient_download_failure)
+from resume_parser.parse_cache import get_parse_cache
+from resume_parser.result_store import get_result_store
+from resume_parser.resume_parser import parse_pdf_file, parse_resume_batch
+from resume_parser.entity_recognition import extract_entities
+from matching_engine.ann_index import (
+    add_to_candidate_index, find_similar, remove_from_candidate_index)
+from matching_engine.embedding_store import get_embedding_store
+from matching_engine.semantic_matcher import index_embedding
+from matching_engine.skill_index import get_skill_index
+from matching_engine.ranking_algorithm import get_ranking_engine
 
 # Initialize the Flask app
 app = Flask(__name__)
 
 # Enable Cross-Origin Resource Sharing (CORS)
 # Default to a safe local origin when not explicitly configured.
+# cors_origins is '*', a list of origins, or None when CORS stays disabled.
 cors_origins_env = os.getenv('CORS_ORIGINS')
 if cors_origins_env is None:
     # No CORS configured: allow local development origin only
-    default_origins = ['http://localhost:5173']
-    CORS(app, resources={r"/*": {"origins": default_origins}})
+    cors_origins = ['http://localhost:5173']
 elif cors_origins_env.strip() == '*':
     # Allow wildcard only in explicit development/debug mode
     if os.getenv('FLASK_DEBUG', '0') == '1' or os.getenv('ENV', '').lower() == 'development':
-        CORS(app)
+        cors_origins = '*'
     else:
         print('CORS_ORIGINS="*" is not allowed in production. Please set CORS_ORIGINS to a comma-separated list of allowed origins.')
         # Do not enable CORS (requests from other origins will be blocked)
+        cors_origins = None
 else:
-    origins = [o.strip() for o in cors_origins_env.split(',') if o.strip()]
-    if origins:
-        CORS(app, resources={r"/*": {"origins": origins}})
+    cors_origins = [o.strip() for o in cors_origins_env.split(',') if o.strip()] or None
+
+if cors_origins == '*':
+    CORS(app)
+elif cors_origins:
+    CORS(app, resources={r"/*": {"origins": cors_origins}})
+
+
+def cors_headers(origin):
+    """
+    The CORS response headers flask-cors adds for a request Origin (None if
+    the request had none), for responses built outside Flask (asgi.py).
+    """
+    if cors_origins is None:
+        return []
+    if cors_origins == '*':
+        if origin is None:
+            return [('Access-Control-Allow-Origin', '*')]
+        return [('Access-Control-Allow-Origin', origin), ('Vary', 'Origin')]
+    if origin is None:
+        origin = cors_origins[0]
+    elif origin not in cors_origins:
+        return []
+    headers = [('Access-Control-Allow-Origin', origin)]
+    if len(cors_origins) > 1:
+        headers.append(('Vary', 'Origin'))
+    return headers
+
+
+def extraction_options(data):
+    """Per-request PDF extraction overrides: max_pages, max_chars, fast_mode."""
+    fast = data.get('fast_mode')
+    return default_extraction_options(
+        max_pages=None if data.get('max_pages') is None else int(data['max_pages']),
+        max_chars=None if data.get('max_chars') is None else int(data['max_chars']),
+        fast=None if fast is None else bool(fast))
+
+
+@app.before_request
+def _start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def _observe_request(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        # The route template, not the path, so ids do not explode the labels
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint,
+                                method=request.method, status=response.status_code)
+    return response
 
 
 @app.route("/", methods=["GET"])
@@ -37,45 +103,391 @@ def home():
     return jsonify(message="AI-ML Service is running!")
 
 
+@app.route("/ready", methods=["GET"])
+def ready():
+    """
+    Readiness check: 503 until the startup warm-up has loaded the models and
+    started the extraction workers (see warmup.py), then 200. Starts the
+    warm-up if the server did not (e.g. under gunicorn).
+    """
+    readiness = get_readiness()
+    readiness.start()
+    status = readiness.snapshot()
+    return jsonify(status), 200 if status['ready'] else 503
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """Prometheus metrics: request latency, pipeline stages, failures, caches."""
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+
 @app.route("/parse", methods=["POST"])
 def parse_resume():
     """
     API Endpoint to parse a resume.
     It now extracts raw text AND a list of skills.
+    When a resume_id is given, the resume embedding is also stored so later
+    matching never has to encode it again. Set include_entities to also get
+    names, organisations, emails and phones. max_pages, max_chars and
+    fast_mode override the PDF extraction settings.
     """
     data = request.get_json()
     file_url = data.get('file_url')
+    resume_id = data.get('resume_id')
+    include_entities = bool(data.get('include_entities'))
 
     if not file_url:
         return jsonify(error="No file_url provided"), 400
+    try:
+        options = extraction_options(data)
+    except (TypeError, ValueError):
+        return jsonify(error="max_pages and max_chars must be integers"), 400
 
     print(f"Processing file from URL: {file_url}")
 
-    # 1. Download the file
-    temp_pdf_path = download_file_from_url(file_url)
-    if temp_pdf_path is None:
+    # 1. Download the file (kept in memory)
+    pdf_file = download_file_from_url(file_url)
+    if pdf_file is None:
         return jsonify(error="Failed to download file from URL"), 500
 
-    # 2. Extract raw text
-    extracted_text = extract_text_from_pdf(temp_pdf_path)
-    if extracted_text is None:
+    # 2. Extract raw text and skills (served from the parse cache when the
+    #    same PDF bytes were parsed before)
+    result = parse_pdf_file(pdf_file, options)
+    if result is None:
         return jsonify(error="Failed to extract text from PDF"), 500
 
-    # --- ADD THIS NEW STEP ---
-    # 3. Extract skills from the raw text
-    found_skills = extract_skills(extracted_text)
-    print(f"Found {len(found_skills)} skills: {found_skills}")
+    # 3-5. Index the resume and build the response
+    return jsonify(**finish_parse(file_url, result, resume_id, include_entities))
+
+
+def finish_parse(file_url, result, resume_id=None, include_entities=False):
+    """
+    Everything /parse does after extraction: index the resume's skills and
+    embedding when a resume_id is given, keep the result in the columnar
+    parse-result store, build the response and optionally add NER entities.
+    Shared with the ASGI server (asgi.py).
+    """
+    found_skills = result['extracted_skills']
+    print(f"Found {len(found_skills)} skills")
 
-    # 4. Return the new, richer data
-    return jsonify(
+    # 3. Index the resume's skills and embedding (embeddings are optional),
+    #    and add it to the candidate pool of /rank_candidates
+    if resume_id:
+        get_skill_index().add(str(resume_id), found_skills)
+        get_ranking_engine().add_candidates(
+            [str(resume_id)], [result['extracted_text']], [found_skills])
+        try:
+            embedding = index_embedding('resumes', str(resume_id), result['extracted_text'])
+            add_to_candidate_index(str(resume_id), embedding)
+        except Exception as e:
+            print(f"Skipping embedding for resume {resume_id}: {e}")
+
+    # Keep the parse output for offline scans (keyed by resume_id, else URL)
+    result_store = get_result_store()
+    if result_store is not None:
+        try:
+            result_store.append(str(resume_id or file_url), result, source=file_url)
+        except Exception as e:
+            print(f"Could not store parse result for {resume_id or file_url}: {e}")
+
+    response = dict(
         file_url=file_url,
-        extracted_text=extracted_text,
-        extracted_skills=found_skills,  # <-- NEW FIELD
-        word_count=len(extracted_text.split())
+        extracted_text=result['extracted_text'],
+        extracted_skills=found_skills,
+        word_count=result['word_count']
     )
+    for field in ('page_count', 'truncated'):
+        if field in result:
+            response[field] = result[field]
+
+    # 4. Optional NER (the spaCy pipeline is loaded once per process)
+    if include_entities:
+        response['entities'] = extract_entities(result['extracted_text'])
+
+    # 5. Return the new, richer data
+    return response
+
+
+def _run_parse_job(payload):
+    """Job handler: the same work as /parse, for a queued request body."""
+    file_url = payload['file_url']
+    pdf_file, cause = download_file_or_cause(file_url)
+    if pdf_file is None:
+        # Retrying a rejected URL, a 404 or an oversized file cannot help
+        if is_transient_download_failure(cause):
+            raise RetryableJobError(f"Failed to download file from URL ({cause})")
+        raise ValueError(f"Failed to download file from URL ({cause})")
+    result = parse_pdf_file(pdf_file, extraction_options(payload))
+    if result is None:
+        raise ValueError("Failed to extract text from PDF")
+    return finish_parse(file_url, result, payload.get('resume_id'),
+                        bool(payload.get('include_entities')))
+
+
+@lru_cache(maxsize=1)
+def get_job_workers():
+    """Start the background job workers (once per process)."""
+    workers = JobWorkers(
+        get_job_queue(), {'parse': _run_parse_job},
+        workers=NLPConfig.JOB_WORKERS,
+        retention_seconds=NLPConfig.JOB_RETENTION_SECONDS)
+    workers.start()
+    return workers
+
+
+@app.route("/jobs/parse", methods=["POST"])
+def submit_parse_job():
+    """
+    Queue a resume for parsing and return at once with a job id.
+    Accepts the same body as /parse plus an optional idempotency_key. By
+    default the same file_url/resume_id/options maps to the same job, so
+    client retries never parse a resume twice. Poll /jobs/<id> for the result.
+    """
+    data = request.get_json(silent=True) or {}
+    file_url = data.get('file_url')
+    if not file_url or not isinstance(file_url, str):
+        return jsonify(error="No file_url provided"), 400
+    try:
+        options = extraction_options(data)
+    except (TypeError, ValueError):
+        return jsonify(error="max_pages and max_chars must be integers"), 400
+
+    payload = {k: data[k] for k in ('file_url', 'resume_id', 'include_entities',
+                                    'max_pages', 'max_chars', 'fast_mode') if k in data}
+    key = data.get('idempotency_key') or hashlib.sha256(json.dumps(
+        [file_url, payload.get('resume_id'), bool(payload.get('include_entities')),
+         options.cache_tag()]).encode('utf-8')).hexdigest()
+
+    get_job_workers()
+    try:
+        job = get_job_queue().submit('parse', payload, str(key))
+    except QueueFullError as e:
+        return jsonify(error=f"Job queue is full: {e}"), 429
+    created = job.pop('created')
+    return jsonify(**job), 202 if created else 200
+
+
+@app.route("/jobs/stats", methods=["GET"])
+def job_stats():
+    """Number of jobs per status."""
+    return jsonify(**get_job_queue().counts())
+
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    """Status of a parse job; includes the /parse response once it succeeded."""
+    get_job_workers()
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return jsonify(error="Job not found"), 404
+    return jsonify(**job)
+
+
+@app.route("/cache/stats", methods=["GET"])
+def cache_stats():
+    """Hit/miss counters of the parse-result cache."""
+    cache = get_parse_cache()
+    if cache is None:
+        return jsonify(enabled=False)
+    return jsonify(enabled=True, **cache.snapshot_stats())
+
+
+@app.route("/embeddings/<kind>", methods=["POST"])
+def upsert_embedding(kind):
+    """
+    Encode and store the embedding of a resume or job.
+    Call this when a job is published or edited (kind is 'resumes' or 'jobs').
+    """
+    if kind not in ('resumes', 'jobs'):
+        return jsonify(error=f"Unknown embedding kind: {kind}"), 404
+    data = request.get_json(silent=True) or {}
+    item_id = data.get('id')
+    text = data.get('text')
+    if not item_id or not text:
+        return jsonify(error="id and text are required"), 400
+
+    try:
+        index_embedding(kind, str(item_id), text)
+    except RuntimeError as e:
+        return jsonify(error=str(e)), 503
+    return jsonify(id=str(item_id), kind=kind, stored=True)
+
+
+@app.route("/embeddings/<kind>/<item_id>", methods=["DELETE"])
+def delete_embedding(kind, item_id):
+    """Remove a stored resume or job embedding."""
+    if kind not in ('resumes', 'jobs'):
+        return jsonify(error=f"Unknown embedding kind: {kind}"), 404
+    deleted = get_embedding_store(kind).delete(item_id)
+    if not deleted:
+        return jsonify(error="Embedding not found"), 404
+    if kind == 'resumes':
+        remove_from_candidate_index(item_id)
+    return jsonify(id=item_id, kind=kind, deleted=True)
+
+
+@app.route("/candidates/<resume_id>/similar", methods=["GET"])
+def similar_candidates(resume_id):
+    """
+    Candidates whose resume embeddings are closest to this one's.
+    Served from the ANN index (scripts/build_ann_index.py) when it exists.
+    Query params: top_k (default 10), nprobe (cells to scan).
+    """
+    try:
+        top_k = int(request.args.get('top_k', 10))
+        nprobe = request.args.get('nprobe')
+        nprobe = int(nprobe) if nprobe is not None else None
+    except ValueError:
+        return jsonify(error="top_k and nprobe must be integers"), 400
+
+    similar = find_similar(get_embedding_store('resumes'), resume_id,
+                           top_k=max(1, top_k), nprobe=nprobe)
+    if similar is None:
+        return jsonify(error="No embedding stored for this resume"), 404
+    return jsonify(resume_id=resume_id,
+                   results=[{'id': i, 'score': s} for i, s in similar])
+
+
+@app.route("/rank_candidates", methods=["POST"])
+def rank_candidates():
+    """
+    Rank parsed candidates for a job: a cheap TF-IDF + skill-overlap
+    prefilter over the candidate pool (every resume parsed with a resume_id),
+    then the full TF-IDF + embedding score on the top_n.
+    Body: job_text, optional job_id / job_skills, candidate_ids (restrict the
+    pool to these resume_ids), top_n, page, page_size.
+    """
+    data = request.get_json(silent=True) or {}
+    job_text = data.get('job_text')
+    if not job_text or not isinstance(job_text, str):
+        return jsonify(error="job_text is required"), 400
+    if 'candidates' in data:
+        return jsonify(error="candidates are no longer accepted: parse resumes with a "
+                             "resume_id and pass their ids as candidate_ids"), 400
+    candidate_ids = data.get('candidate_ids')
+    if candidate_ids is not None and not isinstance(candidate_ids, list):
+        return jsonify(error="candidate_ids must be a list"), 400
+
+    try:
+        page = int(data.get('page', 1))
+        page_size = int(data.get('page_size', NLPConfig.RANKING_PAGE_SIZE))
+        top_n = int(data.get('top_n', NLPConfig.RANKING_TOP_N))
+    except (TypeError, ValueError):
+        return jsonify(error="page, page_size and top_n must be integers"), 400
+
+    ranking = get_ranking_engine().rank(
+        job_text, job_skills=data.get('job_skills'), job_id=data.get('job_id'),
+        top_n=top_n, page=page, page_size=page_size, candidate_ids=candidate_ids)
+    return jsonify(**ranking)
+
+
+@app.route("/predict_labels", methods=["POST"])
+def predict_skill_labels():
+    """
+    Predict skill labels with the trained classifier.
+    Body: texts (list of strings) or text, optional threshold and top_k.
+    Returns one list of {label, probability} per text, best first.
+    """
+    data = request.get_json(silent=True) or {}
+    texts = data.get('texts')
+    if texts is None and isinstance(data.get('text'), str):
+        texts = [data['text']]
+    if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+        return jsonify(error="texts must be a list of strings"), 400
+    if len(texts) > NLPConfig.LABEL_MAX_TEXTS:
+        return jsonify(error=f"At most {NLPConfig.LABEL_MAX_TEXTS} texts per request"), 400
+    try:
+        threshold = float(data.get('threshold', NLPConfig.LABEL_THRESHOLD))
+        top_k = int(data.get('top_k', NLPConfig.LABEL_TOP_K))
+    except (TypeError, ValueError):
+        return jsonify(error="threshold must be a number and top_k an integer"), 400
+
+    try:
+        predictions = predict_labels(texts, threshold, top_k)
+    except (FileNotFoundError, ModelUnavailableError) as e:
+        return jsonify(error=str(e)), 503
+    return jsonify(predictions=predictions, count=len(predictions))
+
+
+@app.route("/skills/search", methods=["POST"])
+def search_skills():
+    """
+    Query the skill index of parsed resumes.
+    Body: optional query (boolean filter, e.g. "kubernetes AND (go OR rust)"),
+    optional job_skills (list, or {skill: weight} to rank by weighted
+    overlap), optional top_k. At least one of query / job_skills is required.
+    """
+    data = request.get_json(silent=True) or {}
+    query = data.get('query')
+    job_skills = data.get('job_skills')
+    if not query and not job_skills:
+        return jsonify(error="query or job_skills is required"), 400
+    if job_skills is not None and not isinstance(job_skills, (list, dict)):
+        return jsonify(error="job_skills must be a list or an object"), 400
+    try:
+        top_k = int(data.get('top_k', NLPConfig.RANKING_PAGE_SIZE))
+    except (TypeError, ValueError):
+        return jsonify(error="top_k must be an integer"), 400
+
+    index = get_skill_index()
+    try:
+        if job_skills:
+            scored, total = index.score(job_skills, top_k=max(1, top_k),
+                                        query=query or None, with_total=True)
+            return jsonify(total=total,
+                           results=[{'id': i, 'score': s} for i, s in scored])
+        matches = index.search(query)
+    except ValueError as e:
+        return jsonify(error=f"Invalid query: {e}"), 400
+    return jsonify(total=len(matches), results=[{'id': i} for i in matches[:max(1, top_k)]])
+
+
+@app.route("/skills/index/<resume_id>", methods=["DELETE"])
+def remove_from_skill_index(resume_id):
+    """Remove a resume from the skill index and the candidate pool."""
+    if not get_skill_index().remove(resume_id):
+        return jsonify(error="Resume not indexed"), 404
+    get_ranking_engine().remove(resume_id)
+    return jsonify(id=resume_id, deleted=True)
+
+
+@app.route("/parse_batch", methods=["POST"])
+def parse_resume_batch_endpoint():
+    """
+    API Endpoint to parse many resumes in one request.
+    Streams back one JSON object per line (NDJSON) as each resume finishes.
+    """
+    data = request.get_json(silent=True) or {}
+    file_urls = data.get('file_urls')
+
+    if not isinstance(file_urls, list) or not file_urls:
+        return jsonify(error="file_urls must be a non-empty list"), 400
+    if not all(isinstance(u, str) and u for u in file_urls):
+        return jsonify(error="file_urls must only contain URL strings"), 400
+    if len(file_urls) > NLPConfig.BATCH_MAX_URLS:
+        return jsonify(
+            error=f"Too many file_urls (max {NLPConfig.BATCH_MAX_URLS})"), 413
+    try:
+        options = extraction_options(data)
+    except (TypeError, ValueError):
+        return jsonify(error="max_pages and max_chars must be integers"), 400
+
+    print(f"Processing batch of {len(file_urls)} files")
+
+    def generate():
+        for item in parse_resume_batch(file_urls, options):
+            yield json.dumps(item) + "\n"
+
+    return Response(generate(), mimetype="application/x-ndjson")
 
 
 if __name__ == "__main__":
     debug = os.getenv('FLASK_DEBUG', '0') == '1'
     port = int(os.getenv('PORT', '5001'))
+    # Resume jobs left queued by a previous run (only in the reloader child
+    # when debugging, so they are not processed twice)
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        get_job_workers()
+        get_readiness().start()
     app.run(port=port, debug=debug)
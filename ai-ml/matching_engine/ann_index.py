@@ -0,0 +1,484 @@
+"""Approximate nearest-neighbour search over embeddings (pure NumPy/SciPy).
+
+``IVFIndex`` is an inverted-file index: a spherical k-means coarse quantizer
+splits the vectors into ``n_lists`` cells, and a query only scans the
+``nprobe`` cells whose centroids are closest to it. With ``pq_subvectors`` set,
+vectors are stored as product-quantized residuals (one byte per subvector)
+and scored with lookup tables instead of full dot products, which cuts memory
+by ~4 * dim / pq_subvectors.
+
+Vectors are L2-normalised on the way in, so scores approximate cosine
+similarity, matching ``similarity_calculator.rank_by_matrix``.
+
+The service's candidate index (``get_candidate_ann_index``) is built offline
+by scripts/build_ann_index.py and reloaded when that file changes. Inserts
+and deletes the service makes in between are appended to a journal next to
+it (``<index>.log``) and replayed on top of every load, so they survive a
+restart or a reload.
+"""
+from __future__ import annotations
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import scipy.sparse as sp
+
+from config import NLPConfig
+from matching_engine.similarity_calculator import (
+    normalize_rows, rank_by_matrix, top_k_indices)
+
+_ASSIGN_CHUNK = 16384
+
+
+def _assign(x: np.ndarray, centroids: np.ndarray, spherical: bool) -> np.ndarray:
+    """Index of the nearest centroid for each row of x (chunked to bound memory)."""
+    out = np.empty(len(x), dtype=np.int64)
+    c_sq = None if spherical else (centroids ** 2).sum(axis=1)
+    for start in range(0, len(x), _ASSIGN_CHUNK):
+        chunk = x[start:start + _ASSIGN_CHUNK]
+        dots = chunk @ centroids.T
+        if spherical:
+            out[start:start + len(chunk)] = dots.argmax(axis=1)
+        else:
+            out[start:start + len(chunk)] = (c_sq - 2.0 * dots).argmin(axis=1)
+    return out
+
+
+def _kmeans(x: np.ndarray, k: int, n_iter: int, rng: np.random.Generator,
+            spherical: bool) -> np.ndarray:
+    """Lloyd's k-means; spherical mode keeps centroids on the unit sphere."""
+    if len(x) < k:
+        raise ValueError(f"Need at least {k} training vectors, got {len(x)}")
+    centroids = x[rng.choice(len(x), size=k, replace=False)].copy()
+    for _ in range(n_iter):
+        assign = _assign(x, centroids, spherical)
+        # Per-centroid sums as one sparse product instead of a Python loop
+        membership = sp.csr_matrix(
+            (np.ones(len(x), dtype=np.float32), (assign, np.arange(len(x)))),
+            shape=(k, len(x)))
+        sums = np.asarray(membership @ x, dtype=np.float32)
+        counts = np.bincount(assign, minlength=k).astype(np.float32)
+        empty = counts == 0
+        if empty.any():
+            # Re-seed empty cells with random points
+            sums[empty] = x[rng.choice(len(x), size=int(empty.sum()), replace=False)]
+            counts[empty] = 1.0
+        centroids = sums / counts[:, None]
+        if spherical:
+            centroids = normalize_rows(centroids)
+    return centroids.astype(np.float32)
+
+
+class IVFIndex:
+    """IVF (optionally IVF-PQ) index with incremental inserts and save/load."""
+
+    def __init__(self, dim: int, n_lists: int = 1024, pq_subvectors: int = 0,
+                 pq_bits: int = 8, nprobe: int = 16, seed: int = 0):
+        if pq_subvectors and dim % pq_subvectors:
+            raise ValueError("dim must be divisible by pq_subvectors")
+        if not 1 <= pq_bits <= 8:
+            raise ValueError("pq_bits must be between 1 and 8")
+        self.dim = dim
+        self.n_lists = n_lists
+        self.pq_subvectors = pq_subvectors
+        self.pq_bits = pq_bits
+        self.nprobe = nprobe
+        self.seed = seed
+        self.centroids: Optional[np.ndarray] = None
+        self.codebooks: Optional[np.ndarray] = None  # (m, ksub, dsub)
+        self._lock = threading.RLock()
+        self._ids: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._alive = np.zeros(0, dtype=bool)
+        # Per list: chunks of internal positions and of vectors/codes
+        self._list_pos: List[List[np.ndarray]] = []
+        self._list_data: List[List[np.ndarray]] = []
+        # Bytes of the update journal already reflected in a saved index
+        self.journal_offset = 0
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __contains__(self, item_id: str) -> bool:
+        return str(item_id) in self._positions
+
+    # -- training / insertion ----------------------------------------------
+
+    def train(self, vectors: np.ndarray, n_iter: int = 20,
+              sample_size: int = 100_000) -> None:
+        """Fit the coarse quantizer (and PQ codebooks) on a sample of vectors.
+
+        Training resets the index; add the vectors afterwards.
+        """
+        rng = np.random.default_rng(self.seed)
+        x = normalize_rows(vectors)
+        if len(x) > sample_size:
+            x = x[rng.choice(len(x), size=sample_size, replace=False)]
+        centroids = _kmeans(x, self.n_lists, n_iter, rng, spherical=True)
+
+        codebooks = None
+        if self.pq_subvectors:
+            residuals = x - centroids[_assign(x, centroids, True)]
+            m, dsub = self.pq_subvectors, self.dim // self.pq_subvectors
+            ksub = min(2 ** self.pq_bits, len(x))
+            codebooks = np.empty((m, ksub, dsub), dtype=np.float32)
+            for j in range(m):
+                sub = np.ascontiguousarray(residuals[:, j * dsub:(j + 1) * dsub])
+                codebooks[j] = _kmeans(sub, ksub, n_iter, rng, spherical=False)
+
+        with self._lock:
+            self.centroids = centroids
+            self.codebooks = codebooks
+            self._list_pos = [[] for _ in range(self.n_lists)]
+            self._list_data = [[] for _ in range(self.n_lists)]
+            self._ids, self._positions = [], {}
+            self._alive = np.zeros(0, dtype=bool)
+
+    def _encode(self, residuals: np.ndarray) -> np.ndarray:
+        m, dsub = self.pq_subvectors, self.dim // self.pq_subvectors
+        codes = np.empty((len(residuals), m), dtype=np.uint8)
+        for j in range(m):
+            sub = np.ascontiguousarray(residuals[:, j * dsub:(j + 1) * dsub])
+            codes[:, j] = _assign(sub, self.codebooks[j], spherical=False)
+        return codes
+
+    def add(self, ids: Sequence[str], vectors: np.ndarray) -> None:
+        """Insert vectors; an id that is already indexed is replaced."""
+        if not self.is_trained:
+            raise RuntimeError("Index must be trained before adding vectors")
+        if len(ids) != len(vectors):
+            raise ValueError("ids and vectors must have the same length")
+        if len(ids) == 0:
+            return
+        x = normalize_rows(vectors)
+        lists = _assign(x, self.centroids, spherical=True)
+        data = self._encode(x - self.centroids[lists]) if self.pq_subvectors else x
+
+        with self._lock:
+            self.remove(ids)
+            start = len(self._ids)
+            positions = np.arange(start, start + len(ids), dtype=np.int64)
+            for item_id, pos in zip(ids, positions):
+                self._ids.append(str(item_id))
+                self._positions[str(item_id)] = int(pos)
+            self._alive = np.concatenate([self._alive, np.ones(len(ids), dtype=bool)])
+
+            order = np.argsort(lists, kind='stable')
+            bounds = np.searchsorted(lists[order], np.arange(self.n_lists + 1))
+            for cell in np.unique(lists):
+                sel = order[bounds[cell]:bounds[cell + 1]]
+                self._list_pos[cell].append(positions[sel])
+                self._list_data[cell].append(data[sel])
+
+    def remove(self, ids: Sequence[str]) -> int:
+        """Drop ids from search results. Returns how many were present."""
+        removed = 0
+        with self._lock:
+            for item_id in ids:
+                pos = self._positions.pop(str(item_id), None)
+                if pos is not None:
+                    self._alive[pos] = False
+                    removed += 1
+        return removed
+
+    def _cell(self, cell: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Concatenate a cell's chunks in place so searches touch one array."""
+        pos_chunks, data_chunks = self._list_pos[cell], self._list_data[cell]
+        if len(pos_chunks) > 1:
+            self._list_pos[cell] = pos_chunks = [np.concatenate(pos_chunks)]
+            self._list_data[cell] = data_chunks = [np.concatenate(data_chunks)]
+        if not pos_chunks:
+            return np.empty(0, dtype=np.int64), None
+        return pos_chunks[0], data_chunks[0]
+
+    # -- search ---------------------------------------------------------------
+
+    def search(self, query: np.ndarray, top_k: int = 10, nprobe: Optional[int] = None,
+               refine_factor: int = 1,
+               vector_lookup: Optional[Callable[[List[str]], np.ndarray]] = None
+               ) -> Tuple[List[str], np.ndarray]:
+        """Return ``(ids, scores)`` of the approximate top_k for one query.
+
+        With ``vector_lookup`` (e.g. ``lambda ids: store.get_many(ids)[1]``)
+        and ``refine_factor > 1``, the best ``top_k * refine_factor`` PQ hits
+        are re-scored with their exact vectors, which recovers most of the
+        recall lost to quantization.
+        """
+        if not self.is_trained:
+            raise RuntimeError("Index is not trained")
+        nprobe = min(nprobe or self.nprobe, self.n_lists)
+        q = normalize_rows(query)[0]
+        coarse = self.centroids @ q
+        cells = top_k_indices(coarse, nprobe)
+
+        if self.pq_subvectors:
+            m, dsub = self.pq_subvectors, self.dim // self.pq_subvectors
+            # table[j, k] = <q_j, codebook_j[k]>, shared by every cell
+            table = np.einsum('jkd,jd->jk', self.codebooks, q.reshape(m, dsub))
+            cols = np.arange(m)
+
+        pos_parts, score_parts = [], []
+        with self._lock:
+            for cell in cells:
+                pos, data = self._cell(int(cell))
+                if len(pos) == 0:
+                    continue
+                if self.pq_subvectors:
+                    scores = coarse[cell] + table[cols, data].sum(axis=1)
+                else:
+                    scores = data @ q
+                pos_parts.append(pos)
+                score_parts.append(scores)
+            alive = self._alive
+            ids = self._ids
+
+        if not pos_parts:
+            return [], np.empty(0, dtype=np.float32)
+        pos = np.concatenate(pos_parts)
+        scores = np.concatenate(score_parts).astype(np.float32)
+        keep = alive[pos]
+        pos, scores = pos[keep], scores[keep]
+        refine = vector_lookup is not None and refine_factor > 1
+        best = top_k_indices(scores, top_k * refine_factor if refine else top_k)
+        found = [ids[p] for p in pos[best]]
+        if not refine:
+            return found, scores[best]
+        exact = normalize_rows(vector_lookup(found)) @ q
+        best = top_k_indices(exact, top_k)
+        return [found[i] for i in best], exact[best]
+
+    # -- persistence ----------------------------------------------------------
+
+    def save(self, path: Union[str, Path], journal_offset: int = 0) -> None:
+        """Write the index to a single ``.npz`` file.
+
+        ``journal_offset`` is the size of the update journal when the vectors
+        were read; a load replays only the journal after it.
+        """
+        with self._lock:
+            cells = [self._cell(c) for c in range(self.n_lists)]
+            offsets = np.zeros(self.n_lists + 1, dtype=np.int64)
+            offsets[1:] = np.cumsum([len(p) for p, _ in cells])
+            width = self.pq_subvectors or self.dim
+            dtype = np.uint8 if self.pq_subvectors else np.float32
+            data = [d for _, d in cells if d is not None]
+            arrays = {
+                'config': np.array([self.dim, self.n_lists, self.pq_subvectors,
+                                    self.pq_bits, self.nprobe, self.seed], dtype=np.int64),
+                'centroids': self.centroids,
+                'codebooks': self.codebooks if self.codebooks is not None
+                else np.zeros((0, 0, 0), dtype=np.float32),
+                'ids': np.array(self._ids, dtype=str),
+                'alive': self._alive,
+                'offsets': offsets,
+                'positions': np.concatenate([p for p, _ in cells]) if offsets[-1]
+                else np.empty(0, dtype=np.int64),
+                'data': np.concatenate(data) if data
+                else np.empty((0, width), dtype=dtype),
+                'journal_offset': np.array(journal_offset, dtype=np.int64),
+            }
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + '.tmp.npz')
+        np.savez(tmp, **arrays)
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> 'IVFIndex':
+        with np.load(path, allow_pickle=False) as f:
+            dim, n_lists, pq_m, pq_bits, nprobe, seed = (int(v) for v in f['config'])
+            index = cls(dim, n_lists, pq_m, pq_bits, nprobe, seed)
+            index.centroids = f['centroids']
+            index.codebooks = f['codebooks'] if pq_m else None
+            index._ids = f['ids'].tolist()
+            index._alive = f['alive'].copy()
+            offsets, positions, data = f['offsets'], f['positions'], f['data']
+            if 'journal_offset' in f.files:
+                index.journal_offset = int(f['journal_offset'])
+        index._positions = {item_id: pos for pos, item_id in enumerate(index._ids)
+                            if index._alive[pos]}
+        index._list_pos = [[positions[offsets[c]:offsets[c + 1]]] for c in range(n_lists)]
+        index._list_data = [[data[offsets[c]:offsets[c + 1]]] for c in range(n_lists)]
+        return index
+
+
+def build_index_from_store(store, n_lists: Optional[int] = None,
+                           pq_subvectors: Optional[int] = None) -> IVFIndex:
+    """Train an index on every vector of an ``EmbeddingStore`` and add them all."""
+    ids, matrix = store.matrix()
+    if n_lists is None:
+        # ~sqrt(N) cells is the usual starting point
+        n_lists = max(1, min(NLPConfig.ANN_N_LISTS, int(np.sqrt(len(ids)))))
+    if pq_subvectors is None:
+        pq_subvectors = NLPConfig.ANN_PQ_SUBVECTORS
+    index = IVFIndex(matrix.shape[1], n_lists=n_lists, pq_subvectors=pq_subvectors,
+                     nprobe=NLPConfig.ANN_NPROBE)
+    index.train(matrix)
+    index.add(ids, matrix)
+    return index
+
+
+_candidate_index: Optional[IVFIndex] = None
+_candidate_index_stamp: Optional[Tuple[int, int]] = None
+_candidate_index_checked = float('-inf')
+# Guards swapping the index and journalling updates; loads take the other one
+_candidate_index_lock = threading.Lock()
+_candidate_reload_lock = threading.Lock()
+
+
+def candidate_journal_path(index_path: Union[str, Path]) -> Path:
+    """The update journal kept next to a saved candidate index."""
+    index_path = Path(index_path)
+    return index_path.with_name(index_path.name + '.log')
+
+
+def _file_stamp(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _replay_journal(index: IVFIndex, journal: Path, store) -> None:
+    """Apply the updates journalled after the index was built (latest per id wins)."""
+    if not journal.exists():
+        return
+    with open(journal, 'rb') as f:
+        size = f.seek(0, os.SEEK_END)
+        # A journal shorter than the offset was reset; replay all of it
+        f.seek(index.journal_offset if index.journal_offset <= size else 0)
+        data = f.read()
+    latest: Dict[str, str] = {}
+    for line in data.decode('utf-8', errors='replace').splitlines():
+        try:
+            op, item_id = json.loads(line)
+        except ValueError:
+            # A torn final line from a crash mid-append; ignore it.
+            continue
+        latest[item_id] = op
+    index.remove([i for i, op in latest.items() if op == '-'])
+    # Re-read added vectors from the store: the latest version, and none
+    # for ids deleted from it since
+    added = [i for i, op in latest.items() if op == '+']
+    found, matrix = store.get_many(added)
+    index.remove(sorted(set(added) - set(found)))
+    if found and matrix.shape[1] != index.dim:
+        print(f"Skipping {len(found)} journalled ANN inserts: store holds "
+              f"{matrix.shape[1]}-d vectors, the index {index.dim}-d")
+    elif found:
+        index.add(found, matrix)
+
+
+def _reload_candidate_index() -> None:
+    global _candidate_index, _candidate_index_stamp
+    from matching_engine.embedding_store import get_embedding_store
+
+    path = Path(NLPConfig.ANN_INDEX_PATH)
+    stamp = _file_stamp(path)
+    if stamp == _candidate_index_stamp:
+        return
+    index = None
+    if stamp is not None:
+        try:
+            index = IVFIndex.load(path)
+        except Exception as e:
+            # Keep serving the previous index until the file changes again
+            print(f"Could not load ANN index {path}: {e}")
+            _candidate_index_stamp = stamp
+            return
+    with _candidate_index_lock:
+        if index is not None:
+            _replay_journal(index, candidate_journal_path(path), get_embedding_store('resumes'))
+        _candidate_index = index
+        _candidate_index_stamp = stamp
+    if index is not None:
+        print(f"Loaded ANN index {path} ({len(index)} vectors)")
+
+
+def get_candidate_ann_index() -> Optional[IVFIndex]:
+    """Return the saved candidate index (``NLPConfig.ANN_INDEX_PATH``), if built.
+
+    The file is checked at most every ``ANN_RELOAD_INTERVAL_SECONDS``; an
+    index built or rebuilt with scripts/build_ann_index.py is loaded and
+    swapped in without a restart, with the journalled updates applied.
+    """
+    global _candidate_index_checked
+    interval = NLPConfig.ANN_RELOAD_INTERVAL_SECONDS
+    if time.monotonic() - _candidate_index_checked < interval:
+        return _candidate_index
+    with _candidate_reload_lock:
+        if time.monotonic() - _candidate_index_checked >= interval:
+            _reload_candidate_index()
+            _candidate_index_checked = time.monotonic()
+    return _candidate_index
+
+
+def _journal_update(op: str, item_id: str, index_update: Callable[[IVFIndex], None]) -> None:
+    get_candidate_ann_index()
+    journal = candidate_journal_path(NLPConfig.ANN_INDEX_PATH)
+    with _candidate_index_lock:
+        journal.parent.mkdir(parents=True, exist_ok=True)
+        with open(journal, 'a', encoding='utf-8') as f:
+            f.write(json.dumps([op, str(item_id)]) + '\n')
+        if _candidate_index is not None:
+            index_update(_candidate_index)
+
+
+def add_to_candidate_index(item_id: str, vector: np.ndarray) -> None:
+    """Insert (or replace) a candidate in the loaded index and journal it."""
+    _journal_update('+', item_id,
+                    lambda index: index.add([str(item_id)], np.asarray(vector)[None, :]))
+
+
+def remove_from_candidate_index(item_id: str) -> None:
+    """Drop a candidate from the loaded index and journal it."""
+    _journal_update('-', item_id, lambda index: index.remove([str(item_id)]))
+
+
+def _aligned_vectors(store, ids: List[str]) -> np.ndarray:
+    """One row per id; ids no longer in the store get a zero row (find_similar drops them)."""
+    found, matrix = store.get_many(ids)
+    if len(found) == len(ids):
+        return matrix
+    rows = {item_id: r for r, item_id in enumerate(found)}
+    out = np.zeros((len(ids), matrix.shape[1] or store.dim), dtype=np.float32)
+    for i, item_id in enumerate(ids):
+        if item_id in rows:
+            out[i] = matrix[rows[item_id]]
+    return out
+
+
+def find_similar(store, item_id: str, top_k: int = 10,
+                 nprobe: Optional[int] = None) -> Optional[List[Tuple[str, float]]]:
+    """Nearest neighbours of a stored item, excluding the item itself.
+
+    Uses the candidate ANN index when it has been built and falls back to an
+    exact scan of the store otherwise. Returns None if item_id is not stored.
+    """
+    query = store.get(item_id)
+    if query is None:
+        return None
+    index = get_candidate_ann_index()
+    if index is not None and len(index) > 0:
+        ids, scores = index.search(
+            query, top_k + 1, nprobe=nprobe,
+            refine_factor=NLPConfig.ANN_REFINE_FACTOR,
+            vector_lookup=lambda found: _aligned_vectors(store, found))
+    else:
+        all_ids, matrix = store.matrix()
+        if len(all_ids) == 0:
+            return []
+        idx, scores = rank_by_matrix(query, matrix, top_k + 1)
+        ids = [all_ids[i] for i in idx]
+    # The index can trail the store by a delete; never return what is gone
+    return [(i, float(s)) for i, s in zip(ids, scores)
+            if i != item_id and i in store][:top_k]
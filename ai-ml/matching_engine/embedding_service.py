@@ -1,18 +1,63 @@
-"""Embedding service: lazy-load SentenceTransformer and provide a single helper.
+"""Embedding service: lazy-load SentenceTransformer and provide encoding helpers.
 
 This module intentionally performs lazy imports so the ai-ml package can be used
 with a minimal footprint when embeddings are not required.
+
+``get_text_embeddings`` encodes many texts in length-sorted micro-batches.
+``get_text_embedding`` encodes one text; when coalescing is enabled, concurrent
+single-text callers are grouped into one batch by a background thread.
+
+On CPU, ``EMBEDDING_BACKEND=int8`` quantizes the transformer's linear layers
+to int8 with dynamic (per-batch) activation scales. Matrix multiplies
+dominate encoding time, so this gives a multiple of the float throughput per
+core, at the cost of a small drift in the vectors. ``EMBEDDING_THREADS`` and
+``EMBEDDING_MAX_SEQ_LENGTH`` bound the threads and tokens used per batch.
 """
 from __future__ import annotations
 import numpy as np
-from typing import Optional
+from concurrent.futures import Future
+from typing import List, Optional, Sequence, Tuple
 from functools import lru_cache
+import queue
+import threading
+import time
 
 from config import NLPConfig
+from metrics import record_failure, stage
 
 
-@lru_cache(maxsize=1)
-def _load_embedder():
+BACKENDS = ('float', 'int8')
+
+
+def quantize_embedder(model):
+    """Replace the model's torch.nn.Linear layers with dynamic int8 versions (in place)."""
+    import torch
+
+    engines = torch.backends.quantized.supported_engines
+    # fbgemm on x86, qnnpack on ARM
+    for engine in ('fbgemm', 'x86', 'qnnpack'):
+        if engine in engines:
+            torch.backends.quantized.engine = engine
+            break
+    return torch.quantization.quantize_dynamic(
+        model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+def load_embedder(backend: Optional[str] = None, max_seq_length: Optional[int] = None,
+                  threads: Optional[int] = None, device: Optional[str] = None):
+    """Load a new SentenceTransformer with the given backend (defaults from NLPConfig).
+
+    Not cached: the service uses _load_embedder; this is for tools that need
+    several variants side by side (e.g. float vs int8 in the benchmark).
+    """
+    backend = backend or NLPConfig.EMBEDDING_BACKEND
+    device = device or NLPConfig.EMBEDDING_DEVICE
+    max_seq_length = NLPConfig.EMBEDDING_MAX_SEQ_LENGTH if max_seq_length is None else max_seq_length
+    threads = NLPConfig.EMBEDDING_THREADS if threads is None else threads
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{backend}' (expected one of {BACKENDS})")
+    if backend == 'int8' and device != 'cpu':
+        raise ValueError("The int8 embedding backend only runs on CPU")
     try:
         from sentence_transformers import SentenceTransformer
     except Exception as e:
@@ -20,16 +65,129 @@ def _load_embedder():
             "sentence-transformers is not installed or failed to import. "
             "Install the optional requirements to enable embeddings.") from e
 
-    model = SentenceTransformer(
-        NLPConfig.HF_EMBEDDING_MODEL, device=NLPConfig.EMBEDDING_DEVICE)
+    if threads:
+        import torch
+        # Process-wide: applies to every model in this process
+        torch.set_num_threads(threads)
+    model = SentenceTransformer(NLPConfig.HF_EMBEDDING_MODEL, device=device)
+    if max_seq_length:
+        model.max_seq_length = max_seq_length
+    if backend == 'int8':
+        quantize_embedder(model)
+    model.eval()
     return model
 
 
-def get_text_embedding(text: str) -> np.ndarray:
-    """Return a 1D numpy array embedding for the provided text.
+@lru_cache(maxsize=1)
+def _load_embedder():
+    try:
+        model = load_embedder()
+    except RuntimeError:
+        record_failure('embedding', 'unavailable')
+        raise
+    print(f"Loaded embedding model {NLPConfig.HF_EMBEDDING_MODEL} "
+          f"({NLPConfig.EMBEDDING_BACKEND}, max_seq_length={model.max_seq_length})")
+    return model
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0.0] = 1.0
+    matrix /= norms
+    return matrix
+
+
+def get_text_embeddings(texts: Sequence[str], batch_size: Optional[int] = None) -> np.ndarray:
+    """Return a contiguous (len(texts), dim) float32 matrix of L2-normalised embeddings.
 
+    Texts are sorted by length and encoded in micro-batches of ``batch_size``,
+    so each batch pads to similar lengths. Rows come back in input order.
     Raises RuntimeError if sentence-transformers/torch is not available.
     """
     model = _load_embedder()
-    emb = model.encode(text, show_progress_bar=False)
-    return np.array(emb, dtype=np.float32)
+    if batch_size is None:
+        batch_size = NLPConfig.EMBEDDING_BATCH_SIZE
+    batch_size = max(1, batch_size)
+
+    n = len(texts)
+    if n == 0:
+        dim = model.get_sentence_embedding_dimension() or 0
+        return np.empty((0, dim), dtype=np.float32)
+
+    order = np.argsort([len(t) for t in texts], kind='stable')
+    out: Optional[np.ndarray] = None
+    with stage('embedding', texts=n):
+        for start in range(0, n, batch_size):
+            idx = order[start:start + batch_size]
+            emb = model.encode([texts[i] for i in idx], batch_size=len(idx),
+                               show_progress_bar=False, convert_to_numpy=True)
+            emb = np.asarray(emb, dtype=np.float32)
+            if out is None:
+                out = np.empty((n, emb.shape[1]), dtype=np.float32)
+            out[idx] = emb
+    return _normalize(out)
+
+
+class _EmbeddingBatcher:
+    """Collects single-text requests from many threads into batched encodes.
+
+    The worker thread takes the first waiting request, then keeps collecting
+    for up to ``max_wait`` seconds or until ``max_batch`` requests are queued,
+    and encodes them with one ``get_text_embeddings`` call.
+    """
+
+    def __init__(self, max_batch: int, max_wait: float):
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait)
+        self._queue: "queue.Queue[Tuple[str, Future]]" = queue.Queue()
+        self._thread = threading.Thread(
+            target=self._run, name='embedding-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, text: str) -> Future:
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def _collect(self) -> List[Tuple[str, Future]]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            try:
+                matrix = get_text_embeddings([text for text, _ in batch])
+            except BaseException as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for row, (_, future) in zip(matrix, batch):
+                future.set_result(row)
+
+
+@lru_cache(maxsize=1)
+def _get_batcher() -> _EmbeddingBatcher:
+    return _EmbeddingBatcher(
+        max_batch=NLPConfig.EMBEDDING_COALESCE_MAX_BATCH,
+        max_wait=NLPConfig.EMBEDDING_COALESCE_WAIT_MS / 1000.0)
+
+
+def get_text_embedding(text: str) -> np.ndarray:
+    """Return a 1D L2-normalised numpy array embedding for the provided text.
+
+    Raises RuntimeError if sentence-transformers/torch is not available.
+    """
+    if NLPConfig.EMBEDDING_COALESCE:
+        return _get_batcher().submit(text).result()
+    return get_text_embeddings([text])[0]
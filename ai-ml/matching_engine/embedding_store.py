@@ -0,0 +1,231 @@
+"""Persistent on-disk store of embeddings for candidates and jobs.
+
+Vectors live in a memory-mapped float32 matrix (``vectors.f32``). The mapping
+from item id to matrix row is kept in an append-only journal (``ids.log``)
+that is replayed on open, so an upsert or delete only appends one line
+instead of rewriting the whole id map. ``compact`` rewrites the journal when
+it has accumulated many superseded entries.
+
+Vectors are stored L2-normalised, so stored rows can be passed straight to
+``similarity_calculator.rank_by_matrix``.
+
+A store is safe to use from several threads of one process. Only one process
+should write to a given directory at a time.
+"""
+from __future__ import annotations
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+import json
+import os
+import threading
+
+import numpy as np
+
+from config import NLPConfig
+
+_META_FILE = 'meta.json'
+_VECTORS_FILE = 'vectors.f32'
+_JOURNAL_FILE = 'ids.log'
+
+
+class EmbeddingStore:
+    """Memory-mapped embedding matrix with incremental add/update/delete."""
+
+    def __init__(self, directory: Union[str, Path], dim: Optional[int] = None,
+                 initial_capacity: int = 1024):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._rows: Dict[str, int] = {}
+        self._free: List[int] = []
+        self._next_row = 0
+        self._journal_entries = 0
+        self._vectors: Optional[np.memmap] = None
+        self._initial_capacity = max(1, initial_capacity)
+
+        meta_path = self.directory / _META_FILE
+        if meta_path.exists():
+            meta = json.loads(meta_path.read_text())
+            self.dim = int(meta['dim'])
+            if dim is not None and dim != self.dim:
+                raise ValueError(
+                    f"Store at {self.directory} holds {self.dim}-d vectors, not {dim}-d")
+            self.capacity = int(meta['capacity'])
+            self._open_vectors()
+            self._replay_journal()
+        else:
+            self.dim = dim
+            self.capacity = 0
+            if dim is not None:
+                self._create(dim)
+
+    # -- public API ---------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, item_id: str) -> bool:
+        return str(item_id) in self._rows
+
+    def ids(self) -> List[str]:
+        with self._lock:
+            return list(self._rows)
+
+    def get(self, item_id: str) -> Optional[np.ndarray]:
+        """Return a copy of the stored (normalised) vector, or None."""
+        with self._lock:
+            row = self._rows.get(str(item_id))
+            if row is None:
+                return None
+            return np.array(self._vectors[row])
+
+    def get_many(self, item_ids: Iterable[str]) -> Tuple[List[str], np.ndarray]:
+        """Return ``(found_ids, matrix)`` for the ids that are present."""
+        with self._lock:
+            found = [str(i) for i in item_ids if str(i) in self._rows]
+            if not found:
+                return [], np.empty((0, self.dim or 0), dtype=np.float32)
+            rows = np.fromiter((self._rows[i] for i in found), dtype=np.int64,
+                               count=len(found))
+            return found, np.asarray(self._vectors[rows])
+
+    def matrix(self) -> Tuple[List[str], np.ndarray]:
+        """Return all live ids and their vectors as one contiguous matrix."""
+        with self._lock:
+            return self.get_many(list(self._rows))
+
+    def upsert(self, item_id: str, vector: np.ndarray) -> None:
+        self.upsert_many([item_id], np.asarray(vector, dtype=np.float32)[None, :])
+
+    def upsert_many(self, item_ids: Sequence[str], vectors: np.ndarray) -> None:
+        """Add or replace the vectors of ``item_ids`` (one row per id)."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or vectors.shape[0] != len(item_ids):
+            raise ValueError("vectors must be a 2D array with one row per id")
+        with self._lock:
+            if self.dim is None:
+                self._create(vectors.shape[1])
+            if vectors.shape[1] != self.dim:
+                raise ValueError(
+                    f"Expected {self.dim}-d vectors, got {vectors.shape[1]}-d")
+
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            norms[norms == 0.0] = 1.0
+            vectors = vectors / norms
+
+            lines = []
+            for item_id, vector in zip(item_ids, vectors):
+                item_id = str(item_id)
+                row = self._rows.get(item_id)
+                if row is None:
+                    row = self._allocate_row()
+                    self._rows[item_id] = row
+                    lines.append(json.dumps(['+', item_id, row]))
+                self._vectors[row] = vector
+            self._vectors.flush()
+            self._append_journal(lines)
+
+    def delete(self, item_id: str) -> bool:
+        """Remove an item. Returns False if it was not present."""
+        with self._lock:
+            row = self._rows.pop(str(item_id), None)
+            if row is None:
+                return False
+            self._vectors[row] = 0.0
+            self._free.append(row)
+            self._append_journal([json.dumps(['-', str(item_id)])])
+            return True
+
+    def compact(self) -> None:
+        """Rewrite the journal so it holds exactly one line per live item."""
+        with self._lock:
+            if self.dim is None:
+                return
+            tmp = self.directory / (_JOURNAL_FILE + '.tmp')
+            with open(tmp, 'w', encoding='utf-8') as f:
+                for item_id, row in self._rows.items():
+                    f.write(json.dumps(['+', item_id, row]) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.directory / _JOURNAL_FILE)
+            self._journal_entries = len(self._rows)
+
+    # -- internals ----------------------------------------------------------
+
+    def _create(self, dim: int) -> None:
+        self.dim = int(dim)
+        self.capacity = self._initial_capacity
+        with open(self.directory / _VECTORS_FILE, 'wb') as f:
+            f.truncate(self.capacity * self.dim * 4)
+        self._write_meta()
+        (self.directory / _JOURNAL_FILE).touch()
+        self._open_vectors()
+
+    def _open_vectors(self) -> None:
+        self._vectors = np.memmap(
+            self.directory / _VECTORS_FILE, dtype=np.float32, mode='r+',
+            shape=(self.capacity, self.dim))
+
+    def _write_meta(self) -> None:
+        tmp = self.directory / (_META_FILE + '.tmp')
+        tmp.write_text(json.dumps({'dim': self.dim, 'capacity': self.capacity}))
+        os.replace(tmp, self.directory / _META_FILE)
+
+    def _grow(self) -> None:
+        self._vectors.flush()
+        self._vectors = None
+        self.capacity *= 2
+        with open(self.directory / _VECTORS_FILE, 'r+b') as f:
+            f.truncate(self.capacity * self.dim * 4)
+        self._write_meta()
+        self._open_vectors()
+
+    def _allocate_row(self) -> int:
+        if self._free:
+            return self._free.pop()
+        if self._next_row >= self.capacity:
+            self._grow()
+        row = self._next_row
+        self._next_row += 1
+        return row
+
+    def _append_journal(self, lines: List[str]) -> None:
+        if not lines:
+            return
+        with open(self.directory / _JOURNAL_FILE, 'a', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        self._journal_entries += len(lines)
+        if self._journal_entries > 2 * len(self._rows) + 1024:
+            self.compact()
+
+    def _replay_journal(self) -> None:
+        path = self.directory / _JOURNAL_FILE
+        if not path.exists():
+            return
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A torn final line from a crash mid-append; ignore it.
+                    continue
+                self._journal_entries += 1
+                if entry[0] == '+':
+                    self._rows[entry[1]] = int(entry[2])
+                else:
+                    self._rows.pop(entry[1], None)
+        used = set(self._rows.values())
+        self._next_row = max(used) + 1 if used else 0
+        self._free = [r for r in range(self._next_row) if r not in used]
+
+
+@lru_cache(maxsize=None)
+def get_embedding_store(kind: str) -> EmbeddingStore:
+    """Return the process-wide store for ``'resumes'`` or ``'jobs'``."""
+    if kind not in ('resumes', 'jobs'):
+        raise ValueError(f"Unknown embedding store: {kind}")
+    return EmbeddingStore(Path(NLPConfig.EMBEDDING_STORE_DIR) / kind)
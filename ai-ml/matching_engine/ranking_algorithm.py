@@ -0,0 +1,370 @@
+"""Two-stage candidate ranking: cheap retrieval, then full re-ranking.
+
+Stage one scores every candidate in the pool with a sparse TF-IDF cosine and
+the overlap between the job's and the candidate's skills. Both are a single
+sparse matrix product over the whole pool, so this stays cheap for hundreds of
+thousands of candidates.
+
+Stage two takes only the best ``top_n`` from stage one and computes the same
+weighted TF-IDF + embedding score as ``semantic_matcher.compute_match_score``,
+reading the candidates' stored embeddings (it never encodes or stores
+candidate texts). The result is a paginated top-k list.
+
+The process-wide pool (``get_ranking_engine``) is loaded once from the
+parse-result store and then kept up to date by /parse, like the skill index.
+"""
+from __future__ import annotations
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Sequence
+import threading
+
+import numpy as np
+import scipy.sparse as sp
+
+from config import NLPConfig
+from matching_engine.embedding_store import get_embedding_store
+from matching_engine.semantic_matcher import (
+    _load_tfidf_vectorizer, combine_scores, get_stored_or_encoded_embedding,
+    transform_tfidf)
+from matching_engine.similarity_calculator import (
+    sparse_cosine_scores, top_k_indices)
+from matching_engine.skill_index import get_skill_index
+from metrics import CACHE_LOOKUPS
+from resume_parser.result_store import ParseResultStore, get_result_store
+from resume_parser.skill_extractor import extract_skills
+
+# Candidates loaded from the parse-result store per TF-IDF transform
+_LOAD_BATCH = 1000
+
+
+def _normalize_skill(skill: str) -> str:
+    return skill.strip().lower()
+
+
+class RankingEngine:
+    """Ranks a pool of candidates against job postings.
+
+    Candidates are added (or replaced) with ``add_candidates`` and dropped
+    with ``remove``; the pool's TF-IDF and skill matrices are kept between
+    jobs, so only new candidates are vectorised. Candidate texts are not
+    kept. When the TF-IDF vectorizer is reloaded, the pool is re-vectorised
+    from ``text_source`` (ids -> texts); without one, stage one falls back to
+    skill overlap alone.
+
+    Safe to share between threads.
+    """
+
+    def __init__(self, tfidf_weight: float = 0.4, embedding_weight: float = 0.6,
+                 prefilter_tfidf_weight: float = 0.6, prefilter_skill_weight: float = 0.4,
+                 text_source: Optional[Callable[[Sequence[str]], Sequence[str]]] = None):
+        self.tfidf_weight = tfidf_weight
+        self.embedding_weight = embedding_weight
+        self.prefilter_tfidf_weight = prefilter_tfidf_weight
+        self.prefilter_skill_weight = prefilter_skill_weight
+        self.text_source = text_source
+        self._lock = threading.RLock()
+        self._clear()
+
+    def _clear(self) -> None:
+        # Row -> candidate id (None once replaced or removed), and back
+        self.ids: List[Optional[str]] = []
+        self._rows: Dict[str, int] = {}
+        # The vectorizer last seen, and the one the TF-IDF rows come from
+        # (None when ranking on skills only)
+        self._seen_vectorizer = None
+        self._vectorizer = None
+        self._tfidf_blocks: List[sp.csr_matrix] = []
+        self._tfidf: Optional[sp.csr_matrix] = None
+        self._skill_vocab: Dict[str, int] = {}
+        self._skill_rows: List[List[int]] = []
+        self._skill_matrix: Optional[sp.csr_matrix] = None
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, candidate_id: str) -> bool:
+        return str(candidate_id) in self._rows
+
+    def set_candidates(self, ids: Sequence[str], texts: Sequence[str],
+                       skills: Optional[Sequence[Sequence[str]]] = None) -> None:
+        """Replace the candidate pool."""
+        with self._lock:
+            self._clear()
+            self.add_candidates(ids, texts, skills)
+
+    def add_candidates(self, ids: Sequence[str], texts: Sequence[str],
+                       skills: Optional[Sequence[Sequence[str]]] = None) -> None:
+        """Add candidates to the pool, replacing any with the same id.
+
+        ``skills`` are the parsed skills of each candidate; when omitted they
+        are extracted from the texts.
+        """
+        if len(ids) != len(texts):
+            raise ValueError("ids and texts must have the same length")
+        if skills is None:
+            skills = [extract_skills(t) for t in texts]
+        elif len(skills) != len(ids):
+            raise ValueError("skills must have one entry per candidate")
+        ids = [str(i) for i in ids]
+        # A later duplicate in the same batch wins
+        last = {candidate_id: n for n, candidate_id in enumerate(ids)}
+        keep = sorted(last.values())
+
+        with self._lock:
+            self._sync_vectorizer()
+            tfidf = None
+            if self._vectorizer is not None:
+                tfidf = transform_tfidf([texts[n] for n in keep], self._vectorizer)
+            for candidate_id in last:
+                self._drop(candidate_id)
+            if tfidf is not None:
+                self._tfidf_blocks.append(tfidf)
+                self._tfidf = None
+            for n in keep:
+                row = set()
+                for skill in skills[n]:
+                    skill = _normalize_skill(skill)
+                    if skill:
+                        row.add(self._skill_vocab.setdefault(skill, len(self._skill_vocab)))
+                self._rows[ids[n]] = len(self.ids)
+                self.ids.append(ids[n])
+                self._skill_rows.append(sorted(row))
+            self._skill_matrix = None
+            self._maybe_compact()
+
+    def remove(self, candidate_id: str) -> bool:
+        """Drop a candidate from the pool. Returns False if it was not in it."""
+        with self._lock:
+            if not self._drop(str(candidate_id)):
+                return False
+            self._maybe_compact()
+            return True
+
+    def _drop(self, candidate_id: str) -> bool:
+        row = self._rows.pop(candidate_id, None)
+        if row is None:
+            return False
+        # The row stays in the matrices (masked out) until the next compaction
+        self.ids[row] = None
+        return True
+
+    def _maybe_compact(self) -> None:
+        if len(self.ids) > 1024 and len(self._rows) < len(self.ids) // 2:
+            self._compact()
+
+    def _compact(self) -> None:
+        alive = np.fromiter(self._rows.values(), dtype=np.int64, count=len(self._rows))
+        alive.sort()
+        tfidf = self._tfidf_csr()
+        self._tfidf_blocks = [] if tfidf is None else [tfidf[alive]]
+        self._tfidf = None
+        self._skill_rows = [self._skill_rows[row] for row in alive]
+        self._skill_matrix = None
+        self.ids = [self.ids[row] for row in alive]
+        self._rows = {candidate_id: row for row, candidate_id in enumerate(self.ids)}
+
+    def _sync_vectorizer(self) -> None:
+        """Re-vectorise the pool when the TF-IDF artifact has been reloaded."""
+        current = _load_tfidf_vectorizer()
+        if current is self._seen_vectorizer:
+            return
+        self._seen_vectorizer = current
+        self._vectorizer = None
+        self._tfidf_blocks, self._tfidf = [], None
+        if current is None:
+            return
+        if self.ids:
+            if self.text_source is None:
+                # The old rows cannot be re-vectorised and would not match
+                # new job rows; rank on skills only from here on
+                return
+            self._compact()
+            self._tfidf_blocks = [transform_tfidf(list(self.text_source(self.ids)), current)]
+        self._vectorizer = current
+
+    def _tfidf_csr(self) -> Optional[sp.csr_matrix]:
+        if self._tfidf is None and self._tfidf_blocks:
+            self._tfidf = (self._tfidf_blocks[0] if len(self._tfidf_blocks) == 1
+                           else sp.vstack(self._tfidf_blocks, format='csr'))
+            self._tfidf_blocks = [self._tfidf]
+        if self._tfidf is None or self._tfidf.shape[0] != len(self.ids):
+            return None
+        return self._tfidf
+
+    def _skills_csr(self) -> sp.csr_matrix:
+        if self._skill_matrix is None or self._skill_matrix.shape[1] != len(self._skill_vocab):
+            indptr = np.zeros(len(self._skill_rows) + 1, dtype=np.int64)
+            indptr[1:] = np.cumsum([len(r) for r in self._skill_rows])
+            indices = np.fromiter((c for r in self._skill_rows for c in r),
+                                  dtype=np.int32, count=int(indptr[-1]))
+            data = np.ones(len(indices), dtype=np.float32)
+            self._skill_matrix = sp.csr_matrix(
+                (data, indices, indptr),
+                shape=(len(self._skill_rows), max(1, len(self._skill_vocab))))
+        return self._skill_matrix
+
+    def _skill_overlap(self, job_skills: Sequence[str]) -> np.ndarray:
+        """Fraction of the job's skills each candidate row has."""
+        columns = {self._skill_vocab[s] for s in map(_normalize_skill, job_skills)
+                   if s in self._skill_vocab}
+        wanted = {s for s in map(_normalize_skill, job_skills) if s}
+        if not wanted or not columns:
+            return np.zeros(len(self.ids), dtype=np.float32)
+        job_vec = np.zeros(self._skills_csr().shape[1], dtype=np.float32)
+        job_vec[list(columns)] = 1.0
+        return (self._skills_csr() @ job_vec) / len(wanted)
+
+    def retrieve(self, job_text: str, job_skills: Optional[Sequence[str]] = None,
+                 top_n: Optional[int] = None,
+                 candidate_ids: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """Stage one: prefilter the pool, returning the best top_n.
+
+        ``candidate_ids`` restricts the pool; ids not in it are ignored.
+        Returns the retrieved candidate ``ids`` (best first) and arrays
+        ``prefilter_scores``, ``tfidf_scores`` and ``skill_scores``.
+        """
+        if top_n is None:
+            top_n = NLPConfig.RANKING_TOP_N
+        if job_skills is None:
+            job_skills = extract_skills(job_text)
+
+        with self._lock:
+            self._sync_vectorizer()
+            if candidate_ids is None:
+                rows = np.fromiter(self._rows.values(), dtype=np.int64, count=len(self._rows))
+            else:
+                rows = np.unique(np.fromiter(
+                    (self._rows[c] for c in map(str, candidate_ids) if c in self._rows),
+                    dtype=np.int64))
+            tfidf = self._tfidf_csr()
+            tfidf_scores = None
+            if tfidf is not None:
+                job_row = transform_tfidf([job_text], self._vectorizer)
+                tfidf_scores = sparse_cosine_scores(job_row, tfidf, normalized=True)[rows]
+            skill_scores = self._skill_overlap(job_skills)[rows]
+            ids = self.ids
+
+            prefilter = self.prefilter_skill_weight * skill_scores
+            if tfidf_scores is not None:
+                prefilter = prefilter + self.prefilter_tfidf_weight * tfidf_scores
+            idx = top_k_indices(prefilter, top_n)
+            return {
+                'ids': [ids[row] for row in rows[idx]],
+                'prefilter_scores': prefilter[idx],
+                'tfidf_scores': None if tfidf_scores is None else tfidf_scores[idx],
+                'skill_scores': skill_scores[idx],
+            }
+
+    def rank(self, job_text: str, job_skills: Optional[Sequence[str]] = None,
+             job_id: Optional[str] = None, top_n: Optional[int] = None,
+             page: int = 1, page_size: Optional[int] = None,
+             candidate_ids: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """Retrieve, re-rank the top_n with embeddings, and return one page.
+
+        Candidates without a stored embedding keep their TF-IDF score (or
+        their prefilter score when there is no vectorizer). The response
+        holds ``total`` (re-ranked candidates), ``page``, ``page_size`` and
+        ``results``: dicts with the candidate ``id``, its ``combined_score``
+        and the component scores.
+        """
+        if page_size is None:
+            page_size = NLPConfig.RANKING_PAGE_SIZE
+        page = max(1, page)
+        page_size = max(1, page_size)
+
+        stage_one = self.retrieve(job_text, job_skills, top_n, candidate_ids)
+        ids = stage_one['ids']
+        tfidf_scores = stage_one['tfidf_scores']
+
+        # Stage two: stored embeddings of the shortlisted candidates only
+        embedding_scores = None
+        has_embedding = np.zeros(len(ids), dtype=bool)
+        if ids:
+            found, matrix = get_embedding_store('resumes').get_many(ids)
+            CACHE_LOOKUPS.inc(len(found), cache='embedding', result='hit')
+            CACHE_LOOKUPS.inc(len(ids) - len(found), cache='embedding', result='miss')
+            if found:
+                try:
+                    job_emb = get_stored_or_encoded_embedding('jobs', job_id, job_text)
+                    norm = np.linalg.norm(job_emb)
+                    scores = dict(zip(found, matrix @ (job_emb / (norm if norm else 1.0))))
+                    embedding_scores = np.array([scores.get(i, 0.0) for i in ids],
+                                                dtype=np.float32)
+                    has_embedding = np.array([i in scores for i in ids], dtype=bool)
+                except Exception as e:
+                    print(f"Embedding re-rank unavailable, using TF-IDF only: {e}")
+
+        fallback = tfidf_scores if tfidf_scores is not None else stage_one['prefilter_scores']
+        combined = np.asarray(fallback, dtype=np.float32)
+        if embedding_scores is not None:
+            combined = np.where(has_embedding, combine_scores(
+                tfidf_scores, embedding_scores, self.tfidf_weight, self.embedding_weight),
+                combined)
+        order = np.argsort(-combined, kind='stable')
+
+        start = (page - 1) * page_size
+        results = []
+        for pos in order[start:start + page_size]:
+            item = {
+                'id': ids[pos],
+                'combined_score': float(combined[pos]),
+                'skill_score': float(stage_one['skill_scores'][pos]),
+            }
+            if tfidf_scores is not None:
+                item['tfidf_score'] = float(tfidf_scores[pos])
+            if has_embedding[pos]:
+                item['embedding_score'] = float(embedding_scores[pos])
+            results.append(item)
+
+        return {
+            'total': int(len(ids)),
+            'page': page,
+            'page_size': page_size,
+            'results': results,
+        }
+
+
+def _open_result_store() -> Optional[ParseResultStore]:
+    store = get_result_store()
+    if store is None and NLPConfig.PARSE_RESULT_STORE_ENABLED and \
+            NLPConfig.PARSE_RESULT_STORE_DIR.exists():
+        # Another process holds the writer lock; a snapshot is enough here
+        store = ParseResultStore(NLPConfig.PARSE_RESULT_STORE_DIR, read_only=True)
+    return store
+
+
+@lru_cache(maxsize=1)
+def get_ranking_engine() -> RankingEngine:
+    """Return the process-wide candidate pool.
+
+    Loaded from the parse-result store (resumes still in the skill index,
+    i.e. parsed with a resume_id and not removed), then fed by /parse.
+    """
+    store = _open_result_store()
+    if store is None:
+        return RankingEngine()
+
+    def texts_of(ids: Sequence[str]) -> List[str]:
+        rows = (store.get(i) for i in ids)
+        return [(row or {}).get('extracted_text') or '' for row in rows]
+
+    engine = RankingEngine(text_source=texts_of)
+    skill_index = get_skill_index()
+    batch: List[Dict[str, Any]] = []
+
+    def add(rows: List[Dict[str, Any]]) -> None:
+        engine.add_candidates([r['doc_id'] for r in rows],
+                              [r['extracted_text'] for r in rows],
+                              [r['extracted_skills'] for r in rows])
+
+    for row in store.iter_rows():
+        if row['doc_id'] not in skill_index:
+            continue
+        batch.append(row)
+        if len(batch) >= _LOAD_BATCH:
+            add(batch)
+            batch = []
+    if batch:
+        add(batch)
+    print(f"Ranking pool loaded: {len(engine)} candidates")
+    return engine
@@ -1,43 +1,118 @@
 from __future__ import annotations
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Sequence
 import numpy as np
-from matching_engine.similarity_calculator import cosine_similarity
-from matching_engine.embedding_service import get_text_embedding
-from config import NLPConfig
-import joblib
-import os
+from matching_engine.similarity_calculator import (
+    cosine_similarity, normalize_sparse_rows, sparse_cosine_scores)
+from matching_engine.embedding_service import get_text_embedding, get_text_embeddings
+from matching_engine.embedding_store import get_embedding_store
+from metrics import CACHE_LOOKUPS
+from model_registry import get_model_registry
 
 
 def _load_tfidf_vectorizer():
-    path = NLPConfig.TFIDF_VECTORIZER_PATH
-    if path.exists():
-        return joblib.load(path)
-    return None
+    # Served from memory; reloaded only when the artifact changes on disk
+    return get_model_registry().get('tfidf_vectorizer')
 
 
-def compute_match_score(resume_text: str, job_text: str, tfidf_weight: float = 0.4, embedding_weight: float = 0.6) -> Dict[str, Any]:
+def transform_tfidf(texts: Sequence[str], tfidf_vec=None):
+    """Return L2-normalised sparse TF-IDF rows for texts, or None without a vectorizer.
+
+    Build this once for a candidate pool and pass it to compute_tfidf_scores.
+    ``tfidf_vec`` pins the vectorizer (by default the currently loaded one).
+    """
+    if tfidf_vec is None:
+        tfidf_vec = _load_tfidf_vectorizer()
+    if tfidf_vec is None:
+        return None
+    return normalize_sparse_rows(tfidf_vec.transform(texts))
+
+
+def compute_tfidf_scores(job_text: str, resume_texts: Optional[Sequence[str]] = None,
+                         resume_matrix=None) -> Optional[np.ndarray]:
+    """Score one job against many resumes with a single sparse product.
+
+    Give either the raw resume_texts or a resume_matrix from transform_tfidf.
+    Returns one TF-IDF cosine per resume, or None without a vectorizer.
+    """
+    if resume_matrix is None:
+        if resume_texts is None:
+            raise ValueError("Provide resume_texts or resume_matrix")
+        resume_matrix = transform_tfidf(resume_texts)
+    job_row = transform_tfidf([job_text])
+    if resume_matrix is None or job_row is None:
+        return None
+    return sparse_cosine_scores(job_row, resume_matrix, normalized=True)
+
+
+def index_embedding(kind: str, item_id: str, text: str) -> np.ndarray:
+    """Encode text once and store it under item_id in the 'resumes' or 'jobs' store.
+
+    Raises RuntimeError if sentence-transformers/torch is not available.
+    """
+    emb = get_text_embedding(text)
+    get_embedding_store(kind).upsert(item_id, emb)
+    return emb
+
+
+def index_embeddings(kind: str, item_ids: Sequence[str], texts: Sequence[str]) -> None:
+    """Batch version of index_embedding for bulk (re-)indexing."""
+    if len(item_ids) != len(texts):
+        raise ValueError("item_ids and texts must have the same length")
+    get_embedding_store(kind).upsert_many(
+        [str(i) for i in item_ids], get_text_embeddings(texts))
+
+
+def combine_scores(tfidf_score, embedding_score, tfidf_weight: float = 0.4, embedding_weight: float = 0.6):
+    """Weighted TF-IDF + embedding score; works on floats or equally shaped arrays.
+
+    Either component may be None, in which case the other is used alone.
+    """
+    if tfidf_score is None and embedding_score is None:
+        return 0.0
+    if tfidf_score is None:
+        return embedding_score
+    if embedding_score is None:
+        return tfidf_score
+    return tfidf_weight * tfidf_score + embedding_weight * embedding_score
+
+
+def get_stored_or_encoded_embedding(kind: str, item_id: Optional[str], text: str) -> np.ndarray:
+    """Return the stored embedding of item_id, encoding text if it is not indexed."""
+    if item_id is not None:
+        emb = get_embedding_store(kind).get(item_id)
+        CACHE_LOOKUPS.inc(cache='embedding', result='miss' if emb is None else 'hit')
+        if emb is not None:
+            return emb
+    return get_text_embedding(text)
+
+
+def compute_match_score(resume_text: str, job_text: str, tfidf_weight: float = 0.4, embedding_weight: float = 0.6,
+                        resume_id: Optional[str] = None, job_id: Optional[str] = None) -> Dict[str, Any]:
     """Compute a combined match score using TF-IDF cosine and embedding cosine.
 
+    When resume_id / job_id are given, their embeddings are read from the
+    embedding stores instead of being re-encoded; texts are only encoded for
+    ids that have not been indexed yet.
+
     Returns a dict with component scores and combined_score.
     """
     tfidf_vec = _load_tfidf_vectorizer()
     tfidf_score = None
     if tfidf_vec is not None:
         try:
-            r_v = tfidf_vec.transform([resume_text])
-            j_v = tfidf_vec.transform([job_text])
-            # sklearn sparse vector -> dense arrays for cosine
-            r_arr = r_v.toarray()[0]
-            j_arr = j_v.toarray()[0]
-            tfidf_score = cosine_similarity(r_arr, j_arr)
+            # Both rows stay sparse: one transform call, one sparse dot product
+            rows = normalize_sparse_rows(
+                tfidf_vec.transform([resume_text, job_text]))
+            tfidf_score = float(sparse_cosine_scores(
+                rows[1], rows[0], normalized=True)[0])
         except Exception:
             tfidf_score = None
 
     # Embedding score (lazy; may raise if model not installed)
     embedding_score = None
     try:
-        r_emb = get_text_embedding(resume_text)
-        j_emb = get_text_embedding(job_text)
+        r_emb = get_stored_or_encoded_embedding('resumes', resume_id, resume_text)
+        j_emb = get_stored_or_encoded_embedding('jobs', job_id, job_text)
         embedding_score = cosine_similarity(r_emb, j_emb)
     except Exception:
         embedding_score = None
@@ -50,15 +125,8 @@ def compute_match_score(resume_text: str, job_text: str, tfidf_weight: float = 0
         components['embedding_score'] = embedding_score
 
     # Default combined logic
-    if tfidf_score is None and embedding_score is None:
-        combined = 0.0
-    elif tfidf_score is None:
-        combined = float(embedding_score)
-    elif embedding_score is None:
-        combined = float(tfidf_score)
-    else:
-        combined = float(tfidf_weight * tfidf_score +
-                         embedding_weight * embedding_score)
+    combined = float(combine_scores(
+        tfidf_score, embedding_score, tfidf_weight, embedding_weight))
 
     return {
         'combined_score': combined,
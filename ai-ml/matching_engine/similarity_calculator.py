@@ -1,6 +1,7 @@
 from __future__ import annotations
 import numpy as np
-from typing import List, Any
+import scipy.sparse as sp
+from typing import List, Any, Sequence, Tuple, Union
 
 
 def cosine_similarity(a: np.ndarray, b: np.ndarray) -> float:
@@ -19,16 +20,101 @@ def cosine_similarity(a: np.ndarray, b: np.ndarray) -> float:
     return float(np.dot(a, b) / (norm_a * norm_b))
 
 
+def normalize_rows(vectors: Union[np.ndarray, Sequence[np.ndarray]]) -> np.ndarray:
+    """Stack vectors into a C-contiguous float32 matrix with unit-length rows.
+
+    Zero rows stay zero, so they score 0.0 against every query. Build this
+    once per candidate pool and reuse it across queries.
+    """
+    matrix = np.array(vectors, dtype=np.float32, copy=True, ndmin=2)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0.0] = 1.0
+    matrix /= norms
+    return np.ascontiguousarray(matrix)
+
+
+def top_k_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """Return indices of the top_k highest scores per row, sorted descending.
+
+    Uses argpartition so only the selected k entries are fully sorted.
+    Accepts a 1D score vector or a 2D (queries x candidates) matrix.
+    """
+    scores = np.asarray(scores)
+    n = scores.shape[-1]
+    k = min(max(top_k, 0), n)
+    if k == 0:
+        return np.empty(scores.shape[:-1] + (0,), dtype=np.intp)
+    if k < n:
+        part = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    else:
+        part = np.broadcast_to(np.arange(n), scores.shape).copy()
+    part_scores = np.take_along_axis(scores, part, axis=-1)
+    order = np.argsort(-part_scores, axis=-1, kind='stable')
+    return np.take_along_axis(part, order, axis=-1)
+
+
+def rank_by_matrix(query_vectors: np.ndarray, candidate_matrix: np.ndarray,
+                   top_k: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+    """Rank a pre-normalized candidate matrix against one or more queries.
+
+    ``candidate_matrix`` must come from ``normalize_rows``. ``query_vectors``
+    may be a single 1D vector or a 2D batch. Scores are computed with a single
+    matrix multiply. Returns ``(indices, scores)``, each shaped
+    (queries, top_k), or (top_k,) for a single 1D query.
+    """
+    query = np.asarray(query_vectors, dtype=np.float32)
+    single = query.ndim == 1
+    queries = normalize_rows(query)
+    scores = queries @ candidate_matrix.T
+    idx = top_k_indices(scores, top_k)
+    top_scores = np.take_along_axis(scores, idx, axis=-1)
+    if single:
+        return idx[0], top_scores[0]
+    return idx, top_scores
+
+
+def normalize_sparse_rows(matrix) -> sp.csr_matrix:
+    """Return a float32 CSR copy of a sparse matrix with unit-length rows.
+
+    The matrix is never densified; empty rows stay empty.
+    """
+    matrix = sp.csr_matrix(matrix, dtype=np.float32, copy=True)
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0.0] = 1.0
+    # Scale each stored value by the norm of its row
+    matrix.data /= np.repeat(norms, np.diff(matrix.indptr)).astype(np.float32)
+    return matrix
+
+
+def sparse_cosine_scores(query, candidates, normalized: bool = False) -> np.ndarray:
+    """Cosine similarity of one sparse query row against every sparse candidate row.
+
+    Pass ``normalized=True`` when both inputs come from
+    ``normalize_sparse_rows`` to skip re-normalising a large candidate matrix.
+    Returns a dense 1D float32 array with one score per candidate.
+    """
+    if not normalized:
+        query = normalize_sparse_rows(query)
+        candidates = normalize_sparse_rows(candidates)
+    scores = candidates @ query.T
+    return np.asarray(scores.todense(), dtype=np.float32).ravel()
+
+
 def rank_items_by_similarity(query_vector: np.ndarray, candidate_vectors: List[np.ndarray], candidate_payloads: List[Any], top_k: int = 10):
     """Return top_k payloads ranked by cosine similarity to query_vector.
 
-    Returns a list of (payload, score) tuples sorted descending.
+    Returns a list of (payload, score) tuples sorted descending. A None
+    candidate vector scores 0.0, as with cosine_similarity; a None or empty
+    query scores every candidate 0.0 and keeps their order.
     """
-    scores = []
-    for vec in candidate_vectors:
-        scores.append(cosine_similarity(query_vector, vec))
-
-    # Pair payloads with scores
-    items = list(zip(candidate_payloads, scores))
-    items.sort(key=lambda x: x[1], reverse=True)
-    return items[:top_k]
+    if len(candidate_vectors) == 0:
+        return []
+    if query_vector is None or np.asarray(query_vector).size == 0:
+        n = min(top_k, len(candidate_vectors))
+        return [(payload, 0.0) for payload in candidate_payloads[:n]]
+    if any(v is None for v in candidate_vectors):
+        zeros = np.zeros(np.asarray(query_vector).shape[-1], dtype=np.float32)
+        candidate_vectors = [zeros if v is None else v for v in candidate_vectors]
+    candidate_matrix = normalize_rows(candidate_vectors)
+    idx, scores = rank_by_matrix(query_vector, candidate_matrix, top_k)
+    return [(candidate_payloads[i], float(s)) for i, s in zip(idx, scores)]
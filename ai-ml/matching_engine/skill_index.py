@@ -0,0 +1,485 @@
+"""Inverted index from normalised skill to the resumes that list it.
+
+Each resume gets a dense internal doc number in insertion order, so every
+posting list is a sorted array that only ever grows at the end. Postings are
+kept as sorted ``uint32`` arrays, or as packed bitmaps (one bit per doc) once
+a skill is common enough that the bitmap is the smaller of the two. New docs
+are appended to a small per-skill tail and folded in on the next query.
+
+``search`` evaluates boolean filters such as ``kubernetes AND (go OR rust)``
+with set operations on those postings, and ``score`` ranks resumes by the
+weighted fraction of a job's skills they have, in both cases without touching
+resumes that do not list any of the skills involved.
+
+Updates go to an append-only journal (``['+', id, skills]`` / ``['-', id]``
+lines, like ``embedding_store``) that is replayed on open.
+"""
+from __future__ import annotations
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+import json
+import os
+import re
+import threading
+
+import numpy as np
+
+from config import NLPConfig
+from matching_engine.similarity_calculator import top_k_indices
+
+# A doc set is either ('a', sorted uint32 doc numbers) or ('b', packed bitmap)
+_DocSet = Tuple[str, np.ndarray]
+
+
+def normalize_skill(skill: str) -> str:
+    return ' '.join(str(skill).lower().split())
+
+
+# -- doc set operations -------------------------------------------------------
+
+def _bitmap_bytes(n_docs: int) -> int:
+    return (n_docs + 7) // 8
+
+
+def _to_bitmap(docs: _DocSet, n_docs: int) -> np.ndarray:
+    kind, data = docs
+    if kind == 'b':
+        if len(data) < _bitmap_bytes(n_docs):
+            data = np.pad(data, (0, _bitmap_bytes(n_docs) - len(data)))
+        return data
+    bits = np.zeros(_bitmap_bytes(n_docs) * 8, dtype=bool)
+    bits[data] = True
+    return np.packbits(bits, bitorder='little')
+
+
+def _to_array(docs: _DocSet) -> np.ndarray:
+    kind, data = docs
+    if kind == 'a':
+        return data
+    bits = np.unpackbits(data, bitorder='little').view(bool)
+    return np.flatnonzero(bits).astype(np.uint32)
+
+
+def _contains(bitmap: np.ndarray, docs: np.ndarray) -> np.ndarray:
+    """Boolean mask of which (sorted) doc numbers are set in a packed bitmap."""
+    byte = docs >> 3
+    inside = byte < len(bitmap)
+    out = np.zeros(len(docs), dtype=bool)
+    out[inside] = ((bitmap[byte[inside]] >> (docs[inside] & 7).astype(np.uint8)) & 1) == 1
+    return out
+
+
+def _and(x: _DocSet, y: _DocSet, n_docs: int) -> _DocSet:
+    if x[0] == 'a' and y[0] == 'a':
+        return 'a', np.intersect1d(x[1], y[1], assume_unique=True)
+    if x[0] == 'a' or y[0] == 'a':
+        arr, bm = (x[1], y[1]) if x[0] == 'a' else (y[1], x[1])
+        return 'a', arr[_contains(bm, arr)]
+    return 'b', np.bitwise_and(_to_bitmap(x, n_docs), _to_bitmap(y, n_docs))
+
+
+def _or(x: _DocSet, y: _DocSet, n_docs: int) -> _DocSet:
+    if x[0] == 'a' and y[0] == 'a':
+        return 'a', np.union1d(x[1], y[1]).astype(np.uint32)
+    return 'b', np.bitwise_or(_to_bitmap(x, n_docs), _to_bitmap(y, n_docs))
+
+
+def _and_not(x: _DocSet, y: _DocSet, n_docs: int) -> _DocSet:
+    if x[0] == 'a':
+        if y[0] == 'a':
+            return 'a', np.setdiff1d(x[1], y[1], assume_unique=True).astype(np.uint32)
+        return 'a', x[1][~_contains(y[1], x[1])]
+    return 'b', np.bitwise_and(_to_bitmap(x, n_docs), ~_to_bitmap(y, n_docs))
+
+
+# -- query parsing ------------------------------------------------------------
+
+_TOKEN_RE = re.compile(r'\s*(?:(\()|(\))|"([^"]*)"|([^\s()"]+))')
+_OPERATORS = ('AND', 'OR', 'NOT')
+
+
+def _tokenize(query: str) -> List[Tuple[str, str]]:
+    """Split a query into ('(' | ')' | 'AND' | 'OR' | 'NOT' | 'TERM', text).
+
+    Operators are case-insensitive. Adjacent bare words form one multi-word
+    skill ("machine learning"); quote a skill to use an operator word or
+    parenthesis literally.
+    """
+    tokens: List[Tuple[str, str]] = []
+    pos = 0
+    last_bare = False
+    query = query.rstrip()
+    while pos < len(query):
+        m = _TOKEN_RE.match(query, pos)
+        if m is None:
+            raise ValueError(f"Unterminated quote in query at position {pos}")
+        pos = m.end()
+        lparen, rparen, quoted, word = m.groups()
+        continues = last_bare
+        last_bare = False
+        if lparen:
+            tokens.append(('(', lparen))
+        elif rparen:
+            tokens.append((')', rparen))
+        elif quoted is not None:
+            tokens.append(('TERM', quoted))
+        elif word.upper() in _OPERATORS:
+            tokens.append((word.upper(), word))
+        elif continues:
+            # Continue a multi-word skill
+            tokens[-1] = ('TERM', tokens[-1][1] + ' ' + word)
+            last_bare = True
+        else:
+            tokens.append(('TERM', word))
+            last_bare = True
+    return tokens
+
+
+def parse_query(query: str):
+    """Parse a boolean skill query into a nested tuple tree.
+
+    Grammar (NOT binds tightest, then AND, then OR)::
+
+        expr   := term (OR term)*
+        term   := factor (AND factor)*
+        factor := NOT factor | '(' expr ')' | SKILL
+
+    Leaves are ``('skill', name)``; inner nodes are ``('and'|'or', [children])``
+    and ``('not', child)``. Raises ValueError on malformed queries.
+    """
+    tokens = _tokenize(query)
+    if not tokens:
+        raise ValueError("Empty query")
+    pos = 0
+
+    def peek() -> Optional[str]:
+        return tokens[pos][0] if pos < len(tokens) else None
+
+    def take(kind: str) -> str:
+        nonlocal pos
+        if peek() != kind:
+            found = tokens[pos][1] if pos < len(tokens) else 'end of query'
+            raise ValueError(f"Expected {kind} but found {found!r}")
+        pos += 1
+        return tokens[pos - 1][1]
+
+    def expr():
+        children = [term()]
+        while peek() == 'OR':
+            take('OR')
+            children.append(term())
+        return children[0] if len(children) == 1 else ('or', children)
+
+    def term():
+        children = [factor()]
+        while peek() == 'AND':
+            take('AND')
+            children.append(factor())
+        return children[0] if len(children) == 1 else ('and', children)
+
+    def factor():
+        if peek() == 'NOT':
+            take('NOT')
+            return ('not', factor())
+        if peek() == '(':
+            take('(')
+            node = expr()
+            take(')')
+            return node
+        skill = normalize_skill(take('TERM'))
+        if not skill:
+            raise ValueError("Empty skill in query")
+        return ('skill', skill)
+
+    tree = expr()
+    if pos != len(tokens):
+        raise ValueError(f"Unexpected {tokens[pos][1]!r} in query")
+    return tree
+
+
+# -- the index ----------------------------------------------------------------
+
+class _Posting:
+    __slots__ = ('data', 'is_bitmap', 'tail')
+
+    def __init__(self):
+        self.data = np.empty(0, dtype=np.uint32)
+        self.is_bitmap = False
+        self.tail: List[int] = []
+
+
+class SkillIndex:
+    """Skill -> resume posting lists with boolean search and weighted scoring.
+
+    Safe to share between threads. With ``path`` set, every update is
+    journalled and the index is rebuilt from the journal on open.
+    """
+
+    def __init__(self, path: Optional[Union[str, Path]] = None):
+        self.path = Path(path) if path is not None else None
+        self._lock = threading.RLock()
+        self._postings: Dict[str, _Posting] = {}
+        self._doc_ids: List[Optional[str]] = []
+        self._doc_skills: Dict[str, Tuple[str, ...]] = {}
+        self._docs: Dict[str, int] = {}
+        self._alive = np.zeros(0, dtype=np.uint8)
+        self._journal_entries = 0
+        if self.path is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._replay_journal()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def __contains__(self, resume_id: str) -> bool:
+        return str(resume_id) in self._docs
+
+    def skills_of(self, resume_id: str) -> Optional[List[str]]:
+        skills = self._doc_skills.get(str(resume_id))
+        return None if skills is None else list(skills)
+
+    def skill_counts(self) -> Dict[str, int]:
+        """Number of indexed resumes per skill."""
+        with self._lock:
+            return {skill: int(len(self._alive_docs(self._fetch(skill))))
+                    for skill in self._postings}
+
+    # -- updates ----------------------------------------------------------------
+
+    def add(self, resume_id: str, skills: Iterable[str]) -> None:
+        """Index (or re-index) one resume's skills."""
+        self.add_many([(resume_id, skills)])
+
+    def add_many(self, items: Iterable[Tuple[str, Iterable[str]]]) -> None:
+        lines = []
+        with self._lock:
+            for resume_id, skills in items:
+                resume_id = str(resume_id)
+                normalized = tuple(sorted({normalize_skill(s) for s in skills} - {''}))
+                if self._doc_skills.get(resume_id) == normalized:
+                    continue
+                self._add(resume_id, normalized)
+                lines.append(json.dumps(['+', resume_id, list(normalized)]))
+            self._append_journal(lines)
+
+    def remove(self, resume_id: str) -> bool:
+        """Drop a resume from the index. Returns False if it was not indexed."""
+        with self._lock:
+            if not self._remove(str(resume_id)):
+                return False
+            self._append_journal([json.dumps(['-', str(resume_id)])])
+            return True
+
+    def _add(self, resume_id: str, skills: Tuple[str, ...]) -> None:
+        self._remove(resume_id)
+        doc = len(self._doc_ids)
+        self._doc_ids.append(resume_id)
+        self._docs[resume_id] = doc
+        self._doc_skills[resume_id] = skills
+        if _bitmap_bytes(doc + 1) > len(self._alive):
+            self._alive = np.pad(self._alive, (0, max(64, len(self._alive))))
+        self._alive[doc >> 3] |= np.uint8(1 << (doc & 7))
+        for skill in skills:
+            posting = self._postings.get(skill)
+            if posting is None:
+                posting = self._postings[skill] = _Posting()
+            posting.tail.append(doc)
+
+    def _remove(self, resume_id: str) -> bool:
+        doc = self._docs.pop(resume_id, None)
+        if doc is None:
+            return False
+        self._doc_skills.pop(resume_id, None)
+        self._doc_ids[doc] = None
+        self._alive[doc >> 3] &= np.uint8(~(1 << (doc & 7)) & 0xFF)
+        # Removed docs stay in the postings until the next rebuild
+        if len(self._doc_ids) > 1024 and len(self._docs) < len(self._doc_ids) // 2:
+            self._rebuild()
+        return True
+
+    def _rebuild(self) -> None:
+        """Renumber live docs densely and drop removed ones from every posting."""
+        live = [(rid, self._doc_skills[rid]) for rid in self._doc_ids
+                if rid is not None and rid in self._doc_skills]
+        self._postings, self._doc_ids, self._docs, self._doc_skills = {}, [], {}, {}
+        self._alive = np.zeros(0, dtype=np.uint8)
+        for resume_id, skills in live:
+            self._add(resume_id, skills)
+
+    # -- queries ----------------------------------------------------------------
+
+    def _fetch(self, skill: str) -> _DocSet:
+        """The posting of a skill, with its tail folded in."""
+        posting = self._postings.get(skill)
+        if posting is None:
+            return 'a', np.empty(0, dtype=np.uint32)
+        if posting.tail:
+            n_docs = len(self._doc_ids)
+            tail = np.asarray(posting.tail, dtype=np.uint32)
+            posting.tail = []
+            if posting.is_bitmap:
+                posting.data = _to_bitmap(('b', posting.data), n_docs)
+                np.bitwise_or.at(posting.data, tail >> 3, (1 << (tail & 7)).astype(np.uint8))
+            else:
+                posting.data = np.concatenate([posting.data, tail])
+                # A bitmap costs n_docs / 8 bytes, a sorted array 4 bytes a doc
+                if len(posting.data) * 4 > _bitmap_bytes(n_docs):
+                    posting.data = _to_bitmap(('a', posting.data), n_docs)
+                    posting.is_bitmap = True
+        return ('b' if posting.is_bitmap else 'a'), posting.data
+
+    def _alive_set(self) -> _DocSet:
+        return 'b', self._alive[:_bitmap_bytes(len(self._doc_ids))]
+
+    def _alive_docs(self, docs: _DocSet) -> np.ndarray:
+        """Doc numbers of a set, minus removed docs still in the postings."""
+        if docs[0] == 'a':
+            return docs[1][_contains(self._alive, docs[1])]
+        return _to_array(_and(docs, self._alive_set(), len(self._doc_ids)))
+
+    def _evaluate(self, node) -> _DocSet:
+        n_docs = len(self._doc_ids)
+        op = node[0]
+        if op == 'skill':
+            return self._fetch(node[1])
+        if op == 'not':
+            return _and_not(self._alive_set(), self._evaluate(node[1]), n_docs)
+        if op == 'and':
+            # Evaluate positive children first, smallest result first, and
+            # apply NOT children as set differences.
+            positive = [c for c in node[1] if c[0] != 'not']
+            negative = [c[1] for c in node[1] if c[0] == 'not']
+            if not positive:
+                result = self._alive_set()
+            else:
+                sets = sorted((self._evaluate(c) for c in positive), key=_size)
+                result = sets[0]
+                for other in sets[1:]:
+                    result = _and(result, other, n_docs)
+            for child in negative:
+                result = _and_not(result, self._evaluate(child), n_docs)
+            return result
+        result = self._evaluate(node[1][0])
+        for child in node[1][1:]:
+            result = _or(result, self._evaluate(child), n_docs)
+        return result
+
+    def search_docs(self, query: Union[str, tuple]) -> np.ndarray:
+        """Internal doc numbers matching a query string or parsed tree."""
+        tree = parse_query(query) if isinstance(query, str) else query
+        with self._lock:
+            return self._alive_docs(self._evaluate(tree))
+
+    def search(self, query: Union[str, tuple]) -> List[str]:
+        """Resume ids matching a boolean skill query, in insertion order."""
+        with self._lock:
+            docs = self.search_docs(query)
+            return [self._doc_ids[d] for d in docs]
+
+    def score(self, job_skills: Union[Mapping[str, float], Sequence[str]],
+              top_k: int = 20, query: Optional[Union[str, tuple]] = None,
+              with_total: bool = False
+              ) -> Union[List[Tuple[str, float]], Tuple[List[Tuple[str, float]], int]]:
+        """Rank resumes by the weighted share of the job's skills they have.
+
+        ``job_skills`` is a list (all weights 1) or a {skill: weight} mapping.
+        A resume's score is the sum of the weights of the skills it has
+        divided by the total weight. With ``query``, only resumes matching
+        that boolean filter are scored. Returns ``(resume_id, score)`` pairs,
+        best first; resumes with none of the skills are left out. With
+        ``with_total``, returns ``(pairs, total)`` where ``total`` counts every
+        scored resume, not just the top_k.
+        """
+        if not isinstance(job_skills, Mapping):
+            job_skills = {s: 1.0 for s in job_skills}
+        weights: Dict[str, float] = {}
+        for skill, weight in job_skills.items():
+            skill = normalize_skill(skill)
+            if skill:
+                weights[skill] = weights.get(skill, 0.0) + float(weight)
+        total = sum(w for w in weights.values() if w > 0)
+        if not weights or total <= 0:
+            return ([], 0) if with_total else []
+
+        with self._lock:
+            n_docs = len(self._doc_ids)
+            if query is not None:
+                candidates = self.search_docs(query)
+                scores = np.zeros(len(candidates), dtype=np.float32)
+                for skill, weight in weights.items():
+                    kind, data = self._fetch(skill)
+                    if kind == 'b':
+                        hit = _contains(data, candidates)
+                    else:
+                        hit = np.isin(candidates, data, assume_unique=True)
+                    scores[hit] += weight
+                docs = candidates
+            else:
+                acc = np.zeros(n_docs, dtype=np.float32)
+                for skill, weight in weights.items():
+                    acc[_to_array(self._fetch(skill))] += weight
+                docs = np.flatnonzero(acc).astype(np.uint32)
+                docs = docs[_contains(self._alive, docs)]
+                scores = acc[docs]
+
+            keep = scores > 0
+            docs, scores = docs[keep], scores[keep] / total
+            best = top_k_indices(scores, top_k)
+            pairs = [(self._doc_ids[docs[i]], float(scores[i])) for i in best]
+            return (pairs, int(len(docs))) if with_total else pairs
+
+    # -- persistence --------------------------------------------------------------
+
+    def compact(self) -> None:
+        """Rewrite the journal so it holds exactly one line per indexed resume."""
+        if self.path is None:
+            return
+        with self._lock:
+            tmp = self.path.with_name(self.path.name + '.tmp')
+            with open(tmp, 'w', encoding='utf-8') as f:
+                for resume_id, skills in self._doc_skills.items():
+                    f.write(json.dumps(['+', resume_id, list(skills)]) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+            self._journal_entries = len(self._doc_skills)
+
+    def _append_journal(self, lines: List[str]) -> None:
+        if self.path is None or not lines:
+            return
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        self._journal_entries += len(lines)
+        if self._journal_entries > 2 * len(self._docs) + 1024:
+            self.compact()
+
+    def _replay_journal(self) -> None:
+        if not self.path.exists():
+            return
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A torn final line from a crash mid-append; ignore it.
+                    continue
+                self._journal_entries += 1
+                if entry[0] == '+':
+                    self._add(entry[1], tuple(entry[2]))
+                else:
+                    self._remove(entry[1])
+
+
+def _size(docs: _DocSet) -> int:
+    kind, data = docs
+    return len(data) if kind == 'a' else len(data) * 8
+
+
+@lru_cache(maxsize=1)
+def get_skill_index() -> SkillIndex:
+    """Return the process-wide resume skill index (``NLPConfig.SKILL_INDEX_PATH``)."""
+    return SkillIndex(NLPConfig.SKILL_INDEX_PATH)
@@ -0,0 +1,227 @@
+"""In-process metrics in the Prometheus text format, plus a stage-tracing hook.
+
+Counters and histograms live in this module and are rendered by ``render()``
+for the ``/metrics`` endpoint. There is no client library dependency and
+recording is a lock and a few additions.
+
+``stage(name)`` times a block of the parse pipeline (download, pdf_extract,
+skills, embedding), records it in that stage's histogram and passes it to
+every registered trace hook. Hooks get ``(stage, seconds, attrs, error)`` and
+can forward spans to a tracing backend. With ``TRACE_SLOW_STAGE_MS`` set, a
+built-in hook prints stages slower than the threshold.
+
+Work done in extraction worker processes is timed there and sent back with
+the result (``'timings'``), then recorded here with ``observe_stage``.
+"""
+from __future__ import annotations
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import threading
+import time
+
+from config import NLPConfig
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+BYTES_BUCKETS = tuple(float(2 ** p) for p in range(14, 26, 2))  # 16 KiB .. 32 MiB
+
+_REGISTRY: List['_Metric'] = []
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _REGISTRY.append(self)
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f'# HELP {self.name} {self.documentation}',
+                f'# TYPE {self.name} {self.kind}']
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f'{self.name}{_format_labels(self.labelnames, key)} '
+                         f'{_format_value(value)}')
+        return lines
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=SECONDS_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (+Inf last), sum]
+        self._values: Dict[Tuple[str, ...], List[Any]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def count(self, **labels) -> int:
+        entry = self._values.get(self._key(labels))
+        return sum(entry[0]) if entry else 0
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1])) for k, v in self._values.items())
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float('inf'),), counts):
+                cumulative += n
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f'{self.name}_bucket'
+                             f'{_format_labels(self.labelnames, key, le)} {cumulative}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+    lines: List[str] = []
+    for metric in _REGISTRY:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+# -- metrics of the service ----------------------------------------------------
+
+REQUEST_SECONDS = Histogram(
+    'ai_request_seconds', 'HTTP request latency.', ('endpoint', 'method', 'status'))
+DOWNLOAD_SECONDS = Histogram(
+    'ai_download_seconds', 'Time to download a resume file.')
+DOWNLOAD_BYTES = Histogram(
+    'ai_download_bytes', 'Size of downloaded resume files.', buckets=BYTES_BUCKETS)
+PDF_EXTRACT_SECONDS = Histogram(
+    'ai_pdf_extract_seconds', 'pdfminer text extraction time per document.')
+SKILL_EXTRACT_SECONDS = Histogram(
+    'ai_skill_extract_seconds', 'Skill extraction time per document.')
+EMBEDDING_SECONDS = Histogram(
+    'ai_embedding_seconds', 'Time to encode a batch of texts into embeddings.')
+FAILURES = Counter(
+    'ai_failures_total', 'Failures by pipeline stage and cause.', ('stage', 'cause'))
+CACHE_LOOKUPS = Counter(
+    'ai_cache_lookups_total', 'Cache lookups by cache and result.', ('cache', 'result'))
+
+_STAGE_HISTOGRAMS = {
+    'download': DOWNLOAD_SECONDS,
+    'pdf_extract': PDF_EXTRACT_SECONDS,
+    'skills': SKILL_EXTRACT_SECONDS,
+    'embedding': EMBEDDING_SECONDS,
+}
+
+
+# -- tracing -------------------------------------------------------------------
+
+TraceHook = Callable[[str, float, Dict[str, Any], Optional[BaseException]], None]
+_trace_hooks: List[TraceHook] = []
+
+
+def add_trace_hook(hook: TraceHook) -> None:
+    """Call ``hook(stage, seconds, attrs, error)`` after every timed stage."""
+    _trace_hooks.append(hook)
+
+
+def remove_trace_hook(hook: TraceHook) -> None:
+    if hook in _trace_hooks:
+        _trace_hooks.remove(hook)
+
+
+def observe_stage(name: str, seconds: float, error: Optional[BaseException] = None,
+                  **attrs: Any) -> None:
+    """Record a stage timing measured elsewhere (e.g. in a worker process)."""
+    histogram = _STAGE_HISTOGRAMS.get(name)
+    if histogram is not None:
+        histogram.observe(seconds)
+    for hook in _trace_hooks:
+        try:
+            hook(name, seconds, attrs, error)
+        except Exception as e:
+            print(f"Trace hook failed: {e}")
+
+
+@contextmanager
+def stage(name: str, **attrs: Any):
+    """Time a pipeline stage; attrs are passed through to trace hooks."""
+    start = time.perf_counter()
+    error = None
+    try:
+        yield attrs
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        observe_stage(name, time.perf_counter() - start, error, **attrs)
+
+
+def record_failure(stage_name: str, cause: str) -> None:
+    FAILURES.inc(stage=stage_name, cause=cause)
+
+
+def _slow_stage_logger(threshold_seconds: float) -> TraceHook:
+    def hook(name, seconds, attrs, error):
+        if seconds >= threshold_seconds:
+            details = ' '.join(f'{k}={v}' for k, v in attrs.items())
+            print(f"Slow stage {name}: {seconds * 1000:.0f} ms {details}".rstrip())
+    return hook
+
+
+if NLPConfig.TRACE_SLOW_STAGE_MS > 0:
+    add_trace_hook(_slow_stage_logger(NLPConfig.TRACE_SLOW_STAGE_MS / 1000.0))
@@ -0,0 +1,159 @@
+"""Process-wide registry of trained model artifacts.
+
+The artifacts (TF-IDF vectorizer, classifier, label binarizer) are loaded
+with joblib once and then served from memory. They are one versioned set:
+training writes the three files and then ``label_models.json``, a manifest
+that names the new version. The registry periodically reads the manifest;
+when it changes (e.g. after retraining) the next caller loads all three
+files and swaps them in together while other threads keep using the old
+set, so the service picks up new models without a restart and never pairs
+a new vectorizer with an old classifier. Without a manifest (models
+trained before it existed) a change to any of the files reloads the set.
+
+joblib (and scikit-learn, when an artifact is unpickled) is imported on the
+first load, not when this module is imported.
+"""
+from __future__ import annotations
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+import os
+import threading
+import time
+
+from config import NLPConfig
+
+ARTIFACT_PATHS = {
+    'tfidf_vectorizer': NLPConfig.TFIDF_VECTORIZER_PATH,
+    'classifier': NLPConfig.LOGREG_CLASSIFIER_PATH,
+    'mlb': NLPConfig.MLB_PATH,
+}
+
+# Stamp of a set that changed while it was being read; never matches
+_STALE = ('stale',)
+
+
+class _Snapshot:
+    __slots__ = ('objs', 'files', 'stamp', 'checked_at')
+
+    def __init__(self, objs: Dict[str, Any], files: Dict[str, Optional[Tuple[int, int]]],
+                 stamp: Tuple, checked_at: float):
+        self.objs = objs
+        self.files = files
+        self.stamp = stamp
+        self.checked_at = checked_at
+
+
+class ModelRegistry:
+    """Loads joblib artifacts once and hot-swaps them, as one set, when they change.
+
+    ``manifest_path`` is the file that versions the set (see the module
+    docstring). ``mmap_mode`` is passed to ``joblib.load`` so large numpy
+    arrays inside the artifacts can be memory-mapped instead of copied into
+    each process. ``check_interval`` bounds how often the manifest is read
+    (0 = every call).
+    """
+
+    def __init__(self, paths: Dict[str, Union[str, Path]], mmap_mode: Optional[str] = None,
+                 check_interval: float = 5.0,
+                 manifest_path: Optional[Union[str, Path]] = None):
+        self.paths = {name: Path(p) for name, p in paths.items()}
+        self.manifest_path = Path(manifest_path) if manifest_path is not None else None
+        self.mmap_mode = mmap_mode
+        self.check_interval = max(0.0, check_interval)
+        self._snapshot: Optional[_Snapshot] = None
+        self._load_lock = threading.Lock()
+
+    def get(self, name: str) -> Optional[Any]:
+        """Return the current artifact, or None if its file does not exist."""
+        return self.get_many(name)[0]
+
+    def get_many(self, *names: str) -> Tuple[Optional[Any], ...]:
+        """Return several artifacts, all from the same version of the set."""
+        for name in names:
+            if name not in self.paths:
+                raise KeyError(f"Unknown artifact: {name}")
+        objs = self._current()
+        return tuple(objs[name] for name in names)
+
+    def reload(self, name: Optional[str] = None) -> None:
+        """Force the next get() to re-check the set (``name`` is kept for callers;
+        the artifacts always reload together)."""
+        snapshot = self._snapshot
+        if snapshot is not None:
+            snapshot.checked_at = float('-inf')
+
+    def versions(self) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Describe the loaded version of each artifact (for health checks)."""
+        snapshot = self._snapshot
+        out: Dict[str, Optional[Dict[str, Any]]] = {}
+        for name, path in self.paths.items():
+            stat = None if snapshot is None else snapshot.files.get(name)
+            out[name] = None if stat is None else {
+                'path': str(path), 'mtime_ns': stat[0], 'size': stat[1]}
+        return out
+
+    def _current(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        now = time.monotonic()
+        if snapshot is not None and now - snapshot.checked_at < self.check_interval:
+            return snapshot.objs
+        stamp = self._stamp()
+        if snapshot is not None and snapshot.stamp == stamp:
+            snapshot.checked_at = now
+            return snapshot.objs
+        return self._load(stamp)
+
+    def _file_stamp(self, name: str) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.paths[name])
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _file_stamps(self) -> Dict[str, Optional[Tuple[int, int]]]:
+        return {name: self._file_stamp(name) for name in self.paths}
+
+    def _stamp(self) -> Tuple:
+        """Version of the set: the manifest, else the stat of every file."""
+        if self.manifest_path is not None:
+            try:
+                return ('manifest', self.manifest_path.read_text(encoding='utf-8'))
+            except FileNotFoundError:
+                pass
+        return ('files', tuple(sorted(self._file_stamps().items())))
+
+    def _load(self, stamp: Tuple) -> Dict[str, Any]:
+        with self._load_lock:
+            # Another thread may have loaded this version while we waited
+            snapshot = self._snapshot
+            if snapshot is not None and snapshot.stamp == stamp:
+                return snapshot.objs
+            files = self._file_stamps()
+            import joblib
+            objs: Dict[str, Any] = {}
+            for name, path in self.paths.items():
+                try:
+                    objs[name] = joblib.load(path, mmap_mode=self.mmap_mode)
+                except FileNotFoundError:
+                    objs[name] = None
+            # If the set changed while it was being read, record a stamp that
+            # can never match so the next check loads it again
+            if self._stamp() != stamp or self._file_stamps() != files:
+                stamp = _STALE
+            # Single attribute assignment: readers see either the old or new set
+            self._snapshot = _Snapshot(objs, files, stamp, time.monotonic())
+            loaded = [name for name, obj in objs.items() if obj is not None]
+            print(f"Loaded model artifacts {loaded} from {self.paths[loaded[0]].parent}"
+                  if loaded else "No model artifacts found")
+            return objs
+
+
+@lru_cache(maxsize=1)
+def get_model_registry() -> ModelRegistry:
+    """Return the registry shared by the matcher, prediction code and scripts."""
+    return ModelRegistry(
+        ARTIFACT_PATHS,
+        mmap_mode=NLPConfig.MODEL_MMAP_MODE,
+        check_interval=NLPConfig.MODEL_RELOAD_INTERVAL_SECONDS,
+        manifest_path=NLPConfig.MODEL_MANIFEST_PATH)
@@ -2,42 +2,103 @@
 
 Provides TF-IDF + Logistic (One-vs-Rest) multi-label training and artifact
 serialization. Designed to be runnable with a small starter CSV dataset.
+
+``train_streaming_multilabel_classifier`` is the out-of-core path for
+datasets that do not fit in memory. It reads the CSV in chunks, hashes text
+into float32 sparse features (no vocabulary to hold), learns IDF weights in a
+first pass and trains one SGD logistic model per label with ``partial_fit``,
+fitting the labels of each chunk in parallel threads. Both paths write the
+same three artifacts, so the service and scripts load either one.
 """
 from __future__ import annotations
-from typing import Optional, Tuple
+from typing import Iterator, List, Optional, Tuple
+import json
 import os
+import sys
+import time
+import numpy as np
 import pandas as pd
 import joblib
-from sklearn.feature_extraction.text import TfidfVectorizer
+from joblib import Parallel, delayed
+from sklearn.feature_extraction.text import (
+    HashingVectorizer, TfidfTransformer, TfidfVectorizer)
 from sklearn.preprocessing import MultiLabelBinarizer
-from sklearn.linear_model import LogisticRegression
+from sklearn.linear_model import LogisticRegression, SGDClassifier
 from sklearn.multiclass import OneVsRestClassifier
 from sklearn.pipeline import make_pipeline
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import f1_score
 
-from config import NLPConfig, MODELS_DIR
+from config import NLPConfig
 
 
 def _load_csv(csv_path: str) -> pd.DataFrame:
     return pd.read_csv(csv_path)
 
 
-def train_tfidf_multilabel_classifier(csv_path: Optional[str] = None) -> dict:
-    """Train TF-IDF + Logistic multi-label classifier.
+def _dump_atomic(obj, path) -> None:
+    """Write an artifact via a temp file + rename so a running service that
+    hot-reloads models never reads a half-written file."""
+    tmp_path = f"{path}.tmp"
+    joblib.dump(obj, tmp_path)
+    os.replace(tmp_path, path)
 
-    Expected CSV columns: 'text' and 'labels' where labels is a comma-separated string.
-    Saves vectorizer and classifier to paths in `NLPConfig`.
-    Returns a small dict with metrics and paths.
+
+def _save_label_models(vectorizer, clf, mlb) -> None:
+    """Write the three artifacts, then the manifest that versions them as a set.
+
+    The manifest goes last: the model registry reloads the artifacts only when
+    it changes, so it never pairs a new vectorizer with an old classifier.
     """
+    paths = [NLPConfig.TFIDF_VECTORIZER_PATH, NLPConfig.LOGREG_CLASSIFIER_PATH,
+             NLPConfig.MLB_PATH]
+    for obj, path in zip((vectorizer, clf, mlb), paths):
+        _dump_atomic(obj, path)
+    tmp_path = f"{NLPConfig.MODEL_MANIFEST_PATH}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'version': time.time_ns(),
+                   'artifacts': [os.path.basename(p) for p in paths]}, f)
+    os.replace(tmp_path, NLPConfig.MODEL_MANIFEST_PATH)
+
+
+def _peak_rss_mb() -> Optional[float]:
+    """Peak resident memory of this process so far, in MiB (None if unknown)."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 1024
+
+
+def _resolve_csv_path(csv_path: Optional[str]) -> str:
     if csv_path is None:
         # Look for default starter dataset
-        default = os.path.join(os.path.dirname(
+        csv_path = os.path.join(os.path.dirname(
             __file__), 'data', 'skills_dataset.csv')
-        csv_path = default
-
     if not os.path.exists(csv_path):
         raise FileNotFoundError(f"Training CSV not found at {csv_path}")
+    return csv_path
+
+
+def _split_labels(s: str) -> List[str]:
+    return [t.strip() for t in s.split(',') if t.strip()]
+
+
+def train_tfidf_multilabel_classifier(csv_path: Optional[str] = None,
+                                      n_jobs: Optional[int] = None) -> dict:
+    """Train TF-IDF + Logistic multi-label classifier.
+
+    Expected CSV columns: 'text' and 'labels' where labels is a comma-separated string.
+    Saves vectorizer and classifier to paths in `NLPConfig`.
+    Returns a small dict with metrics and paths.
+    Labels are fitted in parallel (``n_jobs``, default NLPConfig.TRAIN_N_JOBS).
+    """
+    started = time.perf_counter()
+    csv_path = _resolve_csv_path(csv_path)
+    if n_jobs is None:
+        n_jobs = NLPConfig.TRAIN_N_JOBS
 
     df = _load_csv(csv_path)
     if 'text' not in df.columns or 'labels' not in df.columns:
@@ -45,16 +106,16 @@ def train_tfidf_multilabel_classifier(csv_path: Optional[str] = None) -> dict:
 
     # Prepare multilabel targets
     df['labels'] = df['labels'].fillna('').astype(str)
-    y_labels = df['labels'].apply(lambda s: [t.strip()
-                                  for t in s.split(',') if t.strip()])
+    y_labels = df['labels'].apply(_split_labels)
     mlb = MultiLabelBinarizer()
     Y = mlb.fit_transform(y_labels)
 
     X_train, X_test, y_train, y_test = train_test_split(
         df['text'], Y, test_size=0.2, random_state=42)
 
-    vectorizer = TfidfVectorizer(max_features=20000, ngram_range=(1, 2))
-    clf = OneVsRestClassifier(LogisticRegression(max_iter=1000))
+    vectorizer = TfidfVectorizer(max_features=20000, ngram_range=(1, 2),
+                                 dtype=np.float32)
+    clf = OneVsRestClassifier(LogisticRegression(max_iter=1000), n_jobs=n_jobs)
 
     # Fit vectorizer + classifier
     X_train_vec = vectorizer.fit_transform(X_train)
@@ -66,13 +127,168 @@ def train_tfidf_multilabel_classifier(csv_path: Optional[str] = None) -> dict:
     f1 = f1_score(y_test, y_pred, average='micro') if y_test.size > 0 else 0.0
 
     # Persist artifacts
-    joblib.dump(vectorizer, NLPConfig.TFIDF_VECTORIZER_PATH)
-    joblib.dump(clf, NLPConfig.LOGREG_CLASSIFIER_PATH)
-    joblib.dump(mlb, MODELS_DIR / 'mlb.joblib')
+    _save_label_models(vectorizer, clf, mlb)
+
+    return {
+        'tfidf_path': str(NLPConfig.TFIDF_VECTORIZER_PATH),
+        'classifier_path': str(NLPConfig.LOGREG_CLASSIFIER_PATH),
+        'mlb_path': str(NLPConfig.MLB_PATH),
+        'f1_micro': float(f1),
+        'wall_seconds': time.perf_counter() - started,
+        'peak_rss_mb': _peak_rss_mb()
+    }
+
+
+class LinearMultiLabelClassifier:
+    """Per-label linear models stacked into one (n_labels, n_features) matrix.
+
+    Saved by the streaming trainer in place of a OneVsRestClassifier; it has
+    the same ``predict`` / ``predict_proba`` / ``decision_function`` for
+    sparse rows, and scoring all labels is a single sparse-dense product.
+    """
+
+    def __init__(self, coef: np.ndarray, intercept: np.ndarray):
+        self.coef_ = np.ascontiguousarray(coef, dtype=np.float32)
+        self.intercept_ = np.asarray(intercept, dtype=np.float32)
+
+    def decision_function(self, X) -> np.ndarray:
+        return np.asarray(X @ self.coef_.T) + self.intercept_
+
+    def predict_proba(self, X) -> np.ndarray:
+        return 1.0 / (1.0 + np.exp(-self.decision_function(X)))
+
+    def predict(self, X) -> np.ndarray:
+        return (self.decision_function(X) > 0).astype(np.int64)
+
+
+def _iter_csv_chunks(csv_path: str, chunk_rows: int
+                     ) -> Iterator[Tuple[List[str], List[List[str]]]]:
+    """Yield (texts, label lists) for consecutive chunks of the CSV."""
+    try:
+        reader = pd.read_csv(csv_path, usecols=['text', 'labels'], dtype=str,
+                             keep_default_na=False, chunksize=max(1, chunk_rows))
+    except ValueError as e:
+        raise ValueError("CSV must contain 'text' and 'labels' columns") from e
+    with reader:
+        for chunk in reader:
+            yield (chunk['text'].tolist(),
+                   [_split_labels(s) for s in chunk['labels']])
+
+
+def _test_mask(chunk_no: int, n_rows: int, test_size: float, seed: int) -> np.ndarray:
+    # Seeded per chunk, so every pass over the file makes the same split
+    return np.random.default_rng([seed, chunk_no]).random(n_rows) < test_size
+
+
+def _fit_label(model: SGDClassifier, X, y: np.ndarray) -> None:
+    model.partial_fit(X, y, classes=np.array([0, 1]))
+
+
+def train_streaming_multilabel_classifier(csv_path: Optional[str] = None,
+                                          chunk_rows: Optional[int] = None,
+                                          n_features: Optional[int] = None,
+                                          epochs: Optional[int] = None,
+                                          n_jobs: Optional[int] = None,
+                                          alpha: Optional[float] = None,
+                                          test_size: float = 0.2,
+                                          seed: int = 42) -> dict:
+    """Train the multi-label classifier without loading the CSV into memory.
+
+    Same CSV format and artifacts as train_tfidf_multilabel_classifier.
+    Memory use is bounded by the chunk size and the model size
+    (n_labels x n_features float32), not by the number of rows.
+
+    1. One pass collects the label set and the document frequency of every
+       hashed feature (for the IDF weights).
+    2. ``epochs`` passes train one SGD logistic model per label with
+       ``partial_fit`` on each chunk; a chunk's labels are fitted in
+       ``n_jobs`` threads, which share the chunk's feature matrix.
+    3. A last pass scores the held-out rows (``test_size`` of each chunk).
+
+    Returns the same dict as train_tfidf_multilabel_classifier plus row and
+    label counts.
+    """
+    started = time.perf_counter()
+    csv_path = _resolve_csv_path(csv_path)
+    chunk_rows = chunk_rows or NLPConfig.TRAIN_CHUNK_ROWS
+    n_features = n_features or NLPConfig.TRAIN_HASH_FEATURES
+    epochs = max(1, epochs or NLPConfig.TRAIN_EPOCHS)
+    n_jobs = n_jobs or NLPConfig.TRAIN_N_JOBS
+    alpha = alpha or NLPConfig.TRAIN_SGD_ALPHA
+
+    # Stateless: the same text always hashes to the same columns
+    hasher = HashingVectorizer(n_features=n_features, ngram_range=(1, 2),
+                               alternate_sign=False, norm=None, dtype=np.float32)
+
+    # Pass 1: label set and document frequencies of the training rows
+    labels = set()
+    doc_freq = np.zeros(n_features, dtype=np.int64)
+    n_train = 0
+    for chunk_no, (texts, label_lists) in enumerate(_iter_csv_chunks(csv_path, chunk_rows)):
+        train = ~_test_mask(chunk_no, len(texts), test_size, seed)
+        for label_list in label_lists:
+            labels.update(label_list)
+        X = hasher.transform([t for t, keep in zip(texts, train) if keep])
+        # Column indices are unique within a CSR row, so this counts documents
+        doc_freq += np.bincount(X.indices, minlength=n_features)
+        n_train += X.shape[0]
+    if n_train == 0:
+        raise ValueError("No training rows in the CSV")
+
+    mlb = MultiLabelBinarizer(classes=sorted(labels))
+    mlb.fit([])
+    tfidf = TfidfTransformer()
+    # Same smoothed IDF as TfidfVectorizer
+    tfidf.idf_ = (np.log((1.0 + n_train) / (1.0 + doc_freq)) + 1.0).astype(np.float32)
+    tfidf.n_features_in_ = n_features
+    vectorizer = make_pipeline(hasher, tfidf)
+
+    # Pass 2: per-label SGD logistic regression
+    models = [SGDClassifier(loss='log_loss', alpha=alpha, random_state=seed)
+              for _ in mlb.classes_]
+    with Parallel(n_jobs=n_jobs, prefer='threads') as parallel:
+        for epoch in range(epochs):
+            for chunk_no, (texts, label_lists) in enumerate(
+                    _iter_csv_chunks(csv_path, chunk_rows)):
+                train = ~_test_mask(chunk_no, len(texts), test_size, seed)
+                if not train.any():
+                    continue
+                X = vectorizer.transform([t for t, keep in zip(texts, train) if keep])
+                Y = mlb.transform([l for l, keep in zip(label_lists, train) if keep])
+                parallel(delayed(_fit_label)(model, X, Y[:, j])
+                         for j, model in enumerate(models))
+            print(f"Epoch {epoch + 1}/{epochs} done "
+                  f"({time.perf_counter() - started:.1f}s)")
+
+    clf = LinearMultiLabelClassifier(
+        np.vstack([m.coef_ for m in models]) if models else np.zeros((0, n_features)),
+        np.concatenate([m.intercept_ for m in models]) if models else np.zeros(0))
+
+    # Pass 3: micro-averaged F1 on the held-out rows, accumulated per chunk
+    tp = fp = fn = n_test = 0
+    for chunk_no, (texts, label_lists) in enumerate(_iter_csv_chunks(csv_path, chunk_rows)):
+        test = _test_mask(chunk_no, len(texts), test_size, seed)
+        if not test.any():
+            continue
+        X = vectorizer.transform([t for t, keep in zip(texts, test) if keep])
+        y_true = mlb.transform([l for l, keep in zip(label_lists, test) if keep]).astype(bool)
+        y_pred = clf.predict(X).astype(bool)
+        tp += int((y_true & y_pred).sum())
+        fp += int((~y_true & y_pred).sum())
+        fn += int((y_true & ~y_pred).sum())
+        n_test += X.shape[0]
+    f1 = 2 * tp / (2 * tp + fp + fn) if tp else 0.0
+
+    _save_label_models(vectorizer, clf, mlb)
 
     return {
         'tfidf_path': str(NLPConfig.TFIDF_VECTORIZER_PATH),
         'classifier_path': str(NLPConfig.LOGREG_CLASSIFIER_PATH),
-        'mlb_path': str(MODELS_DIR / 'mlb.joblib'),
-        'f1_micro': float(f1)
+        'mlb_path': str(NLPConfig.MLB_PATH),
+        'f1_micro': float(f1),
+        'wall_seconds': time.perf_counter() - started,
+        'peak_rss_mb': _peak_rss_mb(),
+        'n_train': n_train,
+        'n_test': n_test,
+        'n_labels': len(mlb.classes_)
     }
@@ -1,23 +1,48 @@
 """Entity extraction for resume text with spaCy fallback to regex.
+
+The spaCy pipeline is loaded once per process (``NLPConfig.SPACY_MODEL_NAME``)
+with only the components NER needs. ``extract_entities_batch`` runs many texts
+through ``nlp.pipe`` for bulk work. spaCy itself is imported on first use,
+since importing it takes most of the service's import time.
 """
 from __future__ import annotations
-from typing import Dict, Any, List
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Sequence
 import re
 
-try:
-    import spacy
-    _SPACY_AVAILABLE = True
-except Exception:
-    _SPACY_AVAILABLE = False
+from config import NLPConfig
 
 
 EMAIL_RE = re.compile(r"[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+")
 PHONE_RE = re.compile(r"\+?[0-9][0-9().\-\s]{6,}[0-9]")
 
+# Pipeline components that NER does not depend on; excluding them skips both
+# their load time and their per-document cost.
+_NON_NER_COMPONENTS = ['parser', 'lemmatizer', 'tagger',
+                       'attribute_ruler', 'senter', 'morphologizer']
+
+
+@lru_cache(maxsize=1)
+def _load_nlp():
+    """Return the cached spaCy pipeline, or None if it cannot be loaded."""
+    try:
+        import spacy
+    except Exception:
+        return None
+    try:
+        return spacy.load(NLPConfig.SPACY_MODEL_NAME, exclude=_NON_NER_COMPONENTS)
+    except Exception as e:
+        # If spaCy model not available or failed, fall back to nothing for NER
+        print(f"spaCy model '{NLPConfig.SPACY_MODEL_NAME}' unavailable: {e}")
+        return None
+
+
+def _empty_entities() -> Dict[str, Any]:
+    return {'emails': [], 'phones': [], 'names': [], 'orgs': [], 'skills': []}
 
-def extract_entities(text: str) -> Dict[str, Any]:
-    entities: Dict[str, Any] = {
-        'emails': [], 'phones': [], 'names': [], 'orgs': [], 'skills': []}
+
+def _build_entities(text: str, doc=None) -> Dict[str, Any]:
+    entities = _empty_entities()
 
     if not text:
         return entities
@@ -26,18 +51,12 @@ def extract_entities(text: str) -> Dict[str, Any]:
     entities['emails'] = list(set(EMAIL_RE.findall(text)))
     entities['phones'] = list(set(PHONE_RE.findall(text)))
 
-    if _SPACY_AVAILABLE:
-        try:
-            nlp = spacy.load('en_core_web_sm')
-            doc = nlp(text)
-            names = [ent.text for ent in doc.ents if ent.label_ in ('PERSON',)]
-            orgs = [
-                ent.text for ent in doc.ents if ent.label_ in ('ORG', 'GPE')]
-            entities['names'] = list(set(names))
-            entities['orgs'] = list(set(orgs))
-        except Exception:
-            # If spaCy model not available or failed, fall back to nothing for NER
-            pass
+    if doc is not None:
+        names = [ent.text for ent in doc.ents if ent.label_ in ('PERSON',)]
+        orgs = [
+            ent.text for ent in doc.ents if ent.label_ in ('ORG', 'GPE')]
+        entities['names'] = list(set(names))
+        entities['orgs'] = list(set(orgs))
 
     # Skills placeholder: could be replaced by model-based extractor
     # For now, look for common skill tokens in the text (very basic)
@@ -51,3 +70,45 @@ def extract_entities(text: str) -> Dict[str, Any]:
     entities['skills'] = sorted(list(found))
 
     return entities
+
+
+def extract_entities(text: str) -> Dict[str, Any]:
+    if not text:
+        return _empty_entities()
+
+    doc = None
+    nlp = _load_nlp()
+    if nlp is not None:
+        try:
+            doc = nlp(text)
+        except Exception:
+            doc = None
+    return _build_entities(text, doc)
+
+
+def extract_entities_batch(texts: Sequence[str], batch_size: Optional[int] = None,
+                           n_process: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Extract entities from many texts, streaming them through ``nlp.pipe``.
+
+    Returns one dict per input text, in order. ``n_process > 1`` spreads the
+    NER work across worker processes (each loads its own copy of the model).
+    """
+    if batch_size is None:
+        batch_size = NLPConfig.SPACY_BATCH_SIZE
+    if n_process is None:
+        n_process = NLPConfig.SPACY_N_PROCESS
+
+    nlp = _load_nlp()
+    docs = [None] * len(texts)
+    if nlp is not None:
+        # Empty texts are skipped by _build_entities anyway
+        todo = [i for i, t in enumerate(texts) if t]
+        try:
+            piped = nlp.pipe((texts[i] for i in todo),
+                             batch_size=max(1, batch_size), n_process=max(1, n_process))
+            for i, doc in zip(todo, piped):
+                docs[i] = doc
+        except Exception as e:
+            print(f"spaCy batch NER failed, falling back to regex only: {e}")
+            docs = [None] * len(texts)
+    return [_build_entities(text, doc) for text, doc in zip(texts, docs)]
@@ -0,0 +1,297 @@
+"""PDF text extraction with page-level streaming, limits and CPU timeouts.
+
+``iter_pdf_pages`` drives pdfminer one page at a time and yields each page's
+text as soon as it is laid out, so callers can start matching skills before
+the document is finished and can stop early. ``extract_pdf`` wraps it with
+``max_pages`` / ``max_chars`` limits and a CPU-time budget, returning partial
+text (flagged ``truncated``) when a limit is hit.
+
+``submit_extraction`` runs ``extract_pdf`` in a shared process pool so a slow
+or hostile PDF never blocks a request thread. Inside pool workers the CPU
+budget is enforced with ``ITIMER_PROF``, which interrupts pdfminer even in the
+middle of a page; in other threads it is only checked between pages.
+
+Layout analysis is tuned with pdfminer ``LAParams``. ``fast`` mode skips it:
+characters are emitted in content-stream order with spaces and newlines
+inferred from the gaps between them. That saves roughly a third of the CPU
+time on text-heavy pages and is good enough for skill matching, but the text
+differs from pdfminer's layout mode.
+
+pdfminer is imported on first extraction, not with this module, so the web
+process starts without it; ``preload_worker`` imports it ahead of time.
+"""
+from __future__ import annotations
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from functools import lru_cache
+from io import StringIO
+from typing import (
+    TYPE_CHECKING, Any, BinaryIO, Dict, Generator, NamedTuple, Optional, Tuple, Union)
+import io
+import json
+import os
+import signal
+import threading
+import time
+
+from config import NLPConfig
+from resume_parser.pdf_processor import discard_download
+
+if TYPE_CHECKING:
+    from pdfminer.layout import LTChar, LTPage
+    from pdfminer.pdfinterp import PDFResourceManager
+
+
+class ExtractionTimeout(Exception):
+    """Raised when a document exceeds its CPU-time budget."""
+
+
+class ExtractionOptions(NamedTuple):
+    """How to extract one document. 0 disables a limit."""
+    max_pages: int = 0
+    max_chars: int = 0
+    cpu_timeout: float = 0.0
+    fast: bool = False
+    # LAParams overrides as sorted (name, value) pairs (hashable and picklable)
+    laparams: Tuple[Tuple[str, Any], ...] = ()
+
+    def cache_tag(self) -> str:
+        """Suffix for parse-cache keys; empty for pdfminer's default output."""
+        if not (self.max_pages or self.max_chars or self.fast or self.laparams):
+            return ''
+        return json.dumps([self.max_pages, self.max_chars, self.fast,
+                           list(self.laparams)], separators=(',', ':'))
+
+
+def default_extraction_options(**overrides: Any) -> ExtractionOptions:
+    """Options from NLPConfig, with per-call overrides (None = keep default)."""
+    options = ExtractionOptions(
+        max_pages=NLPConfig.PDF_MAX_PAGES,
+        max_chars=NLPConfig.PDF_MAX_CHARS,
+        cpu_timeout=NLPConfig.PDF_CPU_TIMEOUT_SECONDS,
+        fast=NLPConfig.PDF_FAST_MODE,
+        laparams=tuple(sorted(NLPConfig.PDF_LAPARAMS.items())))
+    overrides = {k: v for k, v in overrides.items() if v is not None}
+    if isinstance(overrides.get('laparams'), dict):
+        overrides['laparams'] = tuple(sorted(overrides['laparams'].items()))
+    return options._replace(**overrides)
+
+
+@lru_cache(maxsize=1)
+def _fast_text_converter_class():
+    """Define _FastTextConverter on first use, as it subclasses a pdfminer class."""
+    from pdfminer.converter import PDFLayoutAnalyzer
+    from pdfminer.layout import LTChar, LTContainer
+
+    class _FastTextConverter(PDFLayoutAnalyzer):
+        """Text device without layout analysis.
+
+        Characters are written in the order the PDF draws them. A newline is
+        inserted when the baseline moves by more than half a character height,
+        and a space when the horizontal gap exceeds a fraction of the character
+        width (unless the PDF already drew a space).
+        """
+
+        def __init__(self, rsrcmgr: PDFResourceManager, outfp: StringIO,
+                     word_margin: float = 0.1):
+            super().__init__(rsrcmgr, pageno=1, laparams=None)
+            self.outfp = outfp
+            self.word_margin = word_margin
+
+        def receive_layout(self, ltpage: LTPage) -> None:
+            write = self.outfp.write
+            last: Optional[LTChar] = None
+
+            def render(item) -> None:
+                nonlocal last
+                if isinstance(item, LTChar):
+                    if last is not None:
+                        height = max(item.height, last.height, 1.0)
+                        if abs(item.y0 - last.y0) > height / 2:
+                            write('\n')
+                        elif (item.x0 - last.x1 > self.word_margin * max(item.width, 1.0)
+                              and not last.get_text().isspace()
+                              and not item.get_text().isspace()):
+                            write(' ')
+                    write(item.get_text())
+                    last = item
+                elif isinstance(item, LTContainer):
+                    for child in item:
+                        render(child)
+
+            render(ltpage)
+            write('\n\f')
+
+        # Skip graphics entirely; only text is needed
+        def render_image(self, name, stream) -> None:
+            return
+
+        def paint_path(self, gstate, stroke, fill, evenodd, path) -> None:
+            return
+
+    return _FastTextConverter
+
+
+@contextmanager
+def _cpu_time_limit(seconds: float):
+    """Raise ExtractionTimeout once this process has used ``seconds`` of CPU.
+
+    Signals can only be handled in the main thread, so elsewhere this is a
+    no-op and iter_pdf_pages falls back to checking between pages.
+    """
+    if (not seconds or not hasattr(signal, 'setitimer')
+            or threading.current_thread() is not threading.main_thread()):
+        yield
+        return
+
+    def _on_timeout(signum, frame):
+        raise ExtractionTimeout(f"PDF extraction exceeded {seconds:g}s of CPU time")
+
+    previous = signal.signal(signal.SIGPROF, _on_timeout)
+    signal.setitimer(signal.ITIMER_PROF, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        signal.signal(signal.SIGPROF, previous)
+
+
+def iter_pdf_pages(fp: BinaryIO, options: ExtractionOptions = ExtractionOptions()
+                   ) -> Generator[str, None, Optional[str]]:
+    """Yield the text of each page in turn (pages end with a form feed).
+
+    Stops after ``options.max_pages`` pages without laying out the next one;
+    the generator then returns 'max_pages' (None if the document ended).
+    ``max_chars`` is not applied here: stop iterating to stop parsing.
+    ``options.cpu_timeout`` is checked between pages against the calling
+    thread's CPU time.
+    """
+    from pdfminer.converter import TextConverter
+    from pdfminer.layout import LAParams
+    from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+    from pdfminer.pdfpage import PDFPage
+
+    output = StringIO()
+    rsrcmgr = PDFResourceManager(caching=True)
+    if options.fast:
+        word_margin = dict(options.laparams).get('word_margin', 0.1)
+        device = _fast_text_converter_class()(rsrcmgr, output, word_margin=word_margin)
+    else:
+        device = TextConverter(rsrcmgr, output, laparams=LAParams(**dict(options.laparams)))
+    interpreter = PDFPageInterpreter(rsrcmgr, device)
+    deadline = time.thread_time() + options.cpu_timeout if options.cpu_timeout else None
+    try:
+        for pageno, page in enumerate(PDFPage.get_pages(fp, caching=True)):
+            if options.max_pages and pageno >= options.max_pages:
+                return 'max_pages'
+            interpreter.process_page(page)
+            text = output.getvalue()
+            output.seek(0)
+            output.truncate()
+            yield text
+            if deadline is not None and time.thread_time() > deadline:
+                raise ExtractionTimeout(
+                    f"PDF extraction exceeded {options.cpu_timeout:g}s of CPU time")
+    finally:
+        device.close()
+    return None
+
+
+def _as_file(pdf_source: Union[bytes, BinaryIO, str]):
+    if isinstance(pdf_source, (bytes, bytearray)):
+        return io.BytesIO(pdf_source), False
+    if hasattr(pdf_source, 'read'):
+        pdf_source.seek(0)
+        return pdf_source, False
+    return open(pdf_source, 'rb'), True
+
+
+def extract_pdf(pdf_source: Union[bytes, BinaryIO, str],
+                options: Optional[ExtractionOptions] = None,
+                on_page=None) -> Dict[str, Any]:
+    """Extract text from a PDF given as bytes, a file object or a path.
+
+    ``on_page(text)`` is called with each page's text as it is produced.
+    Returns ``{'text', 'pages', 'truncated'}`` where ``truncated`` is None or
+    the limit that stopped extraction ('max_pages', 'max_chars' or
+    'timeout'). Returns ``{'error': ...}`` if nothing could be extracted. The
+    source is released afterwards (see discard_download).
+    """
+    if options is None:
+        options = default_extraction_options()
+    parts = []
+    chars = 0
+    truncated = None
+    try:
+        fp, opened = _as_file(pdf_source)
+        try:
+            with _cpu_time_limit(options.cpu_timeout):
+                pages = iter_pdf_pages(fp, options)
+                while truncated is None:
+                    try:
+                        page_text = next(pages)
+                    except StopIteration as stop:
+                        truncated = stop.value
+                        break
+                    # Only text actually dropped counts as truncation: a
+                    # document of exactly max_chars characters is complete
+                    if options.max_chars and chars + len(page_text) > options.max_chars:
+                        page_text = page_text[:options.max_chars - chars]
+                        truncated = 'max_chars'
+                        if not page_text:
+                            break
+                    parts.append(page_text)
+                    chars += len(page_text)
+                    if on_page is not None:
+                        on_page(page_text)
+                pages.close()
+        finally:
+            if opened:
+                fp.close()
+    except ExtractionTimeout as e:
+        if not parts:
+            return {'error': str(e)}
+        print(f"PDF extraction stopped after {len(parts)} pages: {e}")
+        truncated = 'timeout'
+    except Exception as e:
+        print(f"Error extracting text from PDF: {e}")
+        return {'error': f"Failed to extract text from PDF: {e}"}
+    finally:
+        discard_download(pdf_source)
+    return {'text': ''.join(parts), 'pages': len(parts), 'truncated': truncated}
+
+
+def preload_worker() -> int:
+    """Import pdfminer in this process ahead of the first extraction.
+
+    Returns the process id, so callers can tell pool workers apart.
+    """
+    import pdfminer.pdfinterp  # noqa: F401
+    import pdfminer.pdfpage  # noqa: F401
+    _fast_text_converter_class()
+    return os.getpid()
+
+
+@lru_cache(maxsize=1)
+def get_extraction_pool() -> ProcessPoolExecutor:
+    """Worker processes shared by /parse and /parse_batch."""
+    return ProcessPoolExecutor(max_workers=max(1, NLPConfig.BATCH_EXTRACT_WORKERS))
+
+
+def submit_to_pool(fn, *args) -> Future:
+    """Submit work to the extraction pool, replacing it if a worker died."""
+    try:
+        return get_extraction_pool().submit(fn, *args)
+    except BrokenProcessPool:
+        print("Extraction pool was broken (a worker died); starting a new one")
+        get_extraction_pool.cache_clear()
+        return get_extraction_pool().submit(fn, *args)
+
+
+def submit_extraction(pdf_bytes: bytes,
+                      options: Optional[ExtractionOptions] = None) -> Future:
+    """Run ``extract_pdf`` on raw PDF bytes in a worker process."""
+    if options is None:
+        options = default_extraction_options()
+    return submit_to_pool(extract_pdf, pdf_bytes, options)
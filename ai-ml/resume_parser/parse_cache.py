@@ -0,0 +1,162 @@
+"""Content-addressed cache for parse results.
+
+Entries are keyed on the SHA-256 of the downloaded PDF bytes plus the text
+extractor version, so the same resume uploaded under different URLs is only
+run through pdfminer once. Each entry also records the skill taxonomy version
+it was produced with; a stale entry still saves the pdfminer pass and only
+has its skills recomputed.
+
+Two tiers are used: a small in-memory LRU in front of a SQLite file whose total
+payload size is capped by evicting the least recently used rows.
+"""
+from __future__ import annotations
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Optional, Union
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+
+from config import NLPConfig
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(source: Union[str, Path, BinaryIO]) -> str:
+    """Return the hex SHA-256 of a file object or a file on disk.
+
+    File objects are rewound to the start afterwards.
+    """
+    digest = hashlib.sha256()
+    if hasattr(source, 'read'):
+        source.seek(0)
+        for chunk in iter(lambda: source.read(_HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+        source.seek(0)
+        return digest.hexdigest()
+    with open(source, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ParseCache:
+    """Two-tier (memory LRU + SQLite) cache of parse results.
+
+    Values are JSON-serialisable dicts. All methods are thread-safe.
+    """
+
+    def __init__(self, db_path: Optional[Union[str, Path]] = None,
+                 memory_items: int = 256, max_disk_bytes: int = 256 * 1024 * 1024):
+        self.memory_items = max(0, memory_items)
+        self.max_disk_bytes = max(0, max_disk_bytes)
+        self._memory: OrderedDict[str, Dict[str, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self.stats = {'memory_hits': 0, 'disk_hits': 0,
+                      'misses': 0, 'stores': 0, 'evictions': 0}
+
+        if db_path is not None and self.max_disk_bytes > 0:
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS parse_cache ('
+                'key TEXT PRIMARY KEY, value BLOB NOT NULL, '
+                'size INTEGER NOT NULL, accessed REAL NOT NULL)')
+            self._conn.execute(
+                'CREATE INDEX IF NOT EXISTS parse_cache_accessed '
+                'ON parse_cache (accessed)')
+            self._conn.commit()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                return value
+
+            if self._conn is not None:
+                row = self._conn.execute(
+                    'SELECT value FROM parse_cache WHERE key = ?', (key,)).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        'UPDATE parse_cache SET accessed = ? WHERE key = ?',
+                        (time.time(), key))
+                    self._conn.commit()
+                    value = json.loads(zlib.decompress(row[0]))
+                    self._remember(key, value)
+                    self.stats['disk_hits'] += 1
+                    return value
+
+            self.stats['misses'] += 1
+            return None
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        with self._lock:
+            self._remember(key, value)
+            self.stats['stores'] += 1
+            if self._conn is None:
+                return
+            blob = zlib.compress(json.dumps(value).encode('utf-8'))
+            if len(blob) > self.max_disk_bytes:
+                return
+            self._conn.execute(
+                'INSERT OR REPLACE INTO parse_cache (key, value, size, accessed) '
+                'VALUES (?, ?, ?, ?)', (key, blob, len(blob), time.time()))
+            self._evict_disk()
+            self._conn.commit()
+
+    def snapshot_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats['memory_items'] = len(self._memory)
+            if self._conn is not None:
+                count, size = self._conn.execute(
+                    'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM parse_cache').fetchone()
+                stats['disk_items'] = count
+                stats['disk_bytes'] = size
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = (
+            (stats['memory_hits'] + stats['disk_hits']) / lookups if lookups else 0.0)
+        return stats
+
+    def _remember(self, key: str, value: Dict[str, Any]) -> None:
+        if self.memory_items == 0:
+            return
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self) -> None:
+        total = self._conn.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM parse_cache').fetchone()[0]
+        if total <= self.max_disk_bytes:
+            return
+        rows = self._conn.execute(
+            'SELECT key, size FROM parse_cache ORDER BY accessed ASC')
+        doomed = []
+        for key, size in rows:
+            if total <= self.max_disk_bytes:
+                break
+            doomed.append((key,))
+            total -= size
+        self._conn.executemany('DELETE FROM parse_cache WHERE key = ?', doomed)
+        self.stats['evictions'] += len(doomed)
+
+
+@lru_cache(maxsize=1)
+def get_parse_cache() -> Optional[ParseCache]:
+    """Return the process-wide parse cache, or None when caching is disabled."""
+    if not NLPConfig.PARSE_CACHE_ENABLED:
+        return None
+    return ParseCache(
+        db_path=NLPConfig.PARSE_CACHE_PATH,
+        memory_items=NLPConfig.PARSE_CACHE_MEMORY_ITEMS,
+        max_disk_bytes=NLPConfig.PARSE_CACHE_MAX_BYTES)
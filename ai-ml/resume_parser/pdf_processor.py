@@ -1,90 +1,164 @@
-from pdfminer.high_level import extract_text
+from functools import lru_cache
+import asyncio
+import io
 import os
+import sys
 import requests
+from requests.adapters import HTTPAdapter
 import tempfile
 from urllib.parse import urlparse
+from urllib3.util.retry import Retry
 
-# Configuration (tunable via environment variables)
-DEFAULT_MAX_BYTES = 10 * 1024 * 1024  # 10 MB
-DEFAULT_TIMEOUT = (5, 20)  # (connect timeout, read timeout)
+from config import NLPConfig
+from metrics import DOWNLOAD_BYTES, record_failure, stage
 
+# Settings are read once from NLPConfig instead of on every download
+MAX_DOWNLOAD_BYTES = NLPConfig.MAX_DOWNLOAD_BYTES
+DOWNLOAD_TIMEOUT = (5, max(5, NLPConfig.DOWNLOAD_TIMEOUT_SECONDS))  # (connect, read)
+# Downloads are kept in memory up to this size, then spill to a temp file
+DOWNLOAD_SPOOL_BYTES = NLPConfig.DOWNLOAD_SPOOL_BYTES
+ALLOWED_DOWNLOAD_HOSTS = tuple(
+    h.strip().lower()
+    for h in (NLPConfig.ALLOWED_DOWNLOAD_HOSTS or "").split(",") if h.strip())
+DOWNLOAD_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
 
-def download_file_from_url(file_url):
+# Bump whenever extract_text_from_pdf starts producing different text, so
+# cached results from the old extractor are not reused.
+EXTRACTOR_VERSION = "pdfminer-1"
+
+
+@lru_cache(maxsize=1)
+def get_download_session():
     """
-    Downloads a file from a URL into a temporary file.
-    Returns the path to the temporary file.
+    Returns the shared HTTP session used for downloads.
+    Connections are pooled per host and kept alive between requests, so only
+    the first download from a host pays for the TCP/TLS handshake. Connection
+    errors and 429/5xx responses are retried with exponential backoff.
     """
-    try:
-        # Basic URL validation
-        parsed = urlparse(file_url)
-        if parsed.scheme not in ("http", "https"):
+    retry = Retry(
+        total=NLPConfig.DOWNLOAD_RETRIES,
+        backoff_factor=NLPConfig.DOWNLOAD_BACKOFF_SECONDS,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        raise_on_status=False)
+    adapter = HTTPAdapter(
+        pool_connections=NLPConfig.DOWNLOAD_POOL_HOSTS,
+        pool_maxsize=NLPConfig.DOWNLOAD_POOL_SIZE,
+        max_retries=retry)
+    session = requests.Session()
+    session.headers.update(DOWNLOAD_HEADERS)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def _is_allowed_url(file_url):
+    """Checks the URL scheme and the optional ALLOWED_DOWNLOAD_HOSTS list."""
+    # Basic URL validation
+    parsed = urlparse(file_url)
+    if parsed.scheme not in ("http", "https"):
+        print(
+            f"Rejected download, unsupported URL scheme: {parsed.scheme}")
+        return False
+
+    # Optional allowed hosts check
+    if ALLOWED_DOWNLOAD_HOSTS:
+        hostname = parsed.hostname.lower() if parsed.hostname else ""
+        ok = any(hostname == h or hostname.endswith("." + h)
+                 for h in ALLOWED_DOWNLOAD_HOSTS)
+        if not ok:
             print(
-                f"Rejected download, unsupported URL scheme: {parsed.scheme}")
-            return None
+                f"Rejected download, host not in ALLOWED_DOWNLOAD_HOSTS: {hostname}")
+            return False
+    return True
 
-        # Optional allowed hosts check
-        allowed = os.getenv("ALLOWED_DOWNLOAD_HOSTS")
-        if allowed:
-            allowed_hosts = [h.strip().lower()
-                             for h in allowed.split(",") if h.strip()]
-            hostname = parsed.hostname.lower() if parsed.hostname else ""
-            ok = any(hostname == h or hostname.endswith("." + h)
-                     for h in allowed_hosts)
-            if not ok:
-                print(
-                    f"Rejected download, host not in ALLOWED_DOWNLOAD_HOSTS: {hostname}")
-                return None
 
-        # Configurable limits
-        max_bytes = int(os.getenv("MAX_DOWNLOAD_BYTES", DEFAULT_MAX_BYTES))
-        timeout = DEFAULT_TIMEOUT
-        env_timeout = os.getenv("DOWNLOAD_TIMEOUT_SECONDS")
-        if env_timeout:
-            try:
-                t = int(env_timeout)
-                timeout = (5, max(5, t))
-            except ValueError:
-                pass
+def _check_content_type(content_type, file_url):
+    content_type = (content_type or "").lower()
+    # Basic content type check for PDFs
+    if content_type and not (
+        "application/pdf" in content_type or
+        "application/octet-stream" in content_type or
+        "application/x-pdf" in content_type
+    ):
+        print(
+            f"Warning: unexpected Content-Type '{content_type}' for {file_url}")
+
+
+def _too_large(content_length):
+    """Reject early when the server already tells us the file is too big."""
+    if content_length and content_length.isdigit() and int(content_length) > MAX_DOWNLOAD_BYTES:
+        print(
+            f"Download exceeded max size ({MAX_DOWNLOAD_BYTES} bytes), aborting")
+        return True
+    return False
+
+
+def download_file_from_url(file_url):
+    """
+    Downloads a file from a URL into memory.
+    Returns a file object positioned at the start of the data. Small files
+    never touch the disk; files above the spool threshold are moved to a
+    temporary file transparently. Close it (or hand it to
+    extract_text_from_pdf) when done.
+    """
+    return download_file_or_cause(file_url)[0]
+
+
+def download_file_or_cause(file_url):
+    """
+    Like download_file_from_url, but returns (file, None) on success and
+    (None, cause) on failure. The cause is the label recorded in the failure
+    metrics: 'rejected_url', 'too_large', 'http_<status>', 'timeout',
+    'connection' or 'error' (see is_transient_download_failure).
+    """
+    with stage('download', host=urlparse(file_url).hostname):
+        pdf_file, cause = _download(file_url)
+    if cause is not None:
+        record_failure('download', cause)
+    return pdf_file, cause
+
+
+def is_transient_download_failure(cause):
+    """True for download failures worth retrying later: timeouts, connection errors, 429 and 5xx."""
+    if cause in ('timeout', 'connection', 'http_429'):
+        return True
+    return cause is not None and cause.startswith('http_5')
+
+
+def _download(file_url):
+    try:
+        if not _is_allowed_url(file_url):
+            return None, 'rejected_url'
 
         # Stream the response and enforce size limits
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-        with requests.get(file_url, stream=True, timeout=timeout, headers=headers) as response:
+        with get_download_session().get(file_url, stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
             response.raise_for_status()
+            _check_content_type(response.headers.get("Content-Type"), file_url)
+            if _too_large(response.headers.get("Content-Length")):
+                return None, 'too_large'
 
-            content_type = response.headers.get("Content-Type", "").lower()
-            # Basic content type check for PDFs
-            if content_type and not (
-                "application/pdf" in content_type or
-                "application/octet-stream" in content_type or
-                "application/x-pdf" in content_type
-            ):
-                print(
-                    f"Warning: unexpected Content-Type '{content_type}' for {file_url}")
-
+            buffer = tempfile.SpooledTemporaryFile(
+                max_size=DOWNLOAD_SPOOL_BYTES, suffix=".pdf")
             total = 0
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_file:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if not chunk:
-                        continue
-                    total += len(chunk)
-                    if total > max_bytes:
-                        # Exceeded allowed download size
-                        print(
-                            f"Download exceeded max size ({max_bytes} bytes), aborting")
-                        temp_path = temp_file.name
-                        temp_file.close()
-                        try:
-                            if os.path.exists(temp_path):
-                                os.remove(temp_path)
-                        except Exception:
-                            pass
-                        return None
-                    temp_file.write(chunk)
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                if not chunk:
+                    continue
+                total += len(chunk)
+                if total > MAX_DOWNLOAD_BYTES:
+                    # Exceeded allowed download size
+                    print(
+                        f"Download exceeded max size ({MAX_DOWNLOAD_BYTES} bytes), aborting")
+                    buffer.close()
+                    return None, 'too_large'
+                buffer.write(chunk)
 
-            print(f"File downloaded to: {temp_file.name} ({total} bytes)")
-            return temp_file.name
+            buffer.seek(0)
+            print(f"File downloaded ({total} bytes)")
+            DOWNLOAD_BYTES.observe(total)
+            return buffer, None
     except requests.exceptions.HTTPError as e:
         if e.response.status_code == 401:
             print(f"Error downloading file: 401 Unauthorized. The file might be private or require authentication.")
@@ -93,25 +167,149 @@ def download_file_from_url(file_url):
                 f"Solution: Re-upload the resume or check Cloudinary settings to ensure public read access.")
         else:
             print(f"HTTP Error downloading file: {e}")
-        return None
+        return None, f"http_{e.response.status_code}"
     except requests.exceptions.RequestException as e:
         print(f"Error downloading file: {e}")
+        return None, _request_failure_cause(e)
+
+
+def _request_failure_cause(error):
+    """Failure label for a requests or httpx transport error."""
+    timeouts = (requests.exceptions.Timeout,)
+    connection_errors = (requests.exceptions.ConnectionError,)
+    # If httpx was never imported, this cannot be an httpx error
+    httpx = sys.modules.get('httpx')
+    if httpx is not None:
+        timeouts += (httpx.TimeoutException,)
+        connection_errors += (httpx.ConnectError,)
+    if isinstance(error, timeouts):
+        return 'timeout'
+    if isinstance(error, connection_errors):
+        return 'connection'
+    return 'error'
+
+
+# Status codes retried by the async downloader, as for get_download_session
+_RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def _import_httpx():
+    # httpx is optional and only used by the ASGI server
+    try:
+        import httpx
+    except ImportError as e:
+        raise RuntimeError(
+            "httpx is not installed. Install the optional async requirements "
+            "to use the ASGI server.") from e
+    return httpx
+
+
+def get_async_download_client():
+    """
+    Returns an httpx.AsyncClient for non-blocking downloads.
+    Create one per event loop (the ASGI app keeps one for its lifetime) and
+    close it with ``await client.aclose()``.
+    """
+    httpx = _import_httpx()
+    return httpx.AsyncClient(
+        headers=DOWNLOAD_HEADERS,
+        follow_redirects=True,
+        timeout=httpx.Timeout(DOWNLOAD_TIMEOUT[1], connect=DOWNLOAD_TIMEOUT[0]),
+        limits=httpx.Limits(
+            max_connections=NLPConfig.ASYNC_MAX_IN_FLIGHT,
+            max_keepalive_connections=NLPConfig.DOWNLOAD_POOL_SIZE))
+
+
+async def download_file_async(client, file_url):
+    """
+    Downloads a file without blocking the event loop.
+    Same checks and limits as download_file_from_url, and the same retries
+    with exponential backoff on connection errors and 429/5xx responses.
+    Returns the file's bytes, or None.
+    """
+    with stage('download', host=urlparse(file_url).hostname):
+        return await _download_async(client, file_url)
+
+
+async def _download_async(client, file_url):
+    httpx = _import_httpx()
+    if not _is_allowed_url(file_url):
+        record_failure('download', 'rejected_url')
         return None
 
+    attempts = max(0, NLPConfig.DOWNLOAD_RETRIES) + 1
+    for attempt in range(attempts):
+        last_attempt = attempt == attempts - 1
+        try:
+            async with client.stream("GET", file_url) as response:
+                if response.status_code in _RETRY_STATUSES and not last_attempt:
+                    await asyncio.sleep(NLPConfig.DOWNLOAD_BACKOFF_SECONDS * 2 ** attempt)
+                    continue
+                response.raise_for_status()
+                _check_content_type(response.headers.get("Content-Type"), file_url)
+                if _too_large(response.headers.get("Content-Length")):
+                    record_failure('download', 'too_large')
+                    return None
+
+                buffer = bytearray()
+                async for chunk in response.aiter_bytes(64 * 1024):
+                    buffer += chunk
+                    if len(buffer) > MAX_DOWNLOAD_BYTES:
+                        print(
+                            f"Download exceeded max size ({MAX_DOWNLOAD_BYTES} bytes), aborting")
+                        record_failure('download', 'too_large')
+                        return None
+                print(f"File downloaded ({len(buffer)} bytes)")
+                DOWNLOAD_BYTES.observe(len(buffer))
+                return bytes(buffer)
+        except httpx.HTTPStatusError as e:
+            print(f"HTTP Error downloading file: {e}")
+            record_failure('download', f"http_{e.response.status_code}")
+            return None
+        except httpx.TransportError as e:
+            if last_attempt:
+                print(f"Error downloading file: {e}")
+                record_failure('download', _request_failure_cause(e))
+                return None
+            await asyncio.sleep(NLPConfig.DOWNLOAD_BACKOFF_SECONDS * 2 ** attempt)
+    return None
+
 
-def extract_text_from_pdf(pdf_path):
+def discard_download(pdf_source):
     """
-    Extracts raw text from a given PDF file.
+    Releases a downloaded file: closes file objects and removes files on disk.
     """
+    if pdf_source is None or isinstance(pdf_source, (bytes, bytearray)):
+        return
+    if hasattr(pdf_source, "close"):
+        pdf_source.close()
+        return
+    try:
+        if os.path.exists(pdf_source):
+            os.remove(pdf_source)
+            print(f"Temporary file {pdf_source} removed")
+    except OSError:
+        pass
+
+
+def extract_text_from_pdf(pdf_source):
+    """
+    Extracts raw text from a PDF given as a file object, raw bytes or a path.
+    The source is released afterwards (see discard_download).
+    """
+    from pdfminer.high_level import extract_text
+
     try:
+        if isinstance(pdf_source, (bytes, bytearray)):
+            pdf_source = io.BytesIO(pdf_source)
+        elif hasattr(pdf_source, "seek"):
+            pdf_source.seek(0)
         # Use pdfminer.six to extract text
-        text = extract_text(pdf_path)
+        text = extract_text(pdf_source)
         return text
     except Exception as e:
-        print(f"Error extracting text from {pdf_path}: {e}")
+        print(f"Error extracting text from PDF: {e}")
         return None
     finally:
-        # Clean up: Remove the temporary file after processing
-        if os.path.exists(pdf_path):
-            os.remove(pdf_path)
-            print(f"Temporary file {pdf_path} removed")
+        # Clean up: release the download after processing
+        discard_download(pdf_source)
@@ -0,0 +1,617 @@
+"""Columnar on-disk store of parse results for offline scans.
+
+Every parsed resume becomes one row: ``doc_id`` (the resume id, or the file
+URL), ``source``, the compressed text, the skills, ``word_count``,
+``page_count``, ``truncated`` and ``parsed_at``. Rows are first appended to a
+journal (``pending.log``). Every ``segment_rows`` rows the journal is sealed
+into an immutable segment directory, which holds one file per column:
+
+- fixed-width columns are ``.npy`` arrays;
+- strings are a ``.bin`` byte blob plus an ``.off.npy`` array of row offsets;
+- each text is zlib-compressed on its own, so a single row can be read back
+  without inflating its neighbours;
+- skills are dictionary-encoded as ``uint32`` ids (the shared dictionary is
+  the append-only ``skills.log``), stored in the same offsets layout;
+- ``truncated`` is a ``uint8`` code into the segment's ``meta.json``.
+
+Segments are opened memory-mapped, so a scan over millions of rows only
+pages in the columns it touches. ``manifest.json`` lists the live segments
+and is replaced atomically. A row with the same ``doc_id`` as an earlier
+one supersedes it, and ``compact`` merges all segments into one that holds
+only the latest row per ``doc_id``.
+
+A store is safe to use from several threads of one process. Only one writer
+can open a given directory at a time: a writable store holds an exclusive
+lock on ``writer.lock`` until it is closed (or its process exits), and
+opening a second one raises ``StoreLockedError``. Other processes can open
+the directory with ``read_only=True`` to scan it alongside the writer. A
+reader sees a snapshot as of its open: rows appended later are not in it,
+and segments replaced by ``compact`` stay on disk until the next writable
+open, so a reader should not outlive a restart of the writer.
+"""
+from __future__ import annotations
+from functools import lru_cache
+from pathlib import Path
+from typing import (
+    Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple, Union)
+import json
+import os
+import shutil
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from config import NLPConfig
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, one writer is up to the caller
+    fcntl = None
+
+_MANIFEST_FILE = 'manifest.json'
+_PENDING_FILE = 'pending.log'
+_SKILLS_FILE = 'skills.log'
+_SEGMENT_META_FILE = 'meta.json'
+_LOCK_FILE = 'writer.lock'
+
+# Column name -> dtype of the fixed-width columns
+_FIXED_COLUMNS = {'word_count': np.int32, 'page_count': np.int32, 'parsed_at': np.float64}
+_STRING_COLUMNS = ('doc_id', 'source')
+# page_count is -1 when unknown
+_NO_PAGE_COUNT = -1
+
+
+def _mmap_bytes(path: Path) -> np.ndarray:
+    # np.memmap refuses empty files
+    if path.stat().st_size == 0:
+        return np.empty(0, dtype=np.uint8)
+    return np.memmap(path, dtype=np.uint8, mode='r')
+
+
+def _write_fsync(path: Path, data: bytes) -> None:
+    with open(path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _save_npy(path: Path, array: np.ndarray) -> None:
+    with open(path, 'wb') as f:
+        np.save(f, array)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _pack(blobs: Sequence[bytes]) -> Tuple[bytes, np.ndarray]:
+    """Concatenate byte strings, returning the blob and ``len + 1`` offsets."""
+    offsets = np.zeros(len(blobs) + 1, dtype=np.int64)
+    if blobs:
+        np.cumsum([len(b) for b in blobs], out=offsets[1:])
+    return b''.join(blobs), offsets
+
+
+def _take(data: np.ndarray, offsets: np.ndarray, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Gather variable-length rows of an offsets-encoded column."""
+    starts, ends = offsets[rows], offsets[rows + 1]
+    lengths = ends - starts
+    new_offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=new_offsets[1:])
+    if not len(rows):
+        return data[:0], new_offsets
+    # Index of every selected element: each row's start, repeated and stepped
+    index = np.repeat(starts - new_offsets[:-1], lengths) + np.arange(new_offsets[-1])
+    return np.asarray(data[index]), new_offsets
+
+
+class Segment:
+    """One sealed, immutable, memory-mapped segment."""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.meta = json.loads((self.path / _SEGMENT_META_FILE).read_text())
+        self.rows = int(self.meta['rows'])
+        self.columns: Dict[str, np.ndarray] = {}
+        for name in _FIXED_COLUMNS:
+            self.columns[name] = np.load(self.path / f'{name}.npy', mmap_mode='r')
+        self.columns['truncated'] = np.load(self.path / 'truncated.npy', mmap_mode='r')
+        for name in _STRING_COLUMNS + ('text',):
+            self.columns[name] = _mmap_bytes(self.path / f'{name}.bin')
+            self.columns[name + '.off'] = np.load(self.path / f'{name}.off.npy', mmap_mode='r')
+        self.columns['skills'] = np.load(self.path / 'skills.npy', mmap_mode='r')
+        self.columns['skills.off'] = np.load(self.path / 'skills.off.npy', mmap_mode='r')
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def _bytes(self, column: str, row: int) -> bytes:
+        offsets = self.columns[column + '.off']
+        return bytes(self.columns[column][offsets[row]:offsets[row + 1]])
+
+    def string(self, column: str, row: int) -> str:
+        return self._bytes(column, row).decode('utf-8')
+
+    def strings(self, column: str) -> List[str]:
+        data = bytes(self.columns[column])
+        offsets = self.columns[column + '.off'].tolist()
+        return [data[a:b].decode('utf-8') for a, b in zip(offsets, offsets[1:])]
+
+    def text(self, row: int) -> str:
+        return zlib.decompress(self._bytes('text', row)).decode('utf-8')
+
+    def skill_ids(self, row: int) -> np.ndarray:
+        offsets = self.columns['skills.off']
+        return self.columns['skills'][offsets[row]:offsets[row + 1]]
+
+    def truncated(self, row: int) -> Optional[str]:
+        return self.meta['truncated_values'][int(self.columns['truncated'][row])] or None
+
+
+class StoreLockedError(RuntimeError):
+    """Another writer already has the store open."""
+
+
+class ParseResultStore:
+    """Append-only columnar store of parse results (see the module docstring)."""
+
+    def __init__(self, directory: Union[str, Path], segment_rows: int = 10000,
+                 compress_level: int = 6, read_only: bool = False):
+        self.directory = Path(directory)
+        self.read_only = read_only
+        self._lock_file = None
+        if not read_only:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._acquire_writer_lock()
+        self.segment_rows = max(1, segment_rows)
+        self.compress_level = compress_level
+        self._lock = threading.RLock()
+        self._skills: List[str] = []
+        self._skill_ids: Dict[str, int] = {}
+        self._pending: List[Dict[str, Any]] = []
+        self._segments: List[Segment] = []
+        self._next_segment = 0
+        # doc_id -> (segment index, row); segment index len(self._segments)
+        # means the pending journal. Built on first use.
+        self._latest: Optional[Dict[str, Tuple[int, int]]] = None
+
+        # The journal is read before the manifest: a flush running alongside
+        # a reader swaps the manifest first and truncates the journal after,
+        # so in this order its rows show up at least once (the segment and
+        # the journal copies share doc_ids), never zero times
+        self._replay_pending()
+        manifest_path = self.directory / _MANIFEST_FILE
+        if manifest_path.exists():
+            manifest = json.loads(manifest_path.read_text())
+            self._segments = [Segment(self.directory / name) for name in manifest['segments']]
+            self._next_segment = int(manifest['next_segment'])
+        if not read_only:
+            self._remove_orphans()
+        # Skills are added to the dictionary before any row that uses them is
+        # written, so loading it last covers every row seen above
+        self._load_skills()
+
+    def close(self) -> None:
+        """Release the writer lock. Pending rows stay in the journal."""
+        with self._lock:
+            if self._lock_file is not None:
+                self._lock_file.close()
+                self._lock_file = None
+                self.read_only = True
+
+    # -- writing ------------------------------------------------------------
+
+    def append(self, doc_id: str, result: Mapping[str, Any], source: str = '') -> None:
+        """Add the parse result of ``doc_id``, superseding any earlier row.
+
+        ``result`` has the /parse fields: ``extracted_text``,
+        ``extracted_skills``, ``word_count`` and optionally ``page_count``
+        and ``truncated``.
+        """
+        self._check_writable()
+        text = result.get('extracted_text') or ''
+        row = {
+            'doc_id': str(doc_id),
+            'source': source or '',
+            'text': text,
+            'skills': sorted({str(s) for s in result.get('extracted_skills') or ()}),
+            'word_count': int(result.get('word_count') or len(text.split())),
+            'page_count': result.get('page_count'),
+            'truncated': result.get('truncated'),
+            'parsed_at': time.time()
+        }
+        with self._lock:
+            self._encode_skills(row['skills'])
+            with open(self.directory / _PENDING_FILE, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(row) + '\n')
+            self._pending.append(row)
+            if self._latest is not None:
+                self._latest[row['doc_id']] = (len(self._segments), len(self._pending) - 1)
+            if len(self._pending) >= self.segment_rows:
+                self.flush()
+
+    def flush(self) -> Optional[Path]:
+        """Seal the journalled rows into a new segment. Returns its path, if any."""
+        self._check_writable()
+        with self._lock:
+            if not self._pending:
+                return None
+            path = self._write_segment(self._encode_rows(self._pending))
+            self._segments.append(Segment(path))
+            self._write_manifest()
+            self._pending = []
+            # A crash before this truncation replays rows that are already in
+            # the segment; they carry the same doc_ids, so nothing changes.
+            (self.directory / _PENDING_FILE).write_bytes(b'')
+            # Pending rows became the last segment; their indices are unchanged
+            return path
+
+    def compact(self) -> Dict[str, int]:
+        """Merge the sealed segments into one holding only the latest row per doc_id.
+
+        Journalled rows stay pending. The replaced segments are left on disk
+        until the store is next opened for writing. Returns row and segment
+        counts before and after.
+        """
+        self._check_writable()
+        with self._lock:
+            before = {'segments_before': len(self._segments),
+                      'rows_before': sum(len(s) for s in self._segments)}
+            if not self._segments:
+                return dict(before, segments_after=0, rows_after=0)
+            live = self._live_rows()
+            columns: Dict[str, List[np.ndarray]] = {}
+            truncated_values = ['']
+            for index, segment in enumerate(self._segments):
+                rows = live[index]
+                seg_columns = segment.columns
+                for name in _FIXED_COLUMNS:
+                    columns.setdefault(name, []).append(np.asarray(seg_columns[name][rows]))
+                # Re-map this segment's truncated codes onto the merged table
+                codes = np.zeros(len(segment.meta['truncated_values']), dtype=np.uint8)
+                for code, value in enumerate(segment.meta['truncated_values']):
+                    if value not in truncated_values:
+                        truncated_values.append(value)
+                    codes[code] = truncated_values.index(value)
+                columns.setdefault('truncated', []).append(codes[seg_columns['truncated'][rows]])
+                for name in _STRING_COLUMNS + ('text', 'skills'):
+                    data, offsets = _take(seg_columns[name], seg_columns[name + '.off'], rows)
+                    columns.setdefault(name, []).append(data)
+                    columns.setdefault(name + '.off', []).append(offsets)
+
+            merged = {name: np.concatenate(parts) for name, parts in columns.items()
+                      if not name.endswith('.off')}
+            for name in _STRING_COLUMNS + ('text', 'skills'):
+                merged[name + '.off'] = self._merge_offsets(columns[name + '.off'])
+            merged['truncated_values'] = truncated_values
+            path = self._write_segment(merged)
+
+            self._segments = [Segment(path)]
+            self._write_manifest()
+            self._latest = None
+            # The replaced segments stay on disk: a reader may have read the
+            # old manifest and not opened them yet. The next writable open
+            # removes them as orphans.
+            return dict(before, segments_after=1, rows_after=len(self._segments[0]))
+
+    # -- reading ------------------------------------------------------------
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._latest_map())
+
+    def __contains__(self, doc_id: str) -> bool:
+        with self._lock:
+            return str(doc_id) in self._latest_map()
+
+    @property
+    def skills(self) -> List[str]:
+        """The skill dictionary: ``skills[i]`` is the skill with id ``i``."""
+        with self._lock:
+            return list(self._skills)
+
+    def segments(self) -> List[Segment]:
+        """The sealed segments, oldest first (pending rows are not included)."""
+        with self._lock:
+            return list(self._segments)
+
+    def ids(self) -> List[str]:
+        with self._lock:
+            return list(self._latest_map())
+
+    def get(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        """Return the latest row for ``doc_id`` in /parse form, or None."""
+        with self._lock:
+            location = self._latest_map().get(str(doc_id))
+            if location is None:
+                return None
+            index, row = location
+            if index == len(self._segments):
+                return self._pending_row(self._pending[row])
+            return self._segment_row(self._segments[index], row)
+
+    def iter_rows(self, include_text: bool = True) -> Iterator[Dict[str, Any]]:
+        """Yield the latest row of every doc_id, in insertion order."""
+        with self._lock:
+            segments = list(self._segments)
+            live = self._live_rows()
+            pending = [self._pending[row] for row in live[len(segments)]]
+        for segment, rows in zip(segments, live):
+            for row in rows.tolist():
+                yield self._segment_row(segment, row, include_text)
+        for row in pending:
+            yield self._pending_row(row, include_text)
+
+    def skill_matrix(self) -> Tuple[List[str], Any]:
+        """Return ``(doc_ids, matrix)``: a sparse docs x skills 0/1 CSR matrix.
+
+        Column ``j`` is ``skills[j]``. A writable store flushes its pending
+        rows first, so every row comes from the memory-mapped columns.
+        """
+        from scipy.sparse import csr_matrix
+        with self._lock:
+            if not self.read_only:
+                self.flush()
+            live = self._live_rows()
+            doc_ids: List[str] = []
+            indices, lengths = [], []
+            for segment, rows in zip(self._segments, live):
+                ids = segment.strings('doc_id')
+                doc_ids.extend(ids[r] for r in rows.tolist())
+                data, offsets = _take(segment.columns['skills'],
+                                      segment.columns['skills.off'], rows)
+                indices.append(data)
+                lengths.append(np.diff(offsets))
+            for row in live[len(self._segments)].tolist():
+                doc_ids.append(self._pending[row]['doc_id'])
+                skill_ids = [self._skill_ids[s] for s in self._pending[row]['skills']]
+                indices.append(np.array(skill_ids, dtype=np.uint32))
+                lengths.append(np.array([len(skill_ids)], dtype=np.int64))
+            n_skills = len(self._skills)
+        indices_arr = np.concatenate(indices) if indices else np.empty(0, np.uint32)
+        indptr = np.zeros(len(doc_ids) + 1, dtype=np.int64)
+        if lengths:
+            np.cumsum(np.concatenate(lengths), out=indptr[1:])
+        matrix = csr_matrix(
+            (np.ones(len(indices_arr), dtype=np.float32), indices_arr, indptr),
+            shape=(len(doc_ids), n_skills))
+        return doc_ids, matrix
+
+    def skill_counts(self) -> Dict[str, int]:
+        """Number of live rows listing each skill, most common first."""
+        with self._lock:
+            live = self._live_rows()
+            counts = np.zeros(len(self._skills), dtype=np.int64)
+            for segment, rows in zip(self._segments, live):
+                data, _ = _take(segment.columns['skills'], segment.columns['skills.off'], rows)
+                counts += np.bincount(data, minlength=len(counts))
+            for row in live[len(self._segments)].tolist():
+                for skill in self._pending[row]['skills']:
+                    counts[self._skill_ids[skill]] += 1
+            order = np.argsort(-counts, kind='stable')
+            return {self._skills[i]: int(counts[i]) for i in order if counts[i]}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            disk_bytes = sum(f.stat().st_size for s in self._segments
+                             for f in s.path.iterdir())
+            stored = sum(len(s) for s in self._segments) + len(self._pending)
+            return {'rows': len(self._latest_map()), 'stored_rows': stored,
+                    'segments': len(self._segments), 'pending_rows': len(self._pending),
+                    'skills': len(self._skills), 'segment_bytes': disk_bytes}
+
+    # -- internals ----------------------------------------------------------
+
+    def _acquire_writer_lock(self) -> None:
+        lock_file = open(self.directory / _LOCK_FILE, 'a')
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock_file.close()
+                raise StoreLockedError(
+                    f"Parse result store at {self.directory} is already open for writing "
+                    f"by another process; open it with read_only=True instead")
+        self._lock_file = lock_file
+
+    def _check_writable(self) -> None:
+        if self.read_only:
+            raise RuntimeError(f"Parse result store at {self.directory} is open read-only")
+
+    def _latest_map(self) -> Dict[str, Tuple[int, int]]:
+        if self._latest is None:
+            latest: Dict[str, Tuple[int, int]] = {}
+            for index, segment in enumerate(self._segments):
+                for row, doc_id in enumerate(segment.strings('doc_id')):
+                    latest[doc_id] = (index, row)
+            pending_index = len(self._segments)
+            for row, entry in enumerate(self._pending):
+                latest[entry['doc_id']] = (pending_index, row)
+            self._latest = latest
+        return self._latest
+
+    def _live_rows(self) -> List[np.ndarray]:
+        """Sorted live row numbers per segment, plus one entry for pending rows."""
+        grouped: List[List[int]] = [[] for _ in range(len(self._segments) + 1)]
+        for index, row in self._latest_map().values():
+            grouped[index].append(row)
+        return [np.sort(np.asarray(rows, dtype=np.int64)) for rows in grouped]
+
+    def _encode_skills(self, skills: Iterable[str]) -> List[int]:
+        new = [s for s in skills if s not in self._skill_ids]
+        if new:
+            # The dictionary must be durable before any segment refers to it
+            with open(self.directory / _SKILLS_FILE, 'a', encoding='utf-8') as f:
+                for skill in new:
+                    self._skill_ids[skill] = len(self._skills)
+                    self._skills.append(skill)
+                    f.write(json.dumps(skill) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+        return [self._skill_ids[s] for s in skills]
+
+    def _encode_rows(self, rows: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+        truncated_values = ['']
+        truncated = np.zeros(len(rows), dtype=np.uint8)
+        for i, row in enumerate(rows):
+            value = row['truncated'] or ''
+            if value not in truncated_values:
+                truncated_values.append(value)
+            truncated[i] = truncated_values.index(value)
+
+        columns: Dict[str, Any] = {
+            'word_count': np.array([r['word_count'] for r in rows], dtype=np.int32),
+            'page_count': np.array(
+                [_NO_PAGE_COUNT if r['page_count'] is None else r['page_count'] for r in rows],
+                dtype=np.int32),
+            'parsed_at': np.array([r['parsed_at'] for r in rows], dtype=np.float64),
+            'truncated': truncated,
+            'truncated_values': truncated_values
+        }
+        for name in _STRING_COLUMNS:
+            data, offsets = _pack([r[name].encode('utf-8') for r in rows])
+            columns[name] = np.frombuffer(data, dtype=np.uint8)
+            columns[name + '.off'] = offsets
+        data, offsets = _pack([zlib.compress(r['text'].encode('utf-8'), self.compress_level)
+                               for r in rows])
+        columns['text'] = np.frombuffer(data, dtype=np.uint8)
+        columns['text.off'] = offsets
+        skill_lists = [self._encode_skills(r['skills']) for r in rows]
+        columns['skills.off'] = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum([len(s) for s in skill_lists], out=columns['skills.off'][1:])
+        columns['skills'] = np.fromiter(
+            (i for s in skill_lists for i in s), dtype=np.uint32,
+            count=int(columns['skills.off'][-1]))
+        return columns
+
+    @staticmethod
+    def _merge_offsets(parts: Sequence[np.ndarray]) -> np.ndarray:
+        merged = [np.zeros(1, dtype=np.int64)]
+        total = 0
+        for offsets in parts:
+            merged.append(offsets[1:] + total)
+            total += int(offsets[-1])
+        return np.concatenate(merged)
+
+    def _write_segment(self, columns: Dict[str, Any]) -> Path:
+        name = f'seg-{self._next_segment:08d}'
+        self._next_segment += 1
+        tmp = self.directory / (name + '.tmp')
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir()
+        for column in _FIXED_COLUMNS:
+            _save_npy(tmp / f'{column}.npy', columns[column])
+        _save_npy(tmp / 'truncated.npy', columns['truncated'])
+        for column in _STRING_COLUMNS + ('text',):
+            _write_fsync(tmp / f'{column}.bin', np.asarray(columns[column]).tobytes())
+            _save_npy(tmp / f'{column}.off.npy', columns[column + '.off'])
+        _save_npy(tmp / 'skills.npy', np.asarray(columns['skills'], dtype=np.uint32))
+        _save_npy(tmp / 'skills.off.npy', columns['skills.off'])
+        rows = len(columns['word_count'])
+        _write_fsync(tmp / _SEGMENT_META_FILE, json.dumps({
+            'rows': rows, 'truncated_values': columns['truncated_values'],
+            'created': time.time()}).encode('utf-8'))
+        path = self.directory / name
+        os.replace(tmp, path)
+        return path
+
+    def _write_manifest(self) -> None:
+        tmp = self.directory / (_MANIFEST_FILE + '.tmp')
+        _write_fsync(tmp, json.dumps({
+            'segments': [s.path.name for s in self._segments],
+            'next_segment': self._next_segment}).encode('utf-8'))
+        os.replace(tmp, self.directory / _MANIFEST_FILE)
+
+    def _remove_orphans(self) -> None:
+        # Segments replaced by compact(), or written when a previous writer
+        # crashed
+        live = {s.path.name for s in self._segments}
+        for path in self.directory.glob('seg-*'):
+            if path.is_dir() and path.name not in live:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def _load_skills(self) -> None:
+        path = self.directory / _SKILLS_FILE
+        if not path.exists():
+            return
+        data = path.read_bytes()
+        if not data.endswith(b'\n'):
+            # A torn final line (a crash, or a writer mid-append); line numbers
+            # are ids, so a writer drops it before appending after it
+            data = data[:data.rfind(b'\n') + 1]
+            if not self.read_only:
+                path.write_bytes(data)
+        for line in data.decode('utf-8').splitlines():
+            skill = json.loads(line)
+            self._skill_ids[skill] = len(self._skills)
+            self._skills.append(skill)
+
+    def _replay_pending(self) -> None:
+        path = self.directory / _PENDING_FILE
+        if not path.exists():
+            return
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    self._pending.append(json.loads(line))
+                except ValueError:
+                    # A torn final line from a crash mid-append; ignore it.
+                    continue
+
+    def _segment_row(self, segment: Segment, row: int,
+                     include_text: bool = True) -> Dict[str, Any]:
+        skills = [self._skills[i] for i in segment.skill_ids(row).tolist()]
+        out = {
+            'doc_id': segment.string('doc_id', row),
+            'source': segment.string('source', row),
+            'extracted_skills': skills,
+            'word_count': int(segment.columns['word_count'][row]),
+            'parsed_at': float(segment.columns['parsed_at'][row])
+        }
+        if include_text:
+            out['extracted_text'] = segment.text(row)
+        page_count = int(segment.columns['page_count'][row])
+        if page_count != _NO_PAGE_COUNT:
+            out['page_count'] = page_count
+        truncated = segment.truncated(row)
+        if truncated:
+            out['truncated'] = truncated
+        return out
+
+    @staticmethod
+    def _pending_row(entry: Dict[str, Any], include_text: bool = True) -> Dict[str, Any]:
+        out = {
+            'doc_id': entry['doc_id'],
+            'source': entry['source'],
+            'extracted_skills': list(entry['skills']),
+            'word_count': entry['word_count'],
+            'parsed_at': entry['parsed_at']
+        }
+        if include_text:
+            out['extracted_text'] = entry['text']
+        if entry['page_count'] is not None:
+            out['page_count'] = entry['page_count']
+        if entry['truncated']:
+            out['truncated'] = entry['truncated']
+        return out
+
+
+@lru_cache(maxsize=1)
+def get_result_store() -> Optional[ParseResultStore]:
+    """Return the process-wide parse-result store.
+
+    None when it is disabled, or when another process (e.g. a bulk ingest)
+    already writes to the directory.
+    """
+    if not NLPConfig.PARSE_RESULT_STORE_ENABLED:
+        return None
+    try:
+        return ParseResultStore(
+            NLPConfig.PARSE_RESULT_STORE_DIR,
+            segment_rows=NLPConfig.PARSE_RESULT_SEGMENT_ROWS)
+    except StoreLockedError as e:
+        print(f"Parse result store disabled: {e}")
+        return None
@@ -0,0 +1,325 @@
+"""Resume parsing pipeline shared by the HTTP endpoints.
+
+``parse_pdf_file`` parses one downloaded PDF through the parse cache.
+``parse_resume_batch`` overlaps downloads on a bounded thread pool and fans the
+CPU-bound PDF extraction out to a process pool, yielding one result per URL as
+soon as it is ready.
+
+Extraction itself (page streaming, limits, CPU timeouts) lives in
+``extraction_engine``; skills are matched page by page as the text arrives.
+"""
+from __future__ import annotations
+from concurrent.futures import (
+    Executor, FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError, wait)
+from functools import lru_cache
+import asyncio
+import hashlib
+import time
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
+
+from config import NLPConfig
+from metrics import CACHE_LOOKUPS, observe_stage, record_failure
+from resume_parser.extraction_engine import (
+    ExtractionOptions,
+    default_extraction_options,
+    extract_pdf,
+    preload_worker,
+    submit_to_pool
+)
+from resume_parser.parse_cache import get_parse_cache, hash_file
+from resume_parser.pdf_processor import (
+    EXTRACTOR_VERSION,
+    discard_download,
+    download_file_from_url
+)
+from resume_parser.skill_extractor import (
+    TAXONOMY_VERSION, extract_skills, get_skill_matcher)
+
+
+@lru_cache(maxsize=1)
+def _get_download_pool() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(
+        max_workers=max(1, NLPConfig.BATCH_DOWNLOAD_WORKERS),
+        thread_name_prefix='resume-download')
+
+
+def _build_result(text: str, skills: List[str]) -> Dict[str, Any]:
+    return {
+        'extracted_text': text,
+        'extracted_skills': skills,
+        'word_count': len(text.split())
+    }
+
+
+def _extract_resume(pdf_source: Union[bytes, BinaryIO, str],
+                    options: Optional[ExtractionOptions] = None) -> Dict[str, Any]:
+    """Extract text and skills from a downloaded PDF (runs in a worker process).
+
+    Skills are matched on each page as soon as it is extracted. Pages end
+    with a form feed, so no skill can span two pages and the result equals
+    extract_skills on the whole text.
+
+    Stage timings go back to the parent in ``'timings'`` (see _record_timings).
+    """
+    matcher = get_skill_matcher()
+    skills = set()
+    skill_seconds = 0.0
+
+    def on_page(page_text: str) -> None:
+        nonlocal skill_seconds
+        start = time.perf_counter()
+        skills.update(m.skill for m in matcher.iter_matches(page_text))
+        skill_seconds += time.perf_counter() - start
+
+    start = time.perf_counter()
+    extracted = extract_pdf(pdf_source, options, on_page=on_page)
+    timings = {'pdf_extract': time.perf_counter() - start - skill_seconds,
+               'skills': skill_seconds}
+    if 'error' in extracted:
+        return {'error': extracted['error'], 'timings': timings}
+    result = _build_result(extracted['text'], list(skills))
+    result['page_count'] = extracted['pages']
+    if extracted['truncated']:
+        result['truncated'] = extracted['truncated']
+    result['timings'] = timings
+    return result
+
+
+def _record_timings(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Move worker-side timings and failures from a result into the metrics."""
+    for name, seconds in result.pop('timings', {}).items():
+        observe_stage(name, seconds, pages=result.get('page_count'))
+    if 'error' in result:
+        record_failure('pdf_extract', 'error')
+    elif result.get('truncated') == 'timeout':
+        record_failure('pdf_extract', 'cpu_timeout')
+    return result
+
+
+def _wall_timeout() -> None:
+    print("PDF extraction did not finish within "
+          f"{NLPConfig.PDF_WALL_TIMEOUT_SECONDS:g}s")
+    record_failure('pdf_extract', 'wall_timeout')
+
+
+def _preload_worker() -> int:
+    get_skill_matcher()
+    return preload_worker()
+
+
+def warm_extraction_pool(timeout: Optional[float] = None) -> int:
+    """Start the extraction workers and load pdfminer and the skill matcher in them.
+
+    Returns the number of distinct worker processes that ran the warm-up.
+    """
+    if not NLPConfig.PDF_EXTRACT_IN_WORKERS:
+        _preload_worker()
+    futures = [submit_to_pool(_preload_worker)
+               for _ in range(max(1, NLPConfig.BATCH_EXTRACT_WORKERS))]
+    return len({future.result(timeout=timeout) for future in futures})
+
+
+def _cache_key(digest: str, options: Optional[ExtractionOptions] = None) -> str:
+    tag = options.cache_tag() if options is not None else ''
+    return f"{digest}:{EXTRACTOR_VERSION}" + (f":{tag}" if tag else '')
+
+
+def _cache_lookup(key: str) -> Optional[Dict[str, Any]]:
+    """Return a cached parse result, refreshing its skills if the taxonomy moved on."""
+    cache = get_parse_cache()
+    if cache is None:
+        return None
+    entry = cache.get(key)
+    CACHE_LOOKUPS.inc(cache='parse', result='miss' if entry is None else 'hit')
+    if entry is None:
+        return None
+    if entry.get('taxonomy_version') != TAXONOMY_VERSION:
+        entry = dict(entry,
+                     extracted_skills=extract_skills(entry['extracted_text']),
+                     taxonomy_version=TAXONOMY_VERSION)
+        cache.put(key, entry)
+    result = _build_result(entry['extracted_text'], entry['extracted_skills'])
+    for field in ('page_count', 'truncated'):
+        if entry.get(field) is not None:
+            result[field] = entry[field]
+    return result
+
+
+def _cache_store(key: str, result: Dict[str, Any]) -> None:
+    cache = get_parse_cache()
+    # A timeout depends on machine load, so that partial text is not reused
+    if cache is None or result.get('truncated') == 'timeout':
+        return
+    cache.put(key, {
+        'extracted_text': result['extracted_text'],
+        'extracted_skills': result['extracted_skills'],
+        'page_count': result.get('page_count'),
+        'truncated': result.get('truncated'),
+        'taxonomy_version': TAXONOMY_VERSION
+    })
+
+
+def parse_pdf_file(pdf_source: Union[BinaryIO, str],
+                   options: Optional[ExtractionOptions] = None) -> Optional[Dict[str, Any]]:
+    """Extract text and skills from a downloaded PDF, using the parse cache.
+
+    Extraction runs in the worker pool (unless NLPConfig.PDF_EXTRACT_IN_WORKERS
+    is off), so the calling thread only waits. The download is always
+    released afterwards. Returns None if the text could not be extracted.
+    """
+    if options is None:
+        options = default_extraction_options()
+    key = _cache_key(hash_file(pdf_source), options)
+    cached = _cache_lookup(key)
+    if cached is not None:
+        discard_download(pdf_source)
+        return cached
+
+    if NLPConfig.PDF_EXTRACT_IN_WORKERS:
+        try:
+            if hasattr(pdf_source, 'read'):
+                pdf_bytes = pdf_source.read()
+            else:
+                with open(pdf_source, 'rb') as f:
+                    pdf_bytes = f.read()
+        finally:
+            discard_download(pdf_source)
+        future = submit_to_pool(_extract_resume, pdf_bytes, options)
+        try:
+            result = future.result(timeout=NLPConfig.PDF_WALL_TIMEOUT_SECONDS)
+        except TimeoutError:
+            future.cancel()
+            _wall_timeout()
+            return None
+    else:
+        result = _extract_resume(pdf_source, options)
+    _record_timings(result)
+    if 'error' in result:
+        print(result['error'])
+        return None
+    _cache_store(key, result)
+    return result
+
+
+async def parse_pdf_bytes_async(pdf_bytes: bytes,
+                                options: Optional[ExtractionOptions] = None,
+                                executor: Optional[Executor] = None
+                                ) -> Optional[Dict[str, Any]]:
+    """Async version of parse_pdf_file for an already downloaded PDF.
+
+    Cache reads and writes run on ``executor`` (a thread pool) and the
+    extraction on the worker process pool, so the event loop never blocks.
+    """
+    if options is None:
+        options = default_extraction_options()
+    loop = asyncio.get_running_loop()
+    key = _cache_key(hashlib.sha256(pdf_bytes).hexdigest(), options)
+    cached = await loop.run_in_executor(executor, _cache_lookup, key)
+    if cached is not None:
+        return cached
+
+    future = submit_to_pool(_extract_resume, pdf_bytes, options)
+    try:
+        result = await asyncio.wait_for(
+            asyncio.wrap_future(future), NLPConfig.PDF_WALL_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        future.cancel()
+        _wall_timeout()
+        return None
+    _record_timings(result)
+    if 'error' in result:
+        print(result['error'])
+        return None
+    await loop.run_in_executor(executor, _cache_store, key, result)
+    return result
+
+
+def _download_and_hash(file_url: str) -> Optional[Tuple[BinaryIO, str]]:
+    pdf_file = download_file_from_url(file_url)
+    if pdf_file is None:
+        return None
+    try:
+        return pdf_file, hash_file(pdf_file)
+    except Exception:
+        discard_download(pdf_file)
+        raise
+
+
+def _discard_download(future) -> None:
+    """Release a download whose result nobody will consume."""
+    if future.cancelled() or future.exception() is not None:
+        return
+    result = future.result()
+    if result is not None:
+        discard_download(result[0])
+
+
+def parse_resume_batch(file_urls: List[str],
+                       options: Optional[ExtractionOptions] = None) -> Iterator[Dict[str, Any]]:
+    """Download and parse many resumes concurrently.
+
+    Yields one dict per URL, in completion order. Each dict carries the
+    ``index`` of the URL in ``file_urls`` and either the parse fields returned
+    by ``/parse`` or an ``error`` message.
+    """
+    if options is None:
+        options = default_extraction_options()
+    download_pool = _get_download_pool()
+
+    pending = {}
+    for index, file_url in enumerate(file_urls):
+        future = download_pool.submit(_download_and_hash, file_url)
+        pending[future] = ('download', index, file_url, None)
+
+    try:
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, index, file_url, key = pending.pop(future)
+                item = {'index': index, 'file_url': file_url}
+                try:
+                    result = future.result()
+                except Exception as e:
+                    item['error'] = f"Failed to {stage} file: {e}"
+                    yield item
+                    continue
+
+                if stage == 'download':
+                    if result is None:
+                        item['error'] = "Failed to download file from URL"
+                        yield item
+                        continue
+                    pdf_file, digest = result
+                    key = _cache_key(digest, options)
+                    cached = _cache_lookup(key)
+                    if cached is not None:
+                        discard_download(pdf_file)
+                        item.update(cached)
+                        yield item
+                        continue
+                    try:
+                        # File objects cannot cross process boundaries, so
+                        # the worker receives the raw bytes.
+                        pdf_bytes = pdf_file.read()
+                        extract_future = submit_to_pool(
+                            _extract_resume, pdf_bytes, options)
+                    except Exception as e:
+                        item['error'] = f"Failed to extract file: {e}"
+                        yield item
+                        continue
+                    finally:
+                        discard_download(pdf_file)
+                    pending[extract_future] = ('extract', index, file_url, key)
+                else:
+                    _record_timings(result)
+                    if 'error' not in result:
+                        _cache_store(key, result)
+                    item.update(result)
+                    yield item
+    finally:
+        # The client went away or an error escaped: drop queued work and make
+        # sure finished downloads do not leave spooled files behind.
+        for future, (stage, _, _, _) in pending.items():
+            future.cancel()
+            if stage == 'download':
+                future.add_done_callback(_discard_download)
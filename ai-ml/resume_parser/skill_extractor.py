@@ -1,3 +1,8 @@
+from functools import lru_cache
+import hashlib
+
+from resume_parser.skill_matcher import SkillMatcher
+
 # A simple, hard-coded list of tech skills to search for.
 # In a real-world app, this list would be much larger or stored in a database.
 SKILL_KEYWORDS = [
@@ -109,16 +114,42 @@ SKILL_KEYWORDS = [
 ]
 
 
+# Changes whenever the keyword list changes, so cached parse results produced
+# with an older taxonomy can be detected and refreshed.
+TAXONOMY_VERSION = hashlib.sha256(
+    '\n'.join(sorted(set(k.lower() for k in SKILL_KEYWORDS))).encode('utf-8')
+).hexdigest()[:16]
+
+
+@lru_cache(maxsize=1)
+def get_skill_matcher():
+    """
+    Builds the skill automaton once, on first use, and reuses it afterwards.
+    """
+    return SkillMatcher(SKILL_KEYWORDS)
+
+
+def find_skill_matches(raw_text):
+    """
+    Returns every skill occurrence in the text as (skill, start, end) tuples,
+    ordered by position.
+    """
+    if not raw_text:
+        return []
+    return get_skill_matcher().find_all(raw_text)
+
+
 def extract_skills(raw_text):
     """
     Scans raw text and finds skills from our SKILL_KEYWORDS list.
     """
-    found_skills = set()  # Use a 'set' to avoid duplicate skills
-    text_lower = raw_text.lower()  # Convert text to lowercase for easy matching
+    if not raw_text:
+        return []
 
-    for skill in SKILL_KEYWORDS:
-        if skill.lower() in text_lower:
-            found_skills.add(skill.lower())
+    found_skills = set()  # Use a 'set' to avoid duplicate skills
+    # A single pass over the text, independent of the number of keywords
+    for match in get_skill_matcher().iter_matches(raw_text):
+        found_skills.add(match.skill)
 
     # Convert the set back to a list to send as JSON
     return list(found_skills)
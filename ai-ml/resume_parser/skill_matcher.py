@@ -0,0 +1,132 @@
+"""Multi-pattern skill matcher built on an Aho-Corasick automaton.
+
+The automaton is compiled once from the skill taxonomy and then scans a text
+in a single pass, so the cost of a scan depends on the length of the text and
+the number of hits, not on the number of skills in the taxonomy.
+"""
+from __future__ import annotations
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+# Characters that continue a "word" for boundary purposes. '+' and '#' are
+# included so that 'c' does not match inside 'c++' or 'c#'.
+_WORD_EXTRA_CHARS = frozenset('_+#')
+
+
+class SkillMatch(NamedTuple):
+    skill: str
+    start: int
+    end: int
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch in _WORD_EXTRA_CHARS
+
+
+def _lower_preserving_offsets(text: str) -> str:
+    """Lowercase text while keeping character offsets aligned with the input.
+
+    ``str.lower`` can expand a few characters (e.g. 'İ'), which would shift
+    every offset after them; such characters are left as-is.
+    """
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    return ''.join(c if len(c.lower()) != 1 else c.lower() for c in text)
+
+
+class SkillMatcher:
+    """Word-boundary aware Aho-Corasick matcher over a list of skills.
+
+    Patterns are matched case-insensitively. As with a regex word boundary, a
+    match whose edge is a word character must not be adjacent to another word
+    character, so 'go' does not match inside 'google' and 'sql' does not match
+    inside 'mysql', while '.net' still matches inside 'asp.net'.
+    """
+
+    def __init__(self, skills: Iterable[str]):
+        # Node 0 is the root. Each node has a transition dict, a failure link
+        # and the tuple of pattern ids that end at it (including those reached
+        # through failure links).
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[int, ...]] = [()]
+        self.patterns: List[str] = []
+
+        seen = set()
+        for skill in skills:
+            pattern = skill.strip().lower()
+            if not pattern or pattern in seen:
+                continue
+            seen.add(pattern)
+            self._add(pattern, len(self.patterns))
+            self.patterns.append(pattern)
+        self._build()
+        self._lengths = [len(p) for p in self.patterns]
+        self._bounded_start = [_is_word_char(p[0]) for p in self.patterns]
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def _add(self, pattern: str, pattern_id: int) -> None:
+        node = 0
+        for ch in pattern:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            node = nxt
+        self._out[node] = self._out[node] + (pattern_id,)
+
+    def _build(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                if self._out[self._fail[child]]:
+                    self._out[child] = self._out[child] + \
+                        self._out[self._fail[child]]
+
+    def iter_matches(self, text: str):
+        """Yield a ``SkillMatch`` for every word-bounded occurrence in text.
+
+        Offsets index into the original ``text``; matches are yielded in
+        order of their end offset.
+        """
+        if not text:
+            return
+        lowered = _lower_preserving_offsets(text)
+        goto, fail, out = self._goto, self._fail, self._out
+        lengths, patterns = self._lengths, self.patterns
+        bounded_start = self._bounded_start
+        n = len(lowered)
+        node = 0
+        for i, ch in enumerate(lowered):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if not out[node]:
+                continue
+            end = i + 1
+            # Every pattern ending at this node ends with ``ch``.
+            if end < n and _is_word_char(ch) and _is_word_char(lowered[end]):
+                continue
+            for pattern_id in out[node]:
+                start = end - lengths[pattern_id]
+                if (start > 0 and bounded_start[pattern_id]
+                        and _is_word_char(lowered[start - 1])):
+                    continue
+                yield SkillMatch(patterns[pattern_id], start, end)
+
+    def find_all(self, text: str) -> List[SkillMatch]:
+        """Return every match in text, ordered by start offset."""
+        return sorted(self.iter_matches(text), key=lambda m: (m.start, m.end))
@@ -0,0 +1,89 @@
+"""Recall-vs-latency benchmark of the IVF/IVF-PQ index against exact ranking.
+
+Usage: python scripts/bench_ann_index.py [--n 200000] [--dim 384] [--pq 0 48]
+
+Generates clustered synthetic embeddings, ranks queries exactly with
+similarity_calculator.rank_by_matrix, and reports recall@k and per-query
+latency of the index for several nprobe values.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ai_ml_dir = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ai_ml_dir))
+
+from matching_engine.ann_index import IVFIndex  # noqa: E402
+from matching_engine.similarity_calculator import (  # noqa: E402
+    normalize_rows, rank_by_matrix)
+
+
+def synthetic_embeddings(n, dim, n_clusters, rng):
+    centers = rng.normal(size=(n_clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, n_clusters, size=n)
+    noise = rng.normal(scale=0.6, size=(n, dim)).astype(np.float32)
+    return normalize_rows(centers[labels] + noise)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--n', type=int, default=200_000)
+    parser.add_argument('--dim', type=int, default=384)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--top-k', type=int, default=10)
+    parser.add_argument('--n-lists', type=int, default=0,
+                        help='default: ~sqrt(n)')
+    parser.add_argument('--pq', type=int, nargs='*', default=[0, 48],
+                        help='PQ subvector counts to try (0 = no PQ)')
+    parser.add_argument('--nprobe', type=int, nargs='*', default=[1, 4, 16, 64])
+    parser.add_argument('--refine', type=int, default=4,
+                        help='PQ only: re-score top_k * refine hits exactly')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    data = synthetic_embeddings(args.n, args.dim, 2000, rng)
+    queries = data[rng.choice(args.n, size=args.queries, replace=False)] + \
+        rng.normal(scale=0.05, size=(args.queries, args.dim)).astype(np.float32)
+    ids = [str(i) for i in range(args.n)]
+    n_lists = args.n_lists or max(1, int(np.sqrt(args.n)))
+
+    start = time.perf_counter()
+    exact = [set(rank_by_matrix(q, data, args.top_k)[0].tolist()) for q in queries]
+    exact_ms = (time.perf_counter() - start) * 1000 / args.queries
+    print(f"exact: {exact_ms:.2f} ms/query over {args.n} x {args.dim}")
+
+    def lookup(found):
+        return data[[int(i) for i in found]]
+
+    for pq in args.pq:
+        index = IVFIndex(args.dim, n_lists=n_lists, pq_subvectors=pq, seed=args.seed)
+        start = time.perf_counter()
+        index.train(data, n_iter=10)
+        index.add(ids, data)
+        build_s = time.perf_counter() - start
+        label = f"IVF{n_lists}" + (f",PQ{pq}" if pq else ",Flat")
+        print(f"\n{label}: built in {build_s:.1f} s")
+        print(f"{'nprobe':>7} {'refine':>7} {'recall@' + str(args.top_k):>10} "
+              f"{'ms/query':>9} {'speedup':>8}")
+        refines = [1, args.refine] if pq and args.refine > 1 else [1]
+        for nprobe in args.nprobe:
+            for refine in refines:
+                hits = 0
+                start = time.perf_counter()
+                results = [index.search(q, args.top_k, nprobe=nprobe,
+                                        refine_factor=refine, vector_lookup=lookup)[0]
+                           for q in queries]
+                ms = (time.perf_counter() - start) * 1000 / args.queries
+                for found, truth in zip(results, exact):
+                    hits += len(truth.intersection(int(i) for i in found))
+                recall = hits / (len(exact) * args.top_k)
+                print(f"{nprobe:>7} {refine:>7} {recall:>10.3f} {ms:>9.2f} "
+                      f"{exact_ms / ms:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""Accuracy drift and throughput of the int8 embedding backend against float.
+
+Usage: python scripts/bench_embeddings.py [--texts 512] [--threads 1 0]
+           [--max-seq-length 256] [--min-cosine 0.98] [--min-overlap 0.9]
+
+Encodes the same synthetic resumes and job descriptions with the float and
+the int8 (dynamically quantized) model and reports:
+
+- drift: cosine similarity between each text's float and int8 embedding
+  (mean, p5, min), and how many of each job's top-10 resumes under the float
+  model are still in the top 10 under int8 (overlap@10);
+- throughput: texts/s per backend for each ``--threads`` setting (0 = torch
+  default, i.e. all cores).
+
+Exits with status 1 if the mean cosine is below ``--min-cosine`` or either
+mean overlap@10 (int8 vs float, and int8 queries vs float-stored resumes)
+below ``--min-overlap``, so the check can gate a rollout of
+EMBEDDING_BACKEND=int8. Embeddings already stored by the float model can be
+kept when the drift is within these bounds.
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ai_ml_dir = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ai_ml_dir))
+
+from config import NLPConfig  # noqa: E402
+from matching_engine.embedding_service import load_embedder  # noqa: E402
+from matching_engine.similarity_calculator import normalize_rows  # noqa: E402
+from run_benchmarks import synthetic_job, synthetic_resume  # noqa: E402
+
+
+def encode(model, texts, batch_size):
+    # Same length-sorted micro-batching as get_text_embeddings
+    order = np.argsort([len(t) for t in texts], kind='stable')
+    out = None
+    for start in range(0, len(texts), batch_size):
+        idx = order[start:start + batch_size]
+        emb = np.asarray(model.encode([texts[i] for i in idx], batch_size=len(idx),
+                                      show_progress_bar=False, convert_to_numpy=True),
+                         dtype=np.float32)
+        if out is None:
+            out = np.empty((len(texts), emb.shape[1]), dtype=np.float32)
+        out[idx] = emb
+    return normalize_rows(out)
+
+
+def throughput(model, texts, batch_size, repeat):
+    encode(model, texts[:batch_size], batch_size)  # warm-up
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        encode(model, texts, batch_size)
+        best = min(best, time.perf_counter() - start)
+    return len(texts) / best
+
+
+def top_k_overlap(queries_a, docs_a, queries_b, docs_b, k):
+    top_a = np.argsort(-(queries_a @ docs_a.T), axis=1)[:, :k]
+    top_b = np.argsort(-(queries_b @ docs_b.T), axis=1)[:, :k]
+    return float(np.mean([len(set(a) & set(b)) / k for a, b in zip(top_a, top_b)]))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--texts', type=int, default=512,
+                        help='number of resumes (jobs: a quarter of that)')
+    parser.add_argument('--chars', type=int, default=1500, help='characters per resume')
+    parser.add_argument('--batch-size', type=int, default=NLPConfig.EMBEDDING_BATCH_SIZE)
+    parser.add_argument('--max-seq-length', type=int, default=NLPConfig.EMBEDDING_MAX_SEQ_LENGTH,
+                        help='0 = model default')
+    parser.add_argument('--threads', type=int, nargs='*', default=[1, 0],
+                        help='intra-op thread counts to time (0 = torch default)')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--min-cosine', type=float, default=0.98)
+    parser.add_argument('--min-overlap', type=float, default=0.9)
+    parser.add_argument('--seed', type=int, default=11)
+    args = parser.parse_args()
+
+    import torch
+    default_threads = torch.get_num_threads()
+
+    rng = random.Random(args.seed)
+    resumes = [synthetic_resume(args.chars, rng) for _ in range(args.texts)]
+    jobs = [synthetic_job(args.chars // 2, rng) for _ in range(max(1, args.texts // 4))]
+
+    models = {backend: load_embedder(backend, max_seq_length=args.max_seq_length, device='cpu')
+              for backend in ('float', 'int8')}
+    print(f"model {NLPConfig.HF_EMBEDDING_MODEL}, "
+          f"max_seq_length {models['float'].max_seq_length}, batch {args.batch_size}")
+
+    # Drift
+    resumes_f = encode(models['float'], resumes, args.batch_size)
+    resumes_q = encode(models['int8'], resumes, args.batch_size)
+    jobs_f = encode(models['float'], jobs, args.batch_size)
+    jobs_q = encode(models['int8'], jobs, args.batch_size)
+    cosines = np.sum(resumes_f * resumes_q, axis=1)
+    overlap = top_k_overlap(jobs_f, resumes_f, jobs_q, resumes_q, min(10, len(resumes)))
+    # The production case: int8 queries against float-encoded stored vectors
+    mixed = top_k_overlap(jobs_f, resumes_f, jobs_q, resumes_f, min(10, len(resumes)))
+    print(f"drift: cosine mean {cosines.mean():.4f}  p5 {np.percentile(cosines, 5):.4f}  "
+          f"min {cosines.min():.4f}")
+    print(f"       overlap@10 {overlap:.3f} (int8 vs float), "
+          f"{mixed:.3f} (int8 jobs vs float-stored resumes)")
+
+    # Throughput
+    print(f"\n{'threads':>8} {'float/s':>9} {'int8/s':>9} {'speedup':>8}")
+    for threads in args.threads:
+        torch.set_num_threads(threads or default_threads)
+        rates = {backend: throughput(model, resumes, args.batch_size, args.repeat)
+                 for backend, model in models.items()}
+        print(f"{threads or default_threads:>8} {rates['float']:>9.1f} {rates['int8']:>9.1f} "
+              f"{rates['int8'] / rates['float']:>7.2f}x")
+
+    failures = []
+    if cosines.mean() < args.min_cosine:
+        failures.append(f"mean cosine {cosines.mean():.4f} < {args.min_cosine}")
+    if overlap < args.min_overlap:
+        failures.append(f"overlap@10 {overlap:.3f} < {args.min_overlap}")
+    if mixed < args.min_overlap:
+        failures.append(f"overlap@10 against float-stored resumes {mixed:.3f} "
+                        f"< {args.min_overlap}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""Compare the skill automaton against the old per-keyword substring scan.
+
+Usage: python scripts/bench_skill_extractor.py [--repeat N]
+
+For each taxonomy size the keyword list is padded with synthetic skills, and
+both strategies scan the same long synthetic resumes.
+"""
+import argparse
+import random
+import string
+import sys
+import time
+from pathlib import Path
+
+ai_ml_dir = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ai_ml_dir))
+
+from resume_parser.skill_extractor import SKILL_KEYWORDS  # noqa: E402
+from resume_parser.skill_matcher import SkillMatcher  # noqa: E402
+
+
+TAXONOMY_SIZES = [len(set(SKILL_KEYWORDS)), 5000, 20000, 50000]
+RESUME_CHARS = [5000, 50000, 200000]
+
+
+def substring_scan(keywords, text):
+    """The original extract_skills loop."""
+    found = set()
+    text_lower = text.lower()
+    for skill in keywords:
+        if skill.lower() in text_lower:
+            found.add(skill.lower())
+    return found
+
+
+def synthetic_taxonomy(size, rng):
+    keywords = list(dict.fromkeys(SKILL_KEYWORDS))
+    while len(keywords) < size:
+        words = [''.join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 10)))
+                 for _ in range(rng.randint(1, 3))]
+        keywords.append(' '.join(words))
+    return keywords
+
+
+def synthetic_resume(chars, keywords, rng):
+    filler = ['experience', 'developed', 'team', 'project', 'using', 'built',
+              'services', 'with', 'and', 'the', 'for', 'designed', 'led']
+    parts = []
+    total = 0
+    while total < chars:
+        word = rng.choice(keywords) if rng.random() < 0.05 else rng.choice(filler)
+        parts.append(word)
+        total += len(word) + 1
+    return ' '.join(parts)
+
+
+def best_of(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'skills':>8} {'chars':>8} {'build ms':>9} {'scan ms':>9} "
+          f"{'automaton ms':>13} {'speedup':>8}")
+    for size in TAXONOMY_SIZES:
+        keywords = synthetic_taxonomy(size, rng)
+        start = time.perf_counter()
+        matcher = SkillMatcher(keywords)
+        build_ms = (time.perf_counter() - start) * 1000
+        for chars in RESUME_CHARS:
+            text = synthetic_resume(chars, keywords, rng)
+            scan = best_of(lambda: substring_scan(keywords, text), args.repeat)
+            auto = best_of(lambda: {m.skill for m in matcher.iter_matches(text)},
+                           args.repeat)
+            print(f"{len(matcher):>8} {chars:>8} {build_ms:>9.1f} "
+                  f"{scan * 1000:>9.2f} {auto * 1000:>13.2f} {scan / auto:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
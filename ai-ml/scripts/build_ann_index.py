@@ -0,0 +1,46 @@
+"""Build the candidate ANN index from the resume embedding store.
+
+Usage: python scripts/build_ann_index.py [--n-lists N] [--pq M]
+
+Writes NLPConfig.ANN_INDEX_PATH, which the service loads for
+/candidates/<id>/similar and reloads when the file changes. Inserts and
+deletes the service makes in between are journalled next to the index and
+replayed on every load; re-run this now and then to rebalance the cells.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+ai_ml_dir = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ai_ml_dir))
+
+from config import NLPConfig  # noqa: E402
+from matching_engine.ann_index import build_index_from_store, candidate_journal_path  # noqa: E402
+from matching_engine.embedding_store import get_embedding_store  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--n-lists', type=int, default=None)
+    parser.add_argument('--pq', type=int, default=None,
+                        help='PQ subvectors (0 = store full vectors)')
+    args = parser.parse_args()
+
+    # Taken before the vectors are read: updates journalled from here on may
+    # be missing from the new index, so the service replays them
+    journal = candidate_journal_path(NLPConfig.ANN_INDEX_PATH)
+    journal_offset = journal.stat().st_size if journal.exists() else 0
+    store = get_embedding_store('resumes')
+    if len(store) == 0:
+        print('No resume embeddings stored yet; nothing to index.')
+        return
+    start = time.perf_counter()
+    index = build_index_from_store(store, n_lists=args.n_lists, pq_subvectors=args.pq)
+    index.save(NLPConfig.ANN_INDEX_PATH, journal_offset=journal_offset)
+    print(f'Indexed {len(index)} resumes into {index.n_lists} lists in '
+          f'{time.perf_counter() - start:.1f} s -> {NLPConfig.ANN_INDEX_PATH}')
+
+
+if __name__ == '__main__':
+    main()
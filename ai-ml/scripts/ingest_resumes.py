@@ -0,0 +1,324 @@
+"""Bulk-ingest local resume PDFs into the parse-result store, without the HTTP service.
+
+Usage:
+    python scripts/ingest_resumes.py [SOURCE] [--manifest FILE] [--store DIR]
+        [--checkpoint FILE] [--entities-output FILE] [--no-entities]
+        [--workers N] [--limit N] [--retry-failed]
+
+SOURCE is a directory searched recursively for ``*.pdf`` (default:
+data/raw_resumes); the doc_id of a file is its path relative to SOURCE.
+``--manifest`` reads the files from a text file (one path per line), a CSV
+or a JSONL file with a ``path`` and an optional ``id`` column instead.
+Relative paths are resolved against the manifest's directory.
+
+Each file is extracted with the same engine, limits and CPU timeout as
+/parse, then run through extract_skills and (unless ``--no-entities``)
+extract_entities, on a pool of worker processes. Results are written as
+they finish:
+
+- text and skills to a columnar parse-result store (``--store``, by default
+  INGEST_STORE_DIR, kept apart from the store the service writes to);
+- entities as JSONL lines ``{"doc_id", "entities"}`` to ``--entities-output``.
+  The file is append-only: a file that is re-ingested (it changed, or a run
+  was killed before checkpointing it) gets another line, so readers must
+  keep only the last line per ``doc_id``.
+
+Every finished file is then recorded in the checkpoint journal together with
+its size and mtime. A rerun (e.g. after Ctrl-C) skips the files already
+recorded unless they have changed since; files that failed are retried only
+with ``--retry-failed``. The store takes one writer at a time: the script
+refuses to start on a store another process (e.g. the running service) has
+open for writing.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+ai_ml_dir = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ai_ml_dir))
+
+from config import DATA_DIR, NLPConfig  # noqa: E402
+from resume_parser.entity_recognition import _load_nlp, extract_entities  # noqa: E402
+from resume_parser.extraction_engine import (  # noqa: E402
+    default_extraction_options, extract_pdf, preload_worker)
+from resume_parser.result_store import ParseResultStore, StoreLockedError  # noqa: E402
+from resume_parser.skill_extractor import extract_skills, get_skill_matcher  # noqa: E402
+
+# -- worker side --------------------------------------------------------------
+
+def init_worker(include_entities):
+    preload_worker()
+    get_skill_matcher()
+    if include_entities:
+        _load_nlp()
+
+
+def ingest_file(path, options, include_entities):
+    """Extract one PDF. Runs in a worker process."""
+    # extract_pdf removes a source given as a path (it treats it as a spooled
+    # download), so hand it an open file instead
+    extracted = extract_pdf(open(path, 'rb'), options)
+    if 'error' in extracted:
+        return {'error': extracted['error']}
+    text = extracted['text']
+    result = {
+        'extracted_text': text,
+        'extracted_skills': extract_skills(text),
+        'word_count': len(text.split()),
+        'page_count': extracted['pages']
+    }
+    if extracted['truncated']:
+        result['truncated'] = extracted['truncated']
+    if include_entities:
+        result['entities'] = extract_entities(text)
+    return result
+
+
+# -- inputs -------------------------------------------------------------------
+
+def iter_directory(source):
+    """Yield (doc_id, path) for every PDF under ``source``, in a stable order."""
+    for root, dirs, files in os.walk(source):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith('.pdf'):
+                path = Path(root) / name
+                yield path.relative_to(source).as_posix(), path
+
+
+def iter_manifest(manifest):
+    """Yield (doc_id, path) from a text, CSV or JSONL manifest."""
+    base = manifest.parent
+    suffix = manifest.suffix.lower()
+    with open(manifest, encoding='utf-8', newline='') as f:
+        if suffix == '.csv':
+            rows = ((row['path'], row.get('id')) for row in csv.DictReader(f))
+        elif suffix in ('.jsonl', '.ndjson'):
+            rows = ((row['path'], row.get('id'))
+                    for row in (json.loads(line) for line in f if line.strip()))
+        else:
+            rows = ((line.strip(), None) for line in f
+                    if line.strip() and not line.lstrip().startswith('#'))
+        for path, doc_id in rows:
+            if not path:
+                continue
+            yield str(doc_id or path), base / path
+
+
+# -- checkpoint ---------------------------------------------------------------
+
+def file_version(path):
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def load_checkpoint(path):
+    """Return ``{doc_id: (size, mtime_ns, status)}`` from the journal."""
+    done = {}
+    if not path.exists():
+        return done
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                doc_id, size, mtime_ns, status = json.loads(line)
+            except ValueError:
+                # A torn final line from an interrupted run; that file is redone
+                continue
+            done[doc_id] = (size, mtime_ns, status)
+    return done
+
+
+# -- driver -------------------------------------------------------------------
+
+class Ingestion:
+    def __init__(self, args):
+        self.args = args
+        self.options = default_extraction_options()
+        self.store = ParseResultStore(args.store, segment_rows=NLPConfig.PARSE_RESULT_SEGMENT_ROWS)
+        self.checkpoint = load_checkpoint(args.checkpoint)
+        args.checkpoint.parent.mkdir(parents=True, exist_ok=True)
+        self.checkpoint_file = open(args.checkpoint, 'a', encoding='utf-8')
+        self.entities_file = None
+        if args.entities:
+            args.entities_output.parent.mkdir(parents=True, exist_ok=True)
+            self.entities_file = open(args.entities_output, 'a', encoding='utf-8')
+        self.counts = {'ingested': 0, 'failed': 0, 'skipped': 0}
+        self.pages = 0
+        self.started = time.perf_counter()
+        self.last_report = self.started
+
+    def close(self):
+        self.store.flush()
+        self.checkpoint_file.close()
+        if self.entities_file is not None:
+            self.entities_file.close()
+
+    def todo(self, items):
+        """Filter out files the checkpoint says are done (and unchanged)."""
+        for doc_id, path in items:
+            try:
+                version = file_version(path)
+            except OSError as e:
+                print(f"Skipping {path}: {e}")
+                self.counts['failed'] += 1
+                continue
+            previous = self.checkpoint.get(doc_id)
+            if previous is not None and tuple(previous[:2]) == version and (
+                    previous[2] == 'ok' or not self.args.retry_failed):
+                self.counts['skipped'] += 1
+                continue
+            yield doc_id, path, version
+
+    def record(self, doc_id, path, version, result):
+        if 'error' in result:
+            print(f"Failed {path}: {result['error']}")
+            status = result['error']
+            self.counts['failed'] += 1
+        else:
+            entities = result.pop('entities', None)
+            self.store.append(doc_id, result, source=str(path))
+            if self.entities_file is not None and entities is not None:
+                self.entities_file.write(json.dumps({'doc_id': doc_id, 'entities': entities}) + '\n')
+                self.entities_file.flush()
+            status = 'ok'
+            self.counts['ingested'] += 1
+            self.pages += result.get('page_count') or 0
+        # Recorded last: a crash before this line means the file is redone.
+        # Its new store row supersedes the old one; the entities file gets a
+        # second line for it, and readers keep the last one per doc_id
+        self.checkpoint_file.write(json.dumps([doc_id, *version, status]) + '\n')
+        self.checkpoint_file.flush()
+        self.report()
+
+    def report(self, final=False):
+        now = time.perf_counter()
+        if not final and now - self.last_report < self.args.progress_seconds:
+            return
+        self.last_report = now
+        elapsed = now - self.started
+        done = self.counts['ingested'] + self.counts['failed']
+        print(f"{'Done' if final else 'Progress'}: {self.counts['ingested']} ingested, "
+              f"{self.counts['failed']} failed, {self.counts['skipped']} skipped "
+              f"in {elapsed:.1f}s ({done / elapsed if elapsed else 0:.1f} docs/s, "
+              f"{self.pages / elapsed if elapsed else 0:.1f} pages/s)")
+
+    def new_pool(self):
+        return ProcessPoolExecutor(max_workers=max(1, self.args.workers),
+                                   initializer=init_worker, initargs=(self.args.entities,))
+
+    def run(self, items):
+        """Process ``(doc_id, path, version)`` items, at most a few per worker at once.
+
+        When a worker dies (e.g. pdfminer blows up on a hostile file) every
+        file queued on the pool fails with it. Those files are rerun one at a
+        time on a fresh pool, so only the file that really crashes a worker
+        is recorded as failed.
+        """
+        max_in_flight = 4 * max(1, self.args.workers)
+        pending = {}  # future -> (item, run in isolation)
+        suspects = deque()
+        pool = self.new_pool()
+        items = iter(items)
+        exhausted = False
+        try:
+            while pending or suspects or not exhausted:
+                if suspects:
+                    if not pending:
+                        item = suspects.popleft()
+                        pending[self.submit(pool, item[1])] = (item, True)
+                else:
+                    while not exhausted and len(pending) < max_in_flight:
+                        item = next(items, None)
+                        if item is None:
+                            exhausted = True
+                            break
+                        pending[self.submit(pool, item[1])] = (item, False)
+                if not pending:
+                    continue
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                broken = False
+                for future in done:
+                    item, isolated = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except BrokenProcessPool:
+                        broken = True
+                        if isolated:
+                            self.record(*item, {'error': 'worker process died'})
+                        else:
+                            suspects.append(item)
+                        continue
+                    except Exception as e:
+                        result = {'error': f"{type(e).__name__}: {e}"}
+                    self.record(*item, result)
+
+                if broken:
+                    # The rest of the queue went down with the pool
+                    suspects.extend(item for item, _ in pending.values())
+                    pending.clear()
+                    if suspects:
+                        print(f"A worker died; retrying {len(suspects)} files one at a time")
+                    pool.shutdown(cancel_futures=True)
+                    pool = self.new_pool()
+        finally:
+            pool.shutdown(wait=not pending, cancel_futures=True)
+
+    def submit(self, pool, path):
+        return pool.submit(ingest_file, str(path), self.options, self.args.entities)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('source', nargs='?', type=Path, default=DATA_DIR / 'raw_resumes')
+    parser.add_argument('--manifest', type=Path, help='read the file list from here instead')
+    parser.add_argument('--store', type=Path, default=NLPConfig.INGEST_STORE_DIR)
+    parser.add_argument('--checkpoint', type=Path, default=NLPConfig.INGEST_CHECKPOINT_PATH)
+    parser.add_argument('--entities-output', type=Path,
+                        default=DATA_DIR / 'processed' / 'ingest_entities.jsonl')
+    parser.add_argument('--no-entities', dest='entities', action='store_false',
+                        help='skip NER (much faster)')
+    parser.add_argument('--workers', type=int, default=NLPConfig.INGEST_WORKERS)
+    parser.add_argument('--limit', type=int, default=0, help='stop after N files (0 = all)')
+    parser.add_argument('--retry-failed', action='store_true',
+                        help='retry files the checkpoint records as failed')
+    parser.add_argument('--progress-seconds', type=float, default=10.0)
+    args = parser.parse_args()
+
+    if args.manifest is not None:
+        items = iter_manifest(args.manifest)
+    elif args.source.is_dir():
+        items = iter_directory(args.source)
+    else:
+        print(f"{args.source} is not a directory", file=sys.stderr)
+        return 1
+
+    try:
+        ingestion = Ingestion(args)
+    except StoreLockedError as e:
+        print(e, file=sys.stderr)
+        return 1
+    todo = ingestion.todo(items)
+    if args.limit > 0:
+        todo = (item for _, item in zip(range(args.limit), todo))
+    try:
+        ingestion.run(todo)
+    except KeyboardInterrupt:
+        print("Interrupted; rerun the same command to resume")
+        return 130
+    finally:
+        ingestion.close()
+        ingestion.report(final=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
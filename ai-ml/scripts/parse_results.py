@@ -0,0 +1,72 @@
+"""Inspect and maintain the columnar parse-result store.
+
+Usage:
+    python scripts/parse_results.py stats [--dir DIR]
+    python scripts/parse_results.py flush [--dir DIR]
+    python scripts/parse_results.py compact [--dir DIR]
+    python scripts/parse_results.py skills [--dir DIR] [--top 20]
+    python scripts/parse_results.py export [--dir DIR] [--no-text] > rows.jsonl
+
+``flush`` seals the journalled rows into a segment, ``compact`` merges all
+segments and drops superseded rows, ``skills`` prints the most common skills
+and ``export`` writes the latest row per doc_id as JSONL. Run ``flush`` and
+``compact`` while the service is stopped: they refuse a store another
+process has open for writing. ``stats``, ``skills`` and ``export`` open the
+store read-only and can run alongside a writer; they report the store as it
+was when they opened it, without rows appended since.
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+ai_ml_dir = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ai_ml_dir))
+
+from config import NLPConfig  # noqa: E402
+from resume_parser.result_store import ParseResultStore, StoreLockedError  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=('stats', 'flush', 'compact', 'skills', 'export'))
+    parser.add_argument('--dir', type=Path, default=NLPConfig.PARSE_RESULT_STORE_DIR)
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--no-text', action='store_true', help='export: leave out the text')
+    args = parser.parse_args()
+
+    if not args.dir.exists():
+        print(f"No parse-result store at {args.dir}", file=sys.stderr)
+        return 1
+    read_only = args.command in ('stats', 'skills', 'export')
+    try:
+        store = ParseResultStore(args.dir, segment_rows=NLPConfig.PARSE_RESULT_SEGMENT_ROWS,
+                                 read_only=read_only)
+    except StoreLockedError as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    if args.command == 'stats':
+        print(json.dumps(store.stats(), indent=2))
+    elif args.command == 'flush':
+        path = store.flush()
+        print(f"Sealed {path.name}" if path else "Nothing to flush")
+    elif args.command == 'compact':
+        start = time.perf_counter()
+        result = store.compact()
+        print(f"{result['rows_before']} rows in {result['segments_before']} segments -> "
+              f"{result['rows_after']} rows in {result['segments_after']} "
+              f"({time.perf_counter() - start:.1f}s)")
+    elif args.command == 'skills':
+        for skill, count in list(store.skill_counts().items())[:args.top]:
+            print(f"{count:>8}  {skill}")
+    else:
+        for row in store.iter_rows(include_text=not args.no_text):
+            sys.stdout.write(json.dumps(row) + '\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""Label a backlog of texts with the trained skill classifier.
+
+Usage:
+    python scripts/predict_labels.py INPUT [--output labels.jsonl]
+        [--text-column text] [--id-column id] [--threshold 0.5] [--top-k 5]
+        [--chunk-size 2000] [--workers N]
+
+INPUT is a CSV (with a text column and optionally an id column) or a JSONL
+file of {"id": ..., "text": ...} objects. The input is read in chunks and
+each chunk is scored on a pool of worker processes that keep the models
+loaded, so memory stays flat however large the backlog is. One JSON line per
+input row ({"id", "labels": [{"label", "probability"}]}) is written in input
+order, and the throughput is printed at the end.
+"""
+import argparse
+import contextlib
+import json
+import sys
+import time
+from pathlib import Path
+
+ai_ml_dir = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ai_ml_dir))
+
+from config import NLPConfig  # noqa: E402
+from label_predictor import iter_label_predictions, load_label_models  # noqa: E402
+
+
+def read_chunks(path, chunk_size, text_column, id_column):
+    """Yield lists of (id, text) from a CSV or JSONL file."""
+    if path.suffix.lower() == '.csv':
+        import pandas as pd
+        columns = [text_column] + ([id_column] if id_column else [])
+        offset = 0
+        for frame in pd.read_csv(path, usecols=columns, dtype=str,
+                                 keep_default_na=False, chunksize=chunk_size):
+            ids = frame[id_column].tolist() if id_column else \
+                list(range(offset, offset + len(frame)))
+            offset += len(frame)
+            yield list(zip(ids, frame[text_column].tolist()))
+        return
+
+    chunk = []
+    with open(path, encoding='utf-8') as f:
+        for line_no, line in enumerate(f):
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            chunk.append((row.get(id_column or 'id', line_no), row.get(text_column) or ''))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input', type=Path)
+    parser.add_argument('--output', type=Path, help='JSONL output (default: stdout)')
+    parser.add_argument('--text-column', default='text')
+    parser.add_argument('--id-column', default=None,
+                        help="default: row number for CSV, 'id' for JSONL")
+    parser.add_argument('--threshold', type=float, default=NLPConfig.LABEL_THRESHOLD)
+    parser.add_argument('--top-k', type=int, default=NLPConfig.LABEL_TOP_K)
+    parser.add_argument('--chunk-size', type=int, default=NLPConfig.LABEL_BATCH_SIZE)
+    parser.add_argument('--workers', type=int, default=None,
+                        help='worker processes (default: LABEL_WORKERS)')
+    args = parser.parse_args()
+
+    if args.workers:
+        NLPConfig.LABEL_WORKERS = args.workers
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    # Log lines (e.g. model loading) go to stderr so stdout stays valid JSONL
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            done, elapsed = label_file(args, out)
+        finally:
+            if args.output:
+                out.close()
+    print(f"Labelled {done} texts in {elapsed:.1f}s "
+          f"({done / elapsed if elapsed else 0:.0f} texts/s)", file=sys.stderr)
+
+
+def label_file(args, out):
+    # Fail before starting workers if the models are missing
+    load_label_models()
+
+    ids_in_flight = []
+
+    def texts():
+        for chunk in read_chunks(args.input, max(1, args.chunk_size),
+                                 args.text_column, args.id_column):
+            ids_in_flight.append([row_id for row_id, _ in chunk])
+            yield [text for _, text in chunk]
+
+    started = time.perf_counter()
+    done = 0
+    for predictions in iter_label_predictions(texts(), args.threshold, args.top_k):
+        # Results come back in input order, as do the queued id lists
+        for row_id, labels in zip(ids_in_flight.pop(0), predictions):
+            out.write(json.dumps({'id': row_id, 'labels': labels}) + '\n')
+        done += len(predictions)
+    return done, time.perf_counter() - started
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""Import-time profile of the service, to catch startup regressions.
+
+Usage: python scripts/profile_imports.py [--module main] [--repeat 3] [--top 15]
+           [--max-ms 800] [--output imports.json]
+
+Imports the module in a fresh interpreter with ``python -X importtime`` and
+reports the total import time (median of ``--repeat`` runs), the slowest
+top-level packages and the modules with the most self time.
+
+Heavy libraries are meant to be imported on first use (see warmup.py). The
+script exits with status 1 if importing the module pulls in any package listed
+in ``--forbid`` or takes longer than ``--max-ms``.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ai_ml_dir = Path(__file__).resolve().parents[1]
+
+LAZY_PACKAGES = ['spacy', 'pdfminer', 'joblib', 'sklearn', 'torch',
+                 'sentence_transformers', 'transformers', 'httpx']
+
+
+def profile(module):
+    """Return [(name, self_us, cumulative_us, depth)] from one -X importtime run."""
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ai_ml_dir, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    # Keep the module's own subtree (children are listed before their parent),
+    # dropping what the interpreter imported at startup (site, encodings, ...)
+    end = next(i for i, row in enumerate(rows) if row[0] == module and row[3] == 0)
+    start = end
+    while start > 0 and rows[start - 1][3] > 0:
+        start -= 1
+    return rows[start:end + 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--module', default='main')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--forbid', nargs='*', default=LAZY_PACKAGES,
+                        help='packages that must not be imported eagerly')
+    parser.add_argument('--max-ms', type=float, default=0.0,
+                        help='fail if the median import time exceeds this (0 = off)')
+    parser.add_argument('--output', help='write the report as JSON')
+    args = parser.parse_args()
+
+    runs = [profile(args.module) for _ in range(max(1, args.repeat))]
+    totals_ms = [next(cum for name, _, cum, _ in rows if name == args.module) / 1000
+                 for rows in runs]
+    total_ms = statistics.median(totals_ms)
+    # Per-module numbers come from the run closest to the median
+    rows = runs[min(range(len(runs)), key=lambda i: abs(totals_ms[i] - total_ms))]
+
+    packages = {}
+    for name, _, cumulative, _ in rows:
+        package = name.split('.')[0]
+        # The first import of a package's root is where its cost is accounted
+        if name == package and package != args.module:
+            packages[package] = max(packages.get(package, 0), cumulative)
+    slowest_packages = sorted(packages.items(), key=lambda kv: -kv[1])[:args.top]
+    slowest_self = sorted(rows, key=lambda r: -r[1])[:args.top]
+    imported = {name.split('.')[0] for name, _, _, _ in rows}
+    eager = sorted(set(args.forbid) & imported)
+
+    print(f"import {args.module}: {total_ms:.0f} ms (median of {len(runs)}: "
+          + ', '.join(f"{t:.0f}" for t in totals_ms) + ")")
+    print("\nSlowest packages (cumulative ms):")
+    for package, cumulative in slowest_packages:
+        print(f"  {cumulative / 1000:8.1f}  {package}")
+    print("\nMost self time (ms):")
+    for name, self_us, _, _ in slowest_self:
+        print(f"  {self_us / 1000:8.1f}  {name}")
+
+    failures = []
+    if eager:
+        failures.append(f"imported eagerly: {', '.join(eager)}")
+    if args.max_ms and total_ms > args.max_ms:
+        failures.append(f"{total_ms:.0f} ms exceeds --max-ms {args.max_ms:.0f}")
+
+    if args.output:
+        report = {
+            'module': args.module,
+            'total_ms': total_ms,
+            'runs_ms': totals_ms,
+            'packages_ms': {p: c / 1000 for p, c in slowest_packages},
+            'self_ms': {name: s / 1000 for name, s, _, _ in slowest_self},
+            'eager_imports': eager,
+            'failures': failures,
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,332 @@
+"""Benchmark suite for the parsing and matching hot paths.
+
+Usage:
+    python scripts/run_benchmarks.py [--quick] [--only extract_skills ...]
+        [--output run.json] [--baseline baseline.json] [--threshold 0.2]
+        [--save-baseline baseline.json]
+
+Generates deterministic synthetic resumes, job descriptions and PDFs (no
+files from data/ are needed) and times, across input sizes:
+
+- extract_text_from_pdf    PDFs of 1 to 20 pages
+- extract_skills           resume texts of 2k to 200k characters
+- extract_entities         resume texts (regex only if no spaCy model is installed)
+- compute_match_score      resume / job pairs (TF-IDF, plus embeddings if installed)
+- rank_items_by_similarity 1k to 100k candidate vectors
+
+Each case reports calls/s, items/s and p50/p95/p99 latency. ``--output``
+writes the run as JSON, together with the environment it ran in, so runs can
+be compared over time. With ``--baseline`` the run is compared case by case
+against a stored run and the script exits with status 1 if any case's
+latency (``--metric``, p50 by default) grew by more than ``--threshold``.
+Baselines are machine specific: record one with ``--save-baseline`` on the
+machine that will run the comparison.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+ai_ml_dir = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ai_ml_dir))
+
+from matching_engine.semantic_matcher import compute_match_score  # noqa: E402
+from matching_engine.similarity_calculator import rank_items_by_similarity  # noqa: E402
+from resume_parser.entity_recognition import _load_nlp, extract_entities  # noqa: E402
+from resume_parser.pdf_processor import extract_text_from_pdf  # noqa: E402
+from resume_parser.skill_extractor import SKILL_KEYWORDS, extract_skills  # noqa: E402
+
+SCHEMA_VERSION = 1
+
+FIRST_NAMES = ['Ayesha', 'Omar', 'Maria', 'Chen', 'Priya', 'Lucas', 'Fatima', 'John']
+LAST_NAMES = ['Khan', 'Garcia', 'Wang', 'Sharma', 'Smith', 'Baloch', 'Silva', 'Ali']
+COMPANIES = ['Acme Corp', 'Globex', 'Initech', 'Umbrella Labs', 'Hooli', 'Stark Systems']
+VERBS = ['Built', 'Designed', 'Led', 'Maintained', 'Migrated', 'Optimised', 'Shipped']
+NOUNS = ['services', 'data pipelines', 'dashboards', 'APIs', 'test suites',
+         'deployment tooling', 'search features', 'billing systems']
+FILLER = ['across', 'teams', 'with', 'for', 'using', 'to', 'reduce', 'latency',
+          'improve', 'reliability', 'customers', 'and', 'the', 'platform']
+
+
+# -- synthetic inputs -----------------------------------------------------------
+
+def _sentence(rng, skills):
+    words = [rng.choice(VERBS), rng.choice(NOUNS)]
+    words += rng.sample(FILLER, rng.randint(3, 8))
+    if rng.random() < 0.7:
+        words += ['using', rng.choice(skills)]
+    return ' '.join(words) + '.'
+
+
+def synthetic_resume_lines(chars, rng):
+    """Lines of a plausible resume, about ``chars`` characters in total."""
+    skills = rng.sample(SKILL_KEYWORDS, 15)
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    lines = [f"{first} {last}",
+             f"{first.lower()}.{last.lower()}@example.com  +1 555 {rng.randint(100, 999)} "
+             f"{rng.randint(1000, 9999)}",
+             '', 'Skills', ', '.join(skills), '', 'Experience']
+    total = sum(len(line) + 1 for line in lines)
+    while total < chars:
+        if rng.random() < 0.15:
+            line = f"{rng.choice(COMPANIES)}, {rng.randint(2010, 2024)} - present"
+        else:
+            line = _sentence(rng, skills)
+        lines.append(line)
+        total += len(line) + 1
+    return lines
+
+
+def synthetic_resume(chars, rng):
+    return '\n'.join(synthetic_resume_lines(chars, rng))
+
+
+def synthetic_job(chars, rng):
+    skills = rng.sample(SKILL_KEYWORDS, 8)
+    parts = [f"We are hiring an engineer to join {rng.choice(COMPANIES)}.",
+             'Requirements: ' + ', '.join(skills) + '.']
+    while sum(len(p) + 1 for p in parts) < chars:
+        parts.append(_sentence(rng, skills))
+    return ' '.join(parts)
+
+
+def _pdf_string(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def make_pdf(pages):
+    """A minimal valid PDF with one Helvetica text block per page.
+
+    ``pages`` is a list of pages, each a list of text lines (ASCII).
+    """
+    objects = []
+
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    contents = []
+    for lines in pages:
+        stream = ("BT /F1 10 Tf 13 TL 50 800 Td "
+                  + ' '.join(f"({_pdf_string(line)}) Tj T*" for line in lines)
+                  + " ET").encode('latin-1', 'replace')
+        contents.append(add(b"<< /Length %d >>\nstream\n%s\nendstream"
+                            % (len(stream), stream)))
+    pages_id = len(objects) + len(pages) + 1
+    page_ids = [add(b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 842] "
+                    b"/Contents %d 0 R /Resources << /Font << /F1 %d 0 R >> >> >>"
+                    % (pages_id, content, font)) for content in contents]
+    add(b"<< /Type /Pages /Kids [%s] /Count %d >>"
+        % (b' '.join(b"%d 0 R" % p for p in page_ids), len(page_ids)))
+    catalog = add(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b''.join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += (b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+            % (len(objects) + 1, catalog, xref))
+    return bytes(out)
+
+
+def synthetic_resume_pdf(n_pages, rng, lines_per_page=55):
+    lines = synthetic_resume_lines(n_pages * lines_per_page * 60, rng)
+    # Wrap long lines so they fit the page width
+    wrapped = []
+    for line in lines:
+        while len(line) > 95:
+            cut = line.rfind(' ', 0, 95)
+            cut = cut if cut > 0 else 95
+            wrapped.append(line[:cut])
+            line = line[cut:].lstrip()
+        wrapped.append(line)
+    pages = [wrapped[i:i + lines_per_page]
+             for i in range(0, n_pages * lines_per_page, lines_per_page)]
+    return make_pdf([page or [''] for page in pages])
+
+
+# -- benchmark cases -------------------------------------------------------------
+
+def build_cases(rng, quick):
+    """Return (benchmark, size label, items per call, fn) tuples."""
+    cases = []
+
+    for n_pages in ([1, 5] if quick else [1, 5, 20]):
+        pdf = synthetic_resume_pdf(n_pages, rng)
+        # extract_text_from_pdf releases its source, so pass fresh bytes objects
+        cases.append(('extract_text_from_pdf', f'{n_pages}p', 1,
+                      lambda pdf=pdf: extract_text_from_pdf(bytes(pdf))))
+
+    for chars in ([2_000, 20_000] if quick else [2_000, 20_000, 200_000]):
+        text = synthetic_resume(chars, rng)
+        cases.append(('extract_skills', f'{chars}c', 1,
+                      lambda text=text: extract_skills(text)))
+
+    for chars in ([2_000] if quick else [2_000, 20_000]):
+        text = synthetic_resume(chars, rng)
+        cases.append(('extract_entities', f'{chars}c', 1,
+                      lambda text=text: extract_entities(text)))
+
+    for chars in ([2_000] if quick else [2_000, 10_000]):
+        resume, job = synthetic_resume(chars, rng), synthetic_job(chars // 2, rng)
+        cases.append(('compute_match_score', f'{chars}c', 1,
+                      lambda resume=resume, job=job: compute_match_score(resume, job)))
+
+    np_rng = np.random.default_rng(rng.randint(0, 2 ** 31))
+    for n in ([1_000, 10_000] if quick else [1_000, 10_000, 100_000]):
+        vectors = list(np_rng.normal(size=(n, 384)).astype(np.float32))
+        payloads = list(range(n))
+        query = np_rng.normal(size=384).astype(np.float32)
+        cases.append(('rank_items_by_similarity', f'{n}x384', n,
+                      lambda q=query, v=vectors, p=payloads: rank_items_by_similarity(q, v, p, 10)))
+    return cases
+
+
+def time_case(fn, min_time, min_runs, max_runs):
+    """Call fn after one warm-up until min_time has passed; return per-call seconds."""
+    fn()
+    samples = []
+    started = time.perf_counter()
+    while len(samples) < max_runs and (
+            len(samples) < min_runs or time.perf_counter() - started < min_time):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return np.array(samples)
+
+
+def summarize(samples, items):
+    ms = samples * 1000
+    mean = float(samples.mean())
+    return {
+        'runs': len(samples),
+        'mean_ms': float(ms.mean()),
+        'p50_ms': float(np.percentile(ms, 50)),
+        'p95_ms': float(np.percentile(ms, 95)),
+        'p99_ms': float(np.percentile(ms, 99)),
+        'calls_per_s': 1.0 / mean if mean else 0.0,
+        'items_per_s': items / mean if mean else 0.0,
+    }
+
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=ai_ml_dir, capture_output=True,
+            text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'git_commit': commit,
+        'spacy_model_loaded': _load_nlp() is not None,
+    }
+
+
+def compare(results, baseline, metric, threshold, min_delta_ms):
+    """Return (key, baseline value, current value) for every regressed case."""
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        before, after = previous[metric], current[metric]
+        if after > before * (1 + threshold) and after - before > min_delta_ms:
+            regressions.append((key, before, after))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--quick', action='store_true',
+                        help='fewer and smaller inputs, for CI smoke runs')
+    parser.add_argument('--only', nargs='*', default=None,
+                        help='benchmark names to run (default: all)')
+    parser.add_argument('--min-time', type=float, default=1.0,
+                        help='seconds to spend timing each case')
+    parser.add_argument('--min-runs', type=int, default=5)
+    parser.add_argument('--max-runs', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--output', help='write this run as JSON')
+    parser.add_argument('--baseline', help='JSON run to compare against')
+    parser.add_argument('--save-baseline', help='also write this run as the new baseline')
+    parser.add_argument('--metric', default='p50_ms',
+                        choices=['mean_ms', 'p50_ms', 'p95_ms', 'p99_ms'])
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='allowed relative slowdown before failing (0.2 = 20%%)')
+    parser.add_argument('--min-delta-ms', type=float, default=0.05,
+                        help='ignore slowdowns smaller than this (timer noise)')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    cases = build_cases(rng, args.quick)
+    if args.only:
+        unknown = set(args.only) - {name for name, _, _, _ in cases}
+        if unknown:
+            parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+        cases = [case for case in cases if case[0] in args.only]
+
+    results = {}
+    print(f"{'benchmark':<26} {'size':>9} {'runs':>5} {'p50 ms':>9} {'p95 ms':>9} "
+          f"{'p99 ms':>9} {'calls/s':>9} {'items/s':>11}")
+    for name, size, items, fn in cases:
+        samples = time_case(fn, args.min_time, args.min_runs, args.max_runs)
+        stats = dict(summarize(samples, items), benchmark=name, size=size, items=items)
+        results[f'{name}[{size}]'] = stats
+        print(f"{name:<26} {size:>9} {stats['runs']:>5} {stats['p50_ms']:>9.3f} "
+              f"{stats['p95_ms']:>9.3f} {stats['p99_ms']:>9.3f} "
+              f"{stats['calls_per_s']:>9.1f} {stats['items_per_s']:>11.1f}")
+
+    run = {
+        'schema_version': SCHEMA_VERSION,
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'settings': {'quick': args.quick, 'seed': args.seed, 'min_time': args.min_time},
+        'environment': environment(),
+        'results': results,
+    }
+    for path in filter(None, [args.output, args.save_baseline]):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(run, f, indent=2, sort_keys=True)
+        print(f"Wrote {path}")
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline.get('environment', {}).get('machine') != run['environment']['machine']:
+        print("Warning: baseline was recorded on a different machine type")
+    regressions = compare(results, baseline.get('results', {}), args.metric,
+                          args.threshold, args.min_delta_ms)
+    compared = len(set(results) & set(baseline.get('results', {})))
+    if not regressions:
+        print(f"No regressions in {compared} cases ({args.metric}, "
+              f"threshold {args.threshold:.0%})")
+        return 0
+    print(f"{len(regressions)} of {compared} cases regressed ({args.metric}, "
+          f"threshold {args.threshold:.0%}):")
+    for key, before, after in regressions:
+        print(f"  {key}: {before:.3f} ms -> {after:.3f} ms ({after / before - 1:+.0%})")
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,29 +1,19 @@
 import sys
 from pathlib import Path
-import joblib
 
 try:
-    from config import NLPConfig, MODELS_DIR
+    from label_predictor import load_label_models
 except Exception:
     # allow running from scripts/ when ai-ml is not a package
-    import os
     ai_ml_dir = Path(__file__).resolve().parents[1]
     sys.path.insert(0, str(ai_ml_dir))
-    from config import NLPConfig, MODELS_DIR
+    from label_predictor import load_label_models
 
 
 def load_models():
-    vec_path = NLPConfig.TFIDF_VECTORIZER_PATH
-    clf_path = NLPConfig.LOGREG_CLASSIFIER_PATH
-    mlb_path = MODELS_DIR / 'mlb.joblib'
-
-    print('Loading vectorizer from', vec_path)
-    vectorizer = joblib.load(vec_path)
-    print('Loading classifier from', clf_path)
-    clf = joblib.load(clf_path)
-    print('Loading mlb from', mlb_path)
-    mlb = joblib.load(mlb_path)
-    return vectorizer, clf, mlb
+    # One consistent version of the three artifacts from the shared registry;
+    # raises if they are missing or do not fit together
+    return load_label_models()
 
 
 def predict_texts(texts):
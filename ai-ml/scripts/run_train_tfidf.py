@@ -1,4 +1,4 @@
-from model_training import train_tfidf_multilabel_classifier
+import argparse
 import sys
 import os
 import traceback
@@ -7,12 +7,30 @@ import traceback
 ai_ml_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 sys.path.insert(0, ai_ml_dir)
 
+from model_training import (  # noqa: E402
+    train_streaming_multilabel_classifier, train_tfidf_multilabel_classifier)
+
 
 def main():
-    csv_path = os.path.join(ai_ml_dir, 'data', 'skills_dataset.csv')
-    print('Using CSV:', csv_path)
+    parser = argparse.ArgumentParser(description='Train the multi-label skills classifier.')
+    parser.add_argument('--csv', default=os.path.join(ai_ml_dir, 'data', 'skills_dataset.csv'))
+    parser.add_argument('--streaming', action='store_true',
+                        help='out-of-core training for CSVs that do not fit in memory')
+    parser.add_argument('--chunk-rows', type=int, default=None)
+    parser.add_argument('--features', type=int, default=None,
+                        help='hashed feature count (streaming only)')
+    parser.add_argument('--epochs', type=int, default=None)
+    parser.add_argument('--n-jobs', type=int, default=None)
+    args = parser.parse_args()
+
+    print('Using CSV:', args.csv)
     try:
-        res = train_tfidf_multilabel_classifier(csv_path=csv_path)
+        if args.streaming:
+            res = train_streaming_multilabel_classifier(
+                csv_path=args.csv, chunk_rows=args.chunk_rows, n_features=args.features,
+                epochs=args.epochs, n_jobs=args.n_jobs)
+        else:
+            res = train_tfidf_multilabel_classifier(csv_path=args.csv, n_jobs=args.n_jobs)
         print('TRAINING_RESULT:', res)
     except Exception as e:
         print('Training failed:', type(e).__name__, str(e))
@@ -0,0 +1,162 @@
+"""Startup warm-up and readiness.
+
+Heavy libraries (spaCy, pdfminer, joblib/scikit-learn, sentence-transformers
+and torch, httpx) are imported on first use, so importing the service is
+fast. Without a warm-up the first requests would pay for those imports and
+for loading the models. ``Readiness.start`` runs the warm-up steps once, in a
+background thread, and ``/ready`` answers 503 until they have finished; ``/``
+stays a plain liveness check.
+
+A step that raises RuntimeError is reported as ``unavailable`` (an optional
+dependency or artifact is missing, as elsewhere in the service) and any other
+exception as ``error``. Neither blocks readiness: every component still loads
+lazily on first use, and the per-step report shows what was not preloaded.
+"""
+from __future__ import annotations
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import threading
+import time
+
+from config import NLPConfig
+
+
+def _warm_skill_matcher() -> str:
+    from resume_parser.skill_extractor import get_skill_matcher
+    return f"{len(get_skill_matcher())} skills"
+
+
+def _warm_models() -> str:
+    from model_registry import get_model_registry
+    registry = get_model_registry()
+    loaded = [name for name in registry.paths if registry.get(name) is not None]
+    if not loaded:
+        raise RuntimeError("No model artifacts found")
+    return ', '.join(loaded)
+
+
+def _warm_spacy() -> str:
+    from resume_parser.entity_recognition import _load_nlp
+    nlp = _load_nlp()
+    if nlp is None:
+        raise RuntimeError(f"spaCy model '{NLPConfig.SPACY_MODEL_NAME}' unavailable")
+    nlp("Warm-up sentence for Jane Doe at Acme.")
+    return NLPConfig.SPACY_MODEL_NAME
+
+
+def _warm_embedder() -> str:
+    from matching_engine.embedding_service import get_text_embeddings
+    # Encoding once also initialises torch's kernels and thread pools
+    get_text_embeddings(["warm-up"])
+    return NLPConfig.HF_EMBEDDING_MODEL
+
+
+def _warm_extraction_pool() -> str:
+    from resume_parser.resume_parser import warm_extraction_pool
+    workers = warm_extraction_pool(timeout=NLPConfig.WARMUP_TIMEOUT_SECONDS)
+    return f"{workers} workers"
+
+
+def _warm_stores() -> str:
+    from matching_engine.ann_index import get_candidate_ann_index
+    from matching_engine.embedding_store import get_embedding_store
+    from matching_engine.ranking_algorithm import get_ranking_engine
+    from matching_engine.skill_index import get_skill_index
+    from resume_parser.parse_cache import get_parse_cache
+    from resume_parser.result_store import get_result_store
+
+    get_parse_cache()
+    get_result_store()
+    get_skill_index()
+    for kind in ('resumes', 'jobs'):
+        get_embedding_store(kind)
+    get_candidate_ann_index()
+    # Loads the candidate pool from the result store; needs the skill index
+    get_ranking_engine()
+    return "parse cache, result store, skill index, embedding stores, ANN index, ranking pool"
+
+
+# In order: cheap steps first so their failures show up early
+WARMUP_STEPS: List[Tuple[str, Callable[[], Any]]] = [
+    ('skill_matcher', _warm_skill_matcher),
+    ('stores', _warm_stores),
+    ('models', _warm_models),
+    ('spacy', _warm_spacy),
+    ('embedder', _warm_embedder),
+    ('extraction_pool', _warm_extraction_pool),
+]
+
+
+class Readiness:
+    """Runs the warm-up steps once and reports whether the service is ready."""
+
+    def __init__(self, steps: Sequence[Tuple[str, Callable[[], Any]]], enabled: bool = True):
+        self.steps = list(steps)
+        self.enabled = enabled
+        self.state = 'pending' if enabled else 'disabled'
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self.seconds: Optional[float] = None
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        if not enabled:
+            self._done.set()
+
+    @property
+    def ready(self) -> bool:
+        return self._done.is_set()
+
+    def start(self, background: bool = True) -> None:
+        """Start the warm-up unless it already ran or is running."""
+        with self._lock:
+            if self.state != 'pending':
+                return
+            self.state = 'warming'
+        if background:
+            threading.Thread(target=self._run, name='warmup', daemon=True).start()
+        else:
+            self._run()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'ready': self.ready,
+                'state': self.state,
+                'warmup_seconds': self.seconds,
+                'steps': {name: dict(result) for name, result in self.results.items()},
+            }
+
+    def _run(self) -> None:
+        started = time.perf_counter()
+        for name, step in self.steps:
+            step_started = time.perf_counter()
+            try:
+                detail = step()
+                result = {'status': 'ok', 'detail': detail}
+            except RuntimeError as e:
+                result = {'status': 'unavailable', 'detail': str(e)}
+            except Exception as e:
+                print(f"Warm-up step {name} failed: {e}")
+                result = {'status': 'error', 'detail': str(e) or type(e).__name__}
+            result['seconds'] = round(time.perf_counter() - step_started, 3)
+            with self._lock:
+                self.results[name] = result
+        with self._lock:
+            self.seconds = round(time.perf_counter() - started, 3)
+            self.state = 'ready'
+        self._done.set()
+        print(f"Warm-up finished in {self.seconds:.1f}s: " + ', '.join(
+            f"{name}={result['status']}" for name, result in self.results.items()))
+
+
+@lru_cache(maxsize=1)
+def get_readiness() -> Readiness:
+    """Return the process-wide readiness tracker (steps from NLPConfig.WARMUP_STEPS)."""
+    wanted = {s.strip() for s in NLPConfig.WARMUP_STEPS.split(',') if s.strip()}
+    unknown = wanted - {name for name, _ in WARMUP_STEPS}
+    if unknown:
+        print(f"Ignoring unknown warm-up steps: {', '.join(sorted(unknown))}")
+    steps = [(name, fn) for name, fn in WARMUP_STEPS if not wanted or name in wanted]
+    return Readiness(steps, enabled=NLPConfig.WARMUP_ON_STARTUP)